@@ -0,0 +1,146 @@
+"""
+Content-Addressed Artifact Cache.
+
+A cache of the intermediate results of the pipeline (data splits, frequent itemsets, ...), so reruns skip the stages whose inputs did not change. Each artifact is stored under a key that hashes:
+    - The name of the stage.
+    - The SHA-256 of the content of its input files. Hashes are remembered by file path, size and modification time, so a large input file is only read again when it changes.
+    - Its parameters (`num_samples`, `minimum_support`, random states, ...), including the keys of the artifacts it was computed from.
+
+Artifacts are pickled with the highest protocol, which stores the NumPy arrays behind DataFrames as raw binary buffers, and written through a temporary file so concurrent runs never read a partial artifact. The modification time of an artifact is updated whenever it is read, and the least recently used artifacts are evicted once the cache grows beyond `max_bytes`.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+# Size of the blocks read while hashing input files
+hash_block_size = 2 ** 20
+
+
+def file_sha256(path):
+    """
+    SHA-256 of the content of a file, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(hash_block_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Size-bounded LRU cache of pickled artifacts in a directory, keyed by input file hashes and parameters.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 ** 32):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._hashes_file = os.path.join(cache_dir, "file_hashes.json")
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_hash(self, path):
+        """
+        SHA-256 of the content of a file, reusing the hash remembered for its current size and modification time.
+        """
+        status = os.stat(path)
+        signature = [status.st_size, status.st_mtime_ns]
+        path = os.path.abspath(path)
+
+        try:
+            with open(self._hashes_file) as file:
+                hashes = json.load(file)
+        except (OSError, ValueError):
+            hashes = {}
+
+        if hashes.get(path, {}).get("signature") == signature:
+            return hashes[path]["sha256"]
+
+        hashes[path] = {"signature": signature, "sha256": file_sha256(path)}
+        temporary_path = f"{self._hashes_file}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(hashes, file)
+        os.replace(temporary_path, self._hashes_file)
+
+        return hashes[path]["sha256"]
+
+    def key(self, stage, files=(), **parameters):
+        """
+        Key of the artifact of a stage computed from the given input files and parameters.
+        """
+        description = {
+            "stage": stage,
+            "files": [self.file_hash(path) for path in files],
+            "parameters": parameters,
+        }
+        encoded = json.dumps(description, sort_keys=True, default=str).encode()
+
+        return f"{stage}-{hashlib.sha256(encoded).hexdigest()[:32]}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key):
+        """
+        The artifact stored under a key, or None if it is not cached. Reading an artifact marks it as recently used.
+        """
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as file:
+                artifact = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return artifact
+
+    def put(self, key, artifact):
+        """
+        Store an artifact under a key, then evict the least recently used artifacts beyond the size bound.
+
+        An artifact larger than the bound on its own is not stored, since it would be evicted straight away. Returns whether the artifact was stored.
+        """
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, "wb") as file:
+            pickle.dump(artifact, file, protocol=pickle.HIGHEST_PROTOCOL)
+            size = file.tell()
+
+        if size > self.max_bytes:
+            os.remove(temporary_path)
+            print(f"Artifact {key} ({size / 2 ** 20:.1f} MB) is larger than the cache bound ({self.max_bytes / 2 ** 20:.1f} MB) and was not cached.")
+            return False
+
+        os.replace(temporary_path, path)
+        self.evict()
+
+        return True
+
+    def evict(self):
+        """
+        Delete the least recently used artifacts until the cache fits in `max_bytes`.
+        """
+        artifacts = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                status = entry.stat()
+                artifacts.append((status.st_mtime_ns, status.st_size, entry.path))
+
+        total = sum(size for _, size, _ in artifacts)
+        for _, size, path in sorted(artifacts):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
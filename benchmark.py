@@ -0,0 +1,222 @@
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, fpgrowth, fpmax, association_rules
+from sklearn.model_selection import train_test_split
+
+from constrained_mining import mine_constrained, constrained_association_rules
+from closed_mining import mine_closed, closed_association_rules
+from eclat import eclat
+from rule_evaluation import evaluate_rules
+
+"""
+Benchmark Script.
+
+This script measures the mining, rule generation and rule evaluation stages on synthetic itemized datasets, so the performance of the algorithms can be compared between versions of the code and between data shapes without the private data.
+
+The synthetic datasets have the column schema of `feature_itemization.py`: every feature is a pair of `_low` / `_high` columns with exactly one of them set, for `inf_` and `usr_` features. Each feature is 'high' with probability `density`, and each `usr_` feature copies the category of an `inf_` feature with probability `correlation` (and is drawn independently otherwise), so the strength of the 'inf_' -> 'usr_' rules can be controlled.
+
+Every case runs in a new process, so its peak resident set size (RSS) covers only that case. Cases run one after the other, so their times do not interfere.
+
+Usage:
+    python benchmark.py <grid_file> <report_file> [<baseline_report_file>]
+
+Arguments:
+    - grid_file: str - Path to a JSON file with the lists of values to benchmark, e.g. {"algorithms": ["apriori", "fpgrowth", "eclat"], "num_rows": [10000, 100000], "num_inf_features": [10], "num_usr_features": [5], "density": [0.3, 0.5], "correlation": [0.5], "minimum_support": [0.05], "minimum_confidence": [0.6]}. The algorithms are among apriori, fpgrowth, fpmax, eclat, closed and constrained.
+    - report_file: str - Path to the CSV report, with one row per case.
+    - baseline_report_file: str - Path to a previous report to compare with (optional). The ratios of the times and peak RSS to those of the same case in the baseline are added to the report, and cases slower than the baseline by more than `regression_tolerance` (and by at least `regression_min_seconds`) are flagged.
+
+Parameters to be adjusted:
+    - `seed`: Seed of the synthetic datasets, so every case uses the same data in every run.
+    - `regression_tolerance`: Ratio to the baseline above which a time or the peak RSS is flagged as a regression.
+    - `regression_min_seconds`: Smallest increase of a time flagged as a regression, so the noise of very short stages is not reported.
+
+Outputs:
+    - A CSV report with, for each case, its parameters, the mining, association rules and evaluation times, the number of frequent itemsets and rules, the average accuracy of the rules on the validation set, the peak RSS and the status of the case.
+"""
+
+# Parameters to be adjusted
+seed = 41
+regression_tolerance = 1.25
+regression_min_seconds = 0.1
+
+# Mining function for each algorithm
+algorithms = {
+    "apriori": apriori,
+    "fpgrowth": fpgrowth,
+    "fpmax": fpmax,
+    "eclat": eclat,
+    "closed": mine_closed,
+}
+
+# Parameters identifying a case, in grid order
+case_parameters = ["algorithm", "num_rows", "num_inf_features", "num_usr_features", "density", "correlation",
+                   "minimum_support", "minimum_confidence"]
+
+# Measures compared with the baseline
+compared_measures = ["Mining Time (s)", "Association Rules Time (s)", "Evaluation Time (s)", "Peak RSS (MB)"]
+
+### 1. SYNTHETIC DATA ###
+
+
+def synthetic_data(num_rows, num_inf_features, num_usr_features, density, correlation, random_state=seed):
+    """
+    Generate an itemized dataset with `inf_` and `usr_` low/high columns.
+
+    Each `usr_` feature is linked to an `inf_` feature (in turn) and copies its category with probability `correlation`.
+    """
+    rng = np.random.default_rng(random_state)
+
+    inf_high = rng.random((num_rows, num_inf_features)) < density
+    linked = inf_high[:, np.arange(num_usr_features) % max(num_inf_features, 1)]
+    usr_high = np.where(rng.random((num_rows, num_usr_features)) < correlation, linked,
+                        rng.random((num_rows, num_usr_features)) < density)
+
+    columns = {}
+    for prefix, high in (("inf", inf_high), ("usr", usr_high)):
+        for feature in range(high.shape[1]):
+            columns[f"{prefix}_feature{feature}_low"] = ~high[:, feature]
+            columns[f"{prefix}_feature{feature}_high"] = high[:, feature]
+
+    return pd.DataFrame(columns).astype(int)
+
+### 2. CASE PROCESS ###
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def run_case(algorithm, num_rows, num_inf_features, num_usr_features, density, correlation,
+             minimum_support, minimum_confidence):
+    """
+    Run the mining, rule generation and evaluation stages of one case, returning its measures.
+    """
+    results = {}
+
+    boolean_data = synthetic_data(num_rows, num_inf_features, num_usr_features, density, correlation)
+    train_data, validation_data = train_test_split(boolean_data, test_size=0.3, random_state=42)
+    train_data = train_data.astype(bool)
+
+    # Mining
+    mining_start = time.time()
+    if algorithm == "constrained":
+        frequent_itemsets = mine_constrained(train_data, minimum_support, minimum_confidence)
+    else:
+        frequent_itemsets = algorithms[algorithm](train_data, min_support=minimum_support, use_colnames=True)
+    results["Mining Time (s)"] = time.time() - mining_start
+    results["Number of Frequent Itemsets"] = len(frequent_itemsets)
+
+    # Association rules, as in the training scripts
+    association_start = time.time()
+    if algorithm == "constrained":
+        rules = constrained_association_rules(frequent_itemsets, min_confidence=minimum_confidence)
+    elif algorithm == "closed":
+        rules = closed_association_rules(frequent_itemsets, min_confidence=minimum_confidence)
+    else:
+        try:
+            rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=minimum_confidence)
+        except (KeyError, ValueError):
+            # Maximal itemsets may lack the supports of antecedents or consequents (the error type depends on the mlxtend version)
+            rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=minimum_confidence, support_only=True)
+        # Boolean masks, so an empty rules frame is not indexed by columns
+        rules = rules[rules['antecedents'].apply(lambda x: all(str(item).startswith('inf_') for item in x)).astype(bool)]
+        rules = rules[rules['consequents'].apply(lambda x: all(str(item).startswith('usr_') for item in x)).astype(bool)]
+    results["Association Rules Time (s)"] = time.time() - association_start
+    results["Number of Rules"] = len(rules)
+
+    # Evaluation on the validation set
+    evaluation_start = time.time()
+    rule_accuracies = evaluate_rules(rules, validation_data)
+    results["Evaluation Time (s)"] = time.time() - evaluation_start
+    results["Average Accuracy"] = pd.DataFrame(rule_accuracies, columns=['Rule', 'Accuracy'])['Accuracy'].mean()
+
+    results["Peak RSS (MB)"] = peak_rss_mb()
+
+    return results
+
+### 3. BENCHMARK ###
+
+
+def compare_with_baseline(report, baseline):
+    """
+    Add the ratios of the measures of each case to those of the same case in the baseline, and flag the regressions.
+    """
+    baseline = baseline[case_parameters + compared_measures]
+    merged = report.merge(baseline, on=case_parameters, how="left", suffixes=("", " (baseline)"))
+
+    regressions = pd.Series(False, index=merged.index)
+    for measure in compared_measures:
+        ratio = merged[measure] / merged[f"{measure} (baseline)"]
+        merged[f"{measure} Ratio"] = ratio
+
+        slower = ratio > regression_tolerance
+        if measure.endswith("(s)"):
+            slower &= merged[measure] - merged[f"{measure} (baseline)"] >= regression_min_seconds
+        regressions |= slower
+    merged["Regression"] = np.where(regressions, "Yes", "No")
+
+    return merged
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print("Error. Enter arguments correctly")
+        sys.exit()
+
+    with open(sys.argv[1]) as grid_file:
+        grid = json.load(grid_file)
+
+    unknown = [algorithm for algorithm in grid["algorithms"] if algorithm not in algorithms and algorithm != "constrained"]
+    if unknown:
+        print(f"Error. Unknown algorithms: {', '.join(unknown)}")
+        sys.exit()
+
+    cases = list(product(*(grid[name if name != "algorithm" else "algorithms"] for name in case_parameters)))
+    print(f"{len(cases)} cases.")
+
+    rows = []
+    for case in cases:
+        row = dict(zip(case_parameters, case))
+
+        # A new process for every case, so the peak RSS is that of the case alone
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            try:
+                row.update(executor.submit(run_case, *case).result())
+                row["Status"] = "Completed"
+            except Exception as error:
+                row["Status"] = f"Failed: {type(error).__name__}: {error}"
+
+        print(", ".join(str(value) for value in case), "-", row["Status"])
+        rows.append(row)
+
+    report = pd.DataFrame(rows).reindex(columns=case_parameters + [
+        "Mining Time (s)", "Number of Frequent Itemsets", "Association Rules Time (s)", "Number of Rules",
+        "Evaluation Time (s)", "Average Accuracy", "Peak RSS (MB)", "Status"
+    ])
+
+    if len(sys.argv) == 4:
+        report = compare_with_baseline(report, pd.read_csv(sys.argv[3]))
+        print(f"{(report['Regression'] == 'Yes').sum()} regressions against the baseline.")
+
+    report.to_csv(sys.argv[2], index=False)
+    print("Report saved.")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    main()
+    print("Execution time: {:.2f} seconds".format(time.time() - start_time))
@@ -0,0 +1,156 @@
+"""
+Bitset Utilities.
+
+Helpers to store the columns of a Boolean matrix as packed uint64 bitsets. Bit `i` of word `i // 64` of a column is set when row `i` contains the item, so the number of rows containing an itemset is the popcount of the AND of its columns.
+"""
+
+import numpy as np
+
+WORD_BITS = 64
+
+# Number of set bits of every byte value, used when NumPy has no native popcount
+_BYTE_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def num_words(num_rows):
+    """
+    Number of uint64 words needed to store `num_rows` bits.
+    """
+    return (num_rows + WORD_BITS - 1) // WORD_BITS
+
+
+def pack_columns(matrix):
+    """
+    Pack a (rows x columns) Boolean matrix into a (columns x words) uint64 bitset array.
+    """
+    matrix = np.asarray(matrix, dtype=bool)
+    num_rows, num_columns = matrix.shape
+
+    packed = np.packbits(matrix.T, axis=1, bitorder="little")
+    padded = np.zeros((num_columns, num_words(num_rows) * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+
+    return padded.view("<u8")
+
+
+def unpack_columns(bitsets, num_rows):
+    """
+    Unpack a (columns x words) bitset array into a (rows x columns) Boolean matrix.
+    """
+    bitsets = np.ascontiguousarray(bitsets, dtype="<u8")
+    unpacked = np.unpackbits(bitsets.view(np.uint8), axis=1, count=num_rows, bitorder="little")
+
+    return unpacked.T.astype(bool)
+
+
+def popcount(words):
+    """
+    Count the set bits of a uint64 array along its last axis.
+    """
+    words = np.asarray(words, dtype=np.uint64)
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def first_set_bit(words):
+    """
+    Index of the lowest set bit of a uint64 array along its last axis, or -1 where no bit is set.
+    """
+    words = np.asarray(words, dtype=np.uint64)
+
+    nonzero = words != 0
+    first_word = np.argmax(nonzero, axis=-1)
+    word = np.take_along_axis(words, first_word[..., None], axis=-1)[..., 0]
+
+    # Isolate the lowest set bit, whose base 2 logarithm is exact in floating point
+    lowest = word & (~word + np.uint64(1))
+    bit = np.log2(np.maximum(lowest, np.uint64(1)).astype(np.float64)).astype(np.int64)
+
+    return np.where(nonzero.any(axis=-1), first_word * WORD_BITS + bit, -1)
+
+
+def intersect(bitsets, item_indices):
+    """
+    AND the bitsets of several items together, returning the bitset of the rows that contain all of them.
+    """
+    return np.bitwise_and.reduce(bitsets[list(item_indices)], axis=0)
+
+
+def group_itemsets(itemsets):
+    """
+    Group a sequence of item index sequences by length.
+
+    Returns a list of (positions, indices) pairs, where `positions` are the positions of the itemsets of one length in the sequence and `indices` is the (itemsets x length) array of their items.
+    """
+    by_length = {}
+    for position, itemset in enumerate(itemsets):
+        by_length.setdefault(len(itemset), []).append(position)
+
+    return [
+        (np.array(positions), np.array([list(itemsets[position]) for position in positions], dtype=np.intp).reshape(len(positions), length))
+        for length, positions in by_length.items()
+    ]
+
+
+def count_grouped(bitsets, groups, num_itemsets, batch_words=2 ** 24):
+    """
+    Count the rows containing each itemset of the groups returned by `group_itemsets`.
+
+    The bitsets of the items of each group are gathered into a (itemsets x length x words) array, ANDed along the item axis and popcounted. `batch_words` bounds the number of words gathered at once.
+    """
+    counts = np.zeros(num_itemsets, dtype=np.int64)
+
+    for positions, indices in groups:
+        batch_size = max(1, batch_words // (max(indices.shape[1], 1) * max(bitsets.shape[1], 1)))
+        for start in range(0, len(positions), batch_size):
+            batch = indices[start:start + batch_size]
+            counts[positions[start:start + batch_size]] = popcount(np.bitwise_and.reduce(bitsets[batch], axis=1))
+
+    return counts
+
+
+def count_itemsets(bitsets, itemsets, batch_words=2 ** 24):
+    """
+    Count the rows containing each itemset, given as a sequence of item index sequences, in batches of equal itemset length.
+    """
+    return count_grouped(bitsets, group_itemsets(itemsets), len(itemsets), batch_words)
+
+
+def count_prefix_tree(bitsets, itemsets):
+    """
+    Count the rows containing each itemset, given as a sequence of sorted item index tuples, sharing the work of common prefixes.
+
+    The itemsets are arranged in a prefix tree and counted depth first: the bitset of each prefix is computed once, and the extensions of a prefix are ANDed with it and popcounted in a single vectorized call. This is much cheaper than `count_itemsets` for large, downward-closed collections such as candidate itemsets.
+    """
+    counts = np.zeros(len(itemsets), dtype=np.int64)
+
+    # Prefix tree: each node maps an item to its (position in `itemsets` or -1, child node)
+    root = {}
+    for position, itemset in enumerate(itemsets):
+        node = root
+        for depth, item in enumerate(itemset):
+            entry = node.setdefault(item, [-1, {}])
+            if depth == len(itemset) - 1:
+                entry[0] = position
+            node = entry[1]
+
+    def visit(node, prefix_bitset):
+        items = list(node)
+        extended = bitsets[items] if prefix_bitset is None else bitsets[items] & prefix_bitset
+        extended_counts = popcount(extended)
+
+        for index, item in enumerate(items):
+            position, children = node[item]
+            if position >= 0:
+                counts[position] = extended_counts[index]
+            if children:
+                visit(children, extended[index])
+
+    if root:
+        visit(root, None)
+
+    return counts
@@ -0,0 +1,166 @@
+"""
+Packed Boolean Data Files.
+
+Binary format for the itemized 0/1 matrix produced by `feature_itemization.py`, readable through `np.memmap` without parsing or copying. A `.bits` file contains:
+    - An 8-byte magic string (`BOOLBITS`) and the length of the header as a little-endian uint64.
+    - A JSON header with the number of rows, the number of uint64 words per column and the column names.
+    - Padding up to a 64-byte boundary, followed by one packed bitset per column, in the layout of `bitsets.py` (bit `i` of word `i // 64` is set when row `i` contains the item).
+
+The bitsets can be used directly by the bitset miners (see `eclat.py`), and unpacked into a Boolean matrix when a DataFrame is needed. Several processes mapping the same file share its pages instead of each holding a copy.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from bitsets import WORD_BITS, num_words, pack_columns, unpack_columns
+
+MAGIC = b"BOOLBITS"
+ALIGNMENT = 64
+
+# Number of rows packed into column bitsets at a time by `PackedWriter.close` (a multiple of 64)
+block_rows = 2 ** 16
+
+
+def write_packed(df, path):
+    """
+    Write a 0/1 (or Boolean) DataFrame to a packed `.bits` file, one column at a time.
+    """
+    with open(path, "wb") as file:
+        words = _write_header(file, len(df), df.columns)
+
+        for column in df.columns:
+            packed = np.zeros(words * 8, dtype=np.uint8)
+            bits = np.packbits(df[column].to_numpy() == 1, bitorder="little")
+            packed[:len(bits)] = bits
+            file.write(packed.tobytes())
+
+
+def _write_header(file, num_rows, columns):
+    """
+    Write the magic string and the padded JSON header of a `.bits` file, returning the number of words per column.
+    """
+    words = num_words(num_rows)
+
+    header = json.dumps({"num_rows": num_rows, "words": words, "columns": [str(column) for column in columns]}).encode()
+    offset = len(MAGIC) + 8 + len(header)
+    padding = -offset % ALIGNMENT
+
+    file.write(MAGIC)
+    file.write(np.uint64(len(header) + padding).astype("<u8").tobytes())
+    file.write(header)
+    file.write(b" " * padding)
+
+    return words
+
+
+class PackedWriter:
+    """
+    Write a packed `.bits` file from 0/1 (or Boolean) DataFrames appended one batch at a time.
+
+    The number of rows is only known once every batch is appended, while the file stores one bitset per column, so the batches are first spooled row-wise (one bit per cell) to a temporary file next to the output. `close` then packs them into column bitsets `block_rows` rows at a time, so only one block is ever held in memory, and moves the finished file into place. `abort` discards the batches instead, so a failed run never leaves a truncated file that would load as complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = None
+        self.num_rows = 0
+        self._spool_path = f"{path}.{os.getpid()}.rows"
+        self._temporary_path = f"{path}.{os.getpid()}.tmp"
+        self._spool = open(self._spool_path, "wb")
+
+    def append(self, df):
+        """
+        Spool a batch of rows. Every batch must have the columns of the first one.
+        """
+        columns = [str(column) for column in df.columns]
+        if self.columns is None:
+            self.columns = columns
+        elif columns != self.columns:
+            raise ValueError("Batches must have the same columns.")
+
+        self._spool.write(np.packbits(df.to_numpy() == 1, axis=1, bitorder="little").tobytes())
+        self.num_rows += len(df)
+
+    def close(self):
+        """
+        Write the packed file from the spooled rows and remove the temporary files.
+        """
+        self._spool.close()
+        columns = self.columns or []
+        row_bytes = (len(columns) + 7) // 8
+
+        try:
+            with open(self._temporary_path, "wb") as file:
+                words = _write_header(file, self.num_rows, columns)
+                data_offset = file.tell()
+                file.truncate(data_offset + len(columns) * words * 8)
+
+            if self.num_rows and columns:
+                rows = np.memmap(self._spool_path, dtype=np.uint8, mode="r", shape=(self.num_rows, row_bytes))
+                bitsets = np.memmap(self._temporary_path, dtype="<u8", mode="r+", offset=data_offset, shape=(len(columns), words))
+
+                for start in range(0, self.num_rows, block_rows):
+                    block = np.unpackbits(rows[start:start + block_rows], axis=1, count=len(columns), bitorder="little")
+                    packed = pack_columns(block.astype(bool))
+                    bitsets[:, start // WORD_BITS:start // WORD_BITS + packed.shape[1]] = packed
+
+                bitsets.flush()
+                del rows, bitsets
+
+            os.replace(self._temporary_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+        os.remove(self._spool_path)
+
+    def abort(self):
+        """
+        Discard the spooled rows, and remove the packed file at the output path so an older file is not taken for the output of this run.
+        """
+        self._spool.close()
+        for path in (self._spool_path, self._temporary_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def open_packed(path):
+    """
+    Memory-map a packed `.bits` file.
+
+    Returns the read-only (columns x words) uint64 bitset view, the column names and the number of rows.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a packed Boolean data file.")
+        header_length = int(np.frombuffer(file.read(8), dtype="<u8")[0])
+        header = json.loads(file.read(header_length))
+
+    columns = header["columns"]
+    bitsets = np.memmap(
+        path, dtype="<u8", mode="r",
+        offset=len(MAGIC) + 8 + header_length,
+        shape=(len(columns), header["words"])
+    )
+
+    return bitsets, columns, header["num_rows"]
+
+
+def read_packed(path):
+    """
+    Read a packed `.bits` file into a Boolean DataFrame.
+    """
+    bitsets, columns, num_rows = open_packed(path)
+    return pd.DataFrame(unpack_columns(bitsets, num_rows), columns=columns, copy=False)
+
+
+def load_boolean_data(path):
+    """
+    Load the Boolean data from either a packed `.bits` file or a CSV file.
+    """
+    if str(path).endswith(".bits"):
+        return read_packed(path)
+    return pd.read_csv(path)
@@ -0,0 +1,217 @@
+"""
+Closed Frequent Itemset Mining.
+
+A frequent itemset is closed when none of its supersets has the same support. The closed itemsets are a lossless summary of the frequent itemsets: an itemset is frequent if and only if it is contained in a closed itemset, and its support is the highest support of the closed itemsets containing it. On correlated data there are far fewer closed itemsets than frequent itemsets, nearly as few as maximal itemsets (which lose the supports of their subsets).
+
+Closed itemsets are mined on packed uint64 bitsets (see `bitsets.py`) by closure extension, as in LCM (Uno et al., 2004): each closed itemset is extended with one item at a time, the closure of the extension is the set of items whose bitset contains all its rows (one vectorized AND and popcount over the items), and the extension is kept only if its closure adds no item preceding the new one. This prefix-preserving check generates every closed itemset exactly once, without keeping the closed itemsets found so far to test for subsumption as CHARM does.
+
+Rules are generated from the closed itemsets alone. The closed itemsets are sorted by decreasing support and each item stores the set of closed itemsets containing it as a bitset, so the support of an itemset is the support of the first closed itemset in the AND of the bitsets of its items. Antecedent -> consequent rules are enumerated on these bitsets like in `constrained_mining.py`, with exact supports and confidences. The lookups work on bitsets over the closed itemsets rather than over the rows, so they are cheapest when there are fewer closed itemsets than rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from bitsets import first_set_bit, group_itemsets, pack_columns, popcount
+
+
+def closed_itemsets_bitsets(bitsets, num_rows, min_support=0.5):
+    """
+    Mine the closed frequent itemsets of a (columns x words) bitset array.
+
+    Returns a list of (count, item index tuple) pairs, where count is the number of rows containing the itemset.
+    """
+    if min_support <= 0.0:
+        raise ValueError(f"`min_support` must be a positive number within the interval `(0, 1]`. Got {min_support}.")
+
+    closed = []
+
+    counts = popcount(bitsets)
+    items = np.flatnonzero(counts / num_rows >= min_support)
+    item_bitsets = bitsets[items]
+
+    def extend(itemset, rows, core):
+        # Extensions by the items after the core item that are not already in the itemset
+        candidates = np.flatnonzero(~itemset)
+        candidates = candidates[candidates > core]
+        if not len(candidates):
+            return
+
+        extended = item_bitsets[candidates] & rows
+        extended_counts = popcount(extended)
+
+        for position in np.flatnonzero(extended_counts / num_rows >= min_support):
+            item = candidates[position]
+            count = extended_counts[position]
+
+            # Closure: the items contained in every row of the extension
+            closure = popcount(item_bitsets & extended[position]) == count
+
+            # Prefix-preserving check: the closure must not add any item preceding the new one
+            if (closure[:item] & ~itemset[:item]).any():
+                continue
+
+            closed.append((int(count), tuple(items[closure].tolist())))
+            extend(closure, extended[position], item)
+
+    # The closure of the empty itemset holds the items contained in every row
+    all_rows = pack_columns(np.ones((num_rows, 1), dtype=bool))[0]
+    root = counts[items] == num_rows
+    if root.any():
+        closed.append((num_rows, tuple(items[root].tolist())))
+
+    extend(root, all_rows, -1)
+
+    return closed
+
+
+def mine_closed(df, min_support=0.5, use_colnames=False):
+    """
+    Get closed frequent itemsets from a one-hot DataFrame.
+
+    Parameters and output follow mlxtend's `fpmax`: a DataFrame with the columns `support` and `itemsets`, where itemsets are frozensets of column indices, or of column names if `use_colnames` is True.
+    """
+    num_rows = len(df)
+    bitsets = pack_columns(df.to_numpy() == 1)
+
+    closed = closed_itemsets_bitsets(bitsets, num_rows, min_support=min_support)
+    closed.sort(key=lambda entry: len(entry[1]))
+
+    labels = df.columns if use_colnames else range(df.shape[1])
+    labels = list(labels)
+
+    return pd.DataFrame({
+        "support": [count / num_rows for count, _ in closed],
+        "itemsets": [frozenset(labels[item] for item in itemset) for _, itemset in closed]
+    })
+
+
+def _closed_index(closed_itemsets):
+    """
+    Index the closed itemsets of a `mine_closed` DataFrame for support lookups.
+
+    Returns the item labels, the supports of the closed itemsets by decreasing support, and the (items x words) bitset array of the closed itemsets containing each item.
+    """
+    order = np.argsort(-closed_itemsets["support"].to_numpy(dtype=float), kind="stable")
+    supports = closed_itemsets["support"].to_numpy(dtype=float)[order]
+    itemsets = closed_itemsets["itemsets"].to_numpy()[order]
+
+    labels = list(dict.fromkeys(item for itemset in itemsets for item in itemset))
+    label_index = {label: index for index, label in enumerate(labels)}
+
+    membership = np.zeros((len(itemsets), len(labels)), dtype=bool)
+    for position, itemset in enumerate(itemsets):
+        membership[position, [label_index[item] for item in itemset]] = True
+
+    return labels, supports, pack_columns(membership)
+
+
+def _lookup(supports, closed_bitsets):
+    """
+    Supports of the itemsets whose closed itemsets are given as bitsets: the support of the first (most frequent) one, or 0 if there is none.
+    """
+    first = first_set_bit(closed_bitsets)
+    return np.where(first >= 0, supports[np.maximum(first, 0)], 0.0)
+
+
+def itemset_supports(closed_itemsets, itemsets, batch_words=2 ** 24):
+    """
+    Supports of a sequence of itemsets, recovered from a `mine_closed` DataFrame. Infrequent itemsets get a support of 0.
+
+    The itemsets are looked up in batches of equal length, and `batch_words` bounds the number of words gathered at once, as in `bitsets.count_grouped`.
+    """
+    labels, supports, membership = _closed_index(closed_itemsets)
+    label_index = {label: index for index, label in enumerate(labels)}
+
+    itemsets = list(itemsets)
+    result = np.zeros(len(itemsets))
+
+    # Itemsets with an item of no closed itemset are infrequent
+    known = [position for position, itemset in enumerate(itemsets) if all(item in label_index for item in itemset)]
+    indices = [[label_index[item] for item in itemsets[position]] for position in known]
+
+    known = np.array(known, dtype=np.intp)
+    for positions, group in group_itemsets(indices):
+        batch_size = max(1, batch_words // (max(group.shape[1], 1) * max(membership.shape[1], 1)))
+        for start in range(0, len(positions), batch_size):
+            batch = group[start:start + batch_size]
+            result[known[positions[start:start + batch_size]]] = _lookup(supports, np.bitwise_and.reduce(membership[batch], axis=1))
+
+    return result
+
+
+def closed_association_rules(closed_itemsets, min_confidence=0.0, antecedent_prefix="inf_", consequent_prefix="usr_"):
+    """
+    Generate the antecedent -> consequent rules of a `mine_closed` DataFrame with labelled itemsets.
+
+    Antecedent itemsets A are enumerated depth-first, and under each of them consequent itemsets C while the confidence reaches `min_confidence`, since it can only decrease as C grows. Returns a DataFrame with the columns `antecedents`, `consequents`, `antecedent support`, `consequent support`, `support` and `confidence`, like `constrained_association_rules`.
+    """
+    labels, supports, membership = _closed_index(closed_itemsets)
+    rows = []
+
+    antecedent_items = np.array([index for index, label in enumerate(labels) if str(label).startswith(antecedent_prefix)], dtype=np.intp)
+    consequent_items = np.array([index for index, label in enumerate(labels) if str(label).startswith(consequent_prefix)], dtype=np.intp)
+
+    def extend_consequents(antecedent, antecedent_support, prefix, class_items, class_bitsets, class_supports, consequent_bitsets):
+        consequent_supports = _lookup(supports, consequent_bitsets)
+
+        for position, item in enumerate(class_items):
+            consequent = prefix + (int(item),)
+            rows.append((antecedent, consequent, antecedent_support, consequent_supports[position], class_supports[position]))
+
+            if position + 1 == len(class_items):
+                continue
+
+            joined = class_bitsets[position + 1:] & class_bitsets[position]
+            joined_supports = _lookup(supports, joined)
+            keep = (joined_supports > 0) & (joined_supports / antecedent_support >= min_confidence)
+
+            if keep.any():
+                extend_consequents(antecedent, antecedent_support, consequent, class_items[position + 1:][keep], joined[keep], joined_supports[keep],
+                                   (consequent_bitsets[position + 1:] & consequent_bitsets[position])[keep])
+
+    def extend_antecedents(prefix, class_items, class_bitsets, class_supports, live_consequents):
+        for position, item in enumerate(class_items):
+            antecedent = prefix + (int(item),)
+            antecedent_bitset = class_bitsets[position]
+            antecedent_support = class_supports[position]
+
+            # Consequent items that are still frequent together with this antecedent
+            joined = membership[live_consequents] & antecedent_bitset
+            joined_supports = _lookup(supports, joined)
+            live = joined_supports > 0
+
+            if not live.any():
+                continue
+
+            confident = live & (joined_supports / antecedent_support >= min_confidence)
+            if confident.any():
+                extend_consequents(antecedent, antecedent_support, (), live_consequents[confident], joined[confident], joined_supports[confident],
+                                   membership[live_consequents[confident]])
+
+            if position + 1 == len(class_items):
+                continue
+
+            extended = class_bitsets[position + 1:] & antecedent_bitset
+            extended_supports = _lookup(supports, extended)
+            keep = extended_supports > 0
+
+            if keep.any():
+                extend_antecedents(antecedent, class_items[position + 1:][keep], extended[keep], extended_supports[keep], live_consequents[live])
+
+    if len(antecedent_items) and len(consequent_items):
+        extend_antecedents((), antecedent_items, membership[antecedent_items], _lookup(supports, membership[antecedent_items]), consequent_items)
+
+    return pd.DataFrame(
+        [
+            (
+                frozenset(labels[item] for item in antecedent),
+                frozenset(labels[item] for item in consequent),
+                antecedent_support,
+                consequent_support,
+                support,
+                support / antecedent_support
+            )
+            for antecedent, consequent, antecedent_support, consequent_support, support in rows
+        ],
+        columns=["antecedents", "consequents", "antecedent support", "consequent support", "support", "confidence"]
+    )
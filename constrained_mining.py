@@ -0,0 +1,155 @@
+"""
+Constrained Mining of Antecedent -> Consequent Rules.
+
+The training scripts only keep rules whose antecedents are all `inf_*` items and whose consequents are all `usr_*` items. This module pushes that constraint into the mining stage, working on packed uint64 bitsets (see `bitsets.py`):
+    - Items belonging to neither prefix class are discarded before mining.
+    - Antecedent itemsets A are enumerated depth-first (Eclat style). Under each of them, consequent itemsets C are enumerated on the rows containing A, with a joint threshold of max(min_support, min_confidence * support(A)), since both support and confidence are anti-monotone in C for a fixed A.
+    - An antecedent itemset is only extended while some single consequent item is still frequent with it, and its extensions only consider those consequent items.
+
+Every valid itemset A ∪ C has exactly one valid split, so rules are generated without enumerating the other antecedent/consequent partitions. The final rule set is the same as mining every frequent itemset, calling `association_rules` and filtering the rules afterwards.
+"""
+
+import numpy as np
+import pandas as pd
+
+from bitsets import pack_columns, popcount
+from rule_evaluation import itemset_counts
+
+
+def _class_items(columns, prefix):
+    """
+    Indices of the columns whose name starts with the given prefix.
+    """
+    return np.array([index for index, column in enumerate(columns) if str(column).startswith(prefix)], dtype=np.intp)
+
+
+def constrained_itemsets_bitsets(bitsets, num_rows, antecedent_items, consequent_items, min_support, min_confidence=0.0, max_len=None):
+    """
+    Mine the (antecedent, consequent) pairs of item indices whose union is frequent and whose confidence reaches `min_confidence`.
+
+    Returns a list of (joint count, antecedent count, antecedent tuple, consequent tuple).
+    """
+    if min_support <= 0.0:
+        raise ValueError(f"`min_support` must be a positive number within the interval `(0, 1]`. Got {min_support}.")
+
+    pairs = []
+
+    def frequent(counts):
+        return counts / num_rows >= min_support
+
+    def extend_consequents(antecedent, antecedent_count, prefix, class_items, class_bitsets, class_counts):
+        for position, item in enumerate(class_items):
+            consequent = prefix + (int(item),)
+            pairs.append((int(class_counts[position]), antecedent_count, antecedent, consequent))
+
+            if max_len is not None and len(antecedent) + len(consequent) >= max_len:
+                continue
+            if position + 1 == len(class_items):
+                continue
+
+            joined = class_bitsets[position + 1:] & class_bitsets[position]
+            joined_counts = popcount(joined)
+            keep = frequent(joined_counts) & ((joined_counts / num_rows) / (antecedent_count / num_rows) >= min_confidence)
+
+            if keep.any():
+                extend_consequents(antecedent, antecedent_count, consequent, class_items[position + 1:][keep], joined[keep], joined_counts[keep])
+
+    def extend_antecedents(prefix, class_items, class_bitsets, class_counts, live_consequents):
+        for position, item in enumerate(class_items):
+            antecedent = prefix + (int(item),)
+            antecedent_bitset = class_bitsets[position]
+            antecedent_count = int(class_counts[position])
+
+            # Consequent items that are still frequent together with this antecedent
+            joined = bitsets[live_consequents] & antecedent_bitset
+            joined_counts = popcount(joined)
+            live = frequent(joined_counts)
+
+            if not live.any():
+                continue
+
+            confident = live & ((joined_counts / num_rows) / (antecedent_count / num_rows) >= min_confidence)
+            if confident.any():
+                extend_consequents(antecedent, antecedent_count, (), live_consequents[confident], joined[confident], joined_counts[confident])
+
+            if max_len is not None and len(antecedent) + 1 >= max_len:
+                continue
+            if position + 1 == len(class_items):
+                continue
+
+            extended = class_bitsets[position + 1:] & antecedent_bitset
+            extended_counts = popcount(extended)
+            keep = frequent(extended_counts)
+
+            if keep.any():
+                extend_antecedents(antecedent, class_items[position + 1:][keep], extended[keep], extended_counts[keep], live_consequents[live])
+
+    counts = popcount(bitsets)
+    antecedent_items = antecedent_items[frequent(counts[antecedent_items])]
+    consequent_items = consequent_items[frequent(counts[consequent_items])]
+
+    # Process antecedent items by increasing support, which keeps the equivalence classes small
+    antecedent_items = antecedent_items[np.argsort(counts[antecedent_items], kind="stable")]
+
+    extend_antecedents((), antecedent_items, bitsets[antecedent_items], counts[antecedent_items], consequent_items)
+
+    return pairs
+
+
+def mine_constrained(df, min_support, min_confidence=0.0, antecedent_prefix="inf_", consequent_prefix="usr_", max_len=None):
+    """
+    Get the frequent itemsets needed for antecedent -> consequent rules from a one-hot DataFrame.
+
+    Returns a DataFrame with the columns `support` and `itemsets` (frozensets of column names), like mlxtend's miners. It contains every itemset that yields a valid rule, together with the antecedent and consequent itemsets of those rules, so it can be passed to `constrained_association_rules`.
+    """
+    num_rows = len(df)
+    columns = list(df.columns)
+    bitsets = pack_columns(df.to_numpy() == 1)
+
+    pairs = constrained_itemsets_bitsets(
+        bitsets, num_rows,
+        _class_items(columns, antecedent_prefix), _class_items(columns, consequent_prefix),
+        min_support, min_confidence=min_confidence, max_len=max_len
+    )
+
+    supports = {}
+    for joint_count, antecedent_count, antecedent, consequent in pairs:
+        antecedent = frozenset(columns[item] for item in antecedent)
+        consequent = frozenset(columns[item] for item in consequent)
+        supports[antecedent | consequent] = joint_count
+        supports[antecedent] = antecedent_count
+        supports.setdefault(consequent, None)
+
+    # Consequent supports are counted over all rows, in one batch
+    consequents = [itemset for itemset, count in supports.items() if count is None]
+    column_index = {column: index for index, column in enumerate(columns)}
+    for itemset, count in zip(consequents, itemset_counts(consequents, bitsets, column_index)):
+        supports[itemset] = int(count)
+
+    return pd.DataFrame({
+        "support": [count / num_rows for count in supports.values()],
+        "itemsets": list(supports.keys())
+    })
+
+
+def constrained_association_rules(frequent_itemsets, min_confidence=0.0, antecedent_prefix="inf_", consequent_prefix="usr_"):
+    """
+    Generate the antecedent -> consequent rules of a `frequent_itemsets` DataFrame.
+
+    Each itemset made only of antecedent-class and consequent-class items, with at least one of each, yields the single rule that splits it by class. The supports of the antecedents and consequents are looked up in the DataFrame. Returns a DataFrame with the columns `antecedents`, `consequents`, `antecedent support`, `consequent support`, `support` and `confidence`.
+    """
+    supports = dict(zip(frequent_itemsets["itemsets"], frequent_itemsets["support"]))
+    rows = []
+
+    for itemset, support in supports.items():
+        antecedent = frozenset(item for item in itemset if str(item).startswith(antecedent_prefix))
+        consequent = frozenset(item for item in itemset if str(item).startswith(consequent_prefix))
+
+        if not antecedent or not consequent or len(antecedent) + len(consequent) != len(itemset):
+            continue
+
+        confidence = support / supports[antecedent]
+        if confidence >= min_confidence:
+            rows.append((antecedent, consequent, supports[antecedent], supports[consequent], support, confidence))
+
+    return pd.DataFrame(rows, columns=["antecedents", "consequents", "antecedent support", "consequent support", "support", "confidence"])
@@ -1,5 +1,7 @@
 import pandas as pd
 import time
+from emotion_features import binarize_emotions
+from instrumentation import Profiler
 
 # Start time to measure the duration of the script
 start_time = time.time()
@@ -11,11 +13,13 @@ This script loads and preprocesses data from CSV files for influencers and users
 1. Loads influencer data and renames columns with an 'inf_' prefix.
 2. Loads user data and renames columns with a 'usr_' prefix.
 3. Optionally loads and aggregates profile data if `profile_information` is set to True.
-4. Converts the 'emotions2' column in the user data to binary features.
+4. Converts the 'emotions2' column in the user data to binary features, matching each emotion as an exact token in a single pass.
 5. Merges the dataframes based on common columns.
 6. Removes columns with unique values, renames certain columns, and creates new features.
 7. Saves the processed dataframe to a CSV file.
 
+Each step is measured as a stage of a run report saved as JSON (see `instrumentation.py`).
+
 Parameters to be adjusted:
     - `influencers_file`: Path to the influencers CSV file.
     - `users_file`: Path to the users CSV file.
@@ -26,6 +30,9 @@ Parameters to be adjusted:
     - `relevant_columns_influencers`: List of columns to load from the influencers CSV file.
     - `relevant_columns_users`: List of columns to load from the users CSV file.
     - `relevant_columns_user_profile`: List of columns to load from the user profile CSV file.
+    - `run_report_dir`: Directory where the JSON run report is saved.
+    - `trace_memory`: Set to True to record the peak Python memory of each stage with tracemalloc (slower).
+    - `cprofile_stages`: Names of the stages to capture with cProfile, e.g. ['merge'].
 """
 
 # Parameters to be adjusted
@@ -35,6 +42,9 @@ profile_file = "path/to/Profile.csv"
 output_file_with_profile = "path/to/All_Data_with_profile.csv"
 output_file_without_profile = "path/to/All_Data.csv"
 profile_information = False
+run_report_dir = "path/to/profiles"
+trace_memory = False
+cprofile_stages = []
 
 relevant_columns_influencers = [
     'id', 'valence_score', 'num_moral_words',
@@ -64,43 +74,61 @@ relevant_columns_user_profile = [
     'username'
 ]
 
+profiler = Profiler("data_preprocessing", run_report_dir, trace_memory, cprofile_stages,
+                    parameters={"profile_information": profile_information})
+
 ### 1. LOAD ALL THE DATA ###
 
+profiler.start("load")
+
+profiler.start("read_influencers")
 influencers_df = pd.read_csv(influencers_file, usecols=relevant_columns_influencers)
+profiler.stop(rows=len(influencers_df), columns=len(influencers_df.columns))
 
 # Rename the columns by adding the 'inf_' prefix except for 'id'
 influencers_df.columns = ['inf_' + col if col != 'id' else col for col in influencers_df.columns]
 
+profiler.start("read_users")
 users_df = pd.read_csv(users_file, usecols=relevant_columns_users)
+profiler.stop(rows=len(users_df), columns=len(users_df.columns))
 
 # Rename the columns by adding the 'usr_' prefix except for 'conversation_id' and 'username'
 users_df.columns = ['usr_' + col if col not in ['conversation_id', 'username'] else col for col in users_df.columns]
 
 # Load the DataFrame from "Profile.csv" if profile information is required
 if profile_information:
+    profiler.start("read_profile")
     profile_df = pd.read_csv(profile_file, usecols=relevant_columns_user_profile)
+    profiler.stop(rows=len(profile_df), columns=len(profile_df.columns))
+
+profiler.stop()
 
 ### 2. EXTRACT AND CONVERT EMOTIONS2 COLUMN TO BINARY FEATURES ###
 
+profiler.start("emotions")
+
 # Drop the row with index 125782
 users_df = users_df.drop(index=125782)
 
-# Extract all unique emotions from the 'emotions2' column
-emotions = set()
-users_df['usr_emotions2'].str.split().apply(emotions.update)
+# Create a binary column for each unique emotion in the 'emotions2' column
+users_df = pd.concat([users_df, binarize_emotions(users_df['usr_emotions2'])], axis=1)
 
-# Create a binary column for each unique emotion
-for emotion in emotions:
-    users_df['usr_emotion_' + emotion] = users_df['usr_emotions2'].str.contains(emotion).astype(int)
+profiler.stop(rows=len(users_df), columns=len(users_df.columns))
 
 ### 3. AGGREGATE PROFILE DATA ###
 
 if profile_information:
+    profiler.start("aggregate_profile")
+
     # Aggregate the 'Profile' DataFrame by 'username'
     profile_agg_df = profile_df.groupby('username').mean().reset_index()
 
+    profiler.stop(rows=len(profile_agg_df))
+
 ### 4. MERGE DATAFRAMES ###
 
+profiler.start("merge")
+
 if profile_information:
     # Merge 'influencers_df' and 'users_df' on 'id' and 'conversation_id'
     merged_df = pd.merge(influencers_df, users_df, how='left', left_on='id', right_on='conversation_id')
@@ -110,10 +138,16 @@ if profile_information:
 else:
     all_data = pd.merge(influencers_df, users_df, how='left', left_on='id', right_on='conversation_id')
 
+profiler.stop(rows=len(all_data), columns=len(all_data.columns))
+
 ### 5. RENAME AND DROP COLUMNS ###
 
+profiler.start("clean_columns")
+
 # Remove columns with unique values
+profiler.start("unique_values")
 unique_value_columns = all_data.columns[all_data.nunique() == 1]
+profiler.stop(columns=len(unique_value_columns))
 
 if len(unique_value_columns) > 0:
     print(f"Columns removed due to having a unique value: {', '.join(unique_value_columns)}")
@@ -145,11 +179,17 @@ if profile_information:
 # Drop columns
 all_data.drop(columns=['id', 'username', 'conversation_id', 'usr_ethos', 'usr_emotions2'], inplace=True)
 
+profiler.stop(rows=len(all_data), columns=len(all_data.columns))
+
 ### 6. SAVE THE FINAL DATA ###
 
 # Save the final DataFrame to a new CSV file
+profiler.start("save")
 output_file = output_file_with_profile if profile_information else output_file_without_profile
 all_data.to_csv(output_file, index=False)
+profiler.stop(rows=len(all_data), columns=len(all_data.columns))
+
+print(f"Run report saved to {profiler.save()}")
 
 end_time = time.time()
 print("Execution time: {:.2f} seconds".format(end_time - start_time))
\ No newline at end of file
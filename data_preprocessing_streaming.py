@@ -0,0 +1,224 @@
+import os
+import pandas as pd
+import time
+from emotion_features import binarize_emotions, emotion_vocabulary
+
+# Start time to measure the duration of the script
+start_time = time.time()
+
+"""
+Streaming Data Preprocessing Script.
+
+This script produces the same output as `data_preprocessing.py`, reading the users data in chunks so that peak memory is bounded by the chunk size instead of the size of the dataset. It performs the following steps:
+1. Loads the influencer data, which is much smaller, as an in-memory index, and optionally aggregates the profile data by 'username' from per-chunk sums and counts.
+2. Scans the 'emotions2' column of the user data to collect the set of emotions, so every chunk gets the same binary columns.
+3. Reads the user data in chunks, converts 'emotions2' to binary features (matching each emotion as an exact token), joins each chunk with the influencer index (and the profile aggregate) and appends it to a temporary CSV file, keeping streaming statistics of the values of each column. Influencers without any user are appended at the end, as a left merge would keep them.
+4. Reads the temporary file in chunks, removes the columns with a unique value, renames certain columns, creates new features and appends each chunk to the output CSV file.
+
+Parameters to be adjusted:
+    - `influencers_file`: Path to the influencers CSV file.
+    - `users_file`: Path to the users CSV file.
+    - `profile_file`: Path to the profile CSV file (optional).
+    - `output_file_with_profile`: Path to the output CSV file with profile data.
+    - `output_file_without_profile`: Path to the output CSV file without profile data.
+    - `profile_information` to include or exclude profile data processing.
+    - `chunk_size`: Number of rows read at a time from the users, profile and temporary files.
+    - `relevant_columns_influencers`: List of columns to load from the influencers CSV file.
+    - `relevant_columns_users`: List of columns to load from the users CSV file.
+    - `relevant_columns_user_profile`: List of columns to load from the user profile CSV file.
+
+Note:
+    The rows are written in the order of the users file, followed by the influencers without users, instead of being grouped by influencer.
+"""
+
+# Parameters to be adjusted
+influencers_file = "path/to/Influencers.csv"
+users_file = "path/to/Users.csv"
+profile_file = "path/to/Profile.csv"
+output_file_with_profile = "path/to/All_Data_with_profile.csv"
+output_file_without_profile = "path/to/All_Data.csv"
+profile_information = False
+chunk_size = 100000
+
+relevant_columns_influencers = [
+    'id', 'valence_score', 'num_moral_words',
+    'num_polar_words', 'num_mfd_care_virtue',
+    'num_mfd_care_vice', 'num_mfd_fairness_virtue',
+    'num_mfd_fairness_vice', 'num_mfd_loyalty_virtue',
+    'num_mfd_loyalty_vice', 'num_mfd_authority_virtue',
+    'num_mfd_authority_vice', 'num_mfd_sanctity_virtue',
+    'num_mfd_sanctity_vice'
+]
+
+relevant_columns_users = [
+    'conversation_id', 'username',
+    'valence_score', 'ethos',
+    'abusive_words_ratio', 'num_moral_words',
+    'num_polar_words', 'num_mfd_care_virtue',
+    'num_mfd_care_vice', 'num_mfd_fairness_virtue',
+    'num_mfd_fairness_vice', 'num_mfd_loyalty_virtue',
+    'num_mfd_loyalty_vice', 'num_mfd_authority_virtue',
+    'num_mfd_authority_vice', 'num_mfd_sanctity_virtue',
+    'num_mfd_sanctity_vice', 'emotions2'
+]
+
+relevant_columns_user_profile = [
+    'negative_words_ratio', 'positive_words_ratio',
+    'moral_words_ratio', 'polar_words_ratio',
+    'username'
+]
+
+output_file = output_file_with_profile if profile_information else output_file_without_profile
+temporary_file = output_file + ".tmp"
+
+### 1. LOAD THE INFLUENCER INDEX AND AGGREGATE PROFILE DATA ###
+
+influencers_df = pd.read_csv(influencers_file, usecols=relevant_columns_influencers)
+
+# Rename the columns by adding the 'inf_' prefix except for 'id'
+influencers_df.columns = ['inf_' + col if col != 'id' else col for col in influencers_df.columns]
+
+if profile_information:
+    # Aggregate the 'Profile' data by 'username', accumulating the sums and counts of each chunk
+    profile_sums = None
+    profile_counts = None
+
+    for profile_chunk in pd.read_csv(profile_file, usecols=relevant_columns_user_profile, chunksize=chunk_size):
+        grouped = profile_chunk.groupby('username')
+        chunk_sums, chunk_counts = grouped.sum(), grouped.count()
+
+        if profile_sums is None:
+            profile_sums, profile_counts = chunk_sums, chunk_counts
+        else:
+            profile_sums = profile_sums.add(chunk_sums, fill_value=0)
+            profile_counts = profile_counts.add(chunk_counts, fill_value=0)
+
+    profile_agg_df = (profile_sums / profile_counts).reset_index()
+
+### 2. COLLECT THE EMOTIONS ###
+
+# Extract all unique emotions from the 'emotions2' column, skipping the row with index 125782
+emotions = set()
+for emotions_chunk in pd.read_csv(users_file, usecols=['emotions2'], chunksize=chunk_size):
+    emotions_chunk = emotions_chunk.drop(index=125782, errors='ignore')
+    emotions.update(emotion_vocabulary(emotions_chunk['emotions2']))
+
+emotions = sorted(emotions)
+
+### 3. CONVERT EMOTIONS AND MERGE EACH CHUNK ###
+
+# Streaming statistics to find the columns with a unique value: first non-null value of each column, and columns with more than one value
+first_values = {}
+varying_columns = set()
+
+
+def update_value_statistics(chunk):
+    """
+    Update the streaming statistics of the values of each column with a chunk.
+    """
+    for column in chunk.columns:
+        if column in varying_columns:
+            continue
+
+        values = chunk[column].dropna()
+        if values.empty:
+            continue
+
+        first_value = first_values.setdefault(column, values.iloc[0])
+        if (values != first_value).any():
+            varying_columns.add(column)
+
+
+def append_merged_chunk(merged_chunk, header):
+    """
+    Join a merged chunk with the profile aggregate if required, update the statistics and append it to the temporary file.
+    """
+    if profile_information:
+        # Merge with 'profile_agg_df' using 'username' as the merging column, fill NaN values with 0
+        merged_chunk = pd.merge(merged_chunk, profile_agg_df, how='left', on='username').fillna(0)
+
+    update_value_statistics(merged_chunk)
+    merged_chunk.to_csv(temporary_file, mode='w' if header else 'a', header=header, index=False)
+
+
+def merge_users_chunk(users_chunk):
+    """
+    Convert the emotions of a users chunk and join it with the influencers it replies to.
+    """
+    # Rename the columns by adding the 'usr_' prefix except for 'conversation_id' and 'username'
+    users_chunk.columns = ['usr_' + col if col not in ['conversation_id', 'username'] else col for col in users_chunk.columns]
+
+    # Drop the row with index 125782
+    users_chunk = users_chunk.drop(index=125782, errors='ignore')
+
+    # Create a binary column for each unique emotion
+    users_chunk = pd.concat([users_chunk, binarize_emotions(users_chunk['usr_emotions2'], emotions)], axis=1)
+
+    return pd.merge(influencers_df, users_chunk, how='inner', left_on='id', right_on='conversation_id')
+
+
+matched_ids = set()
+merged_columns = None
+
+for users_chunk in pd.read_csv(users_file, usecols=relevant_columns_users, chunksize=chunk_size):
+    merged_chunk = merge_users_chunk(users_chunk)
+    matched_ids.update(merged_chunk['id'])
+
+    append_merged_chunk(merged_chunk, header=merged_columns is None)
+    merged_columns = list(merged_chunk.columns)
+
+if merged_columns is None:
+    # A users file without data rows may yield no chunk: write the header of an empty merged chunk, so every influencer is kept with empty user columns
+    merged_chunk = merge_users_chunk(pd.DataFrame(columns=relevant_columns_users))
+    append_merged_chunk(merged_chunk, header=True)
+    merged_columns = list(merged_chunk.columns)
+
+# Influencers without any user keep a single row with empty user columns, as in a left merge
+unmatched_influencers = influencers_df[~influencers_df['id'].isin(matched_ids)].reindex(columns=merged_columns)
+unmatched_influencers = unmatched_influencers.astype({'username': object})
+append_merged_chunk(unmatched_influencers, header=False)
+
+### 4. RENAME AND DROP COLUMNS, AND SAVE THE FINAL DATA ###
+
+# Remove columns with unique values
+unique_value_columns = [column for column in first_values if column not in varying_columns]
+
+if len(unique_value_columns) > 0:
+    print(f"Columns removed due to having a unique value: {', '.join(unique_value_columns)}")
+
+for chunk_number, all_data in enumerate(pd.read_csv(temporary_file, chunksize=chunk_size)):
+    all_data = all_data.drop(columns=unique_value_columns)
+
+    # Create new features based on 'usr_ethos'
+    all_data['usr_ethos_attack'] = (all_data['usr_ethos'] == 'attack').astype(int)
+    all_data['usr_ethos_neutral'] = (all_data['usr_ethos'] == 'neutral').astype(int)
+    all_data['usr_ethos_support'] = (all_data['usr_ethos'] == 'support').astype(int)
+
+    # Rename columns to remove 'num_' prefix
+    all_data.rename(columns=lambda x: x.replace("num_mfd_", ""), inplace=True)
+
+    # Rename columns to remove '_density' suffix
+    all_data.columns = [col.replace('_density', '') for col in all_data.columns]
+
+    if profile_information:
+        # Rename the selected columns in profile_agg_df with 'profile_' prefix
+        all_data.rename(columns={
+            "negative_words_ratio": "inf_profile_negative_words_ratio",
+            "positive_words_ratio": "inf_profile_positive_words_ratio",
+            "moral_words_ratio": "inf_profile_moral_words_ratio",
+            "polar_words_ratio": "inf_profile_polar_words_ratio"
+        }, inplace=True)
+
+        # Select only the rows where not all columns starting with 'profile' are zero
+        all_data = all_data.loc[~(all_data.filter(regex='^inf_profile').eq(0).all(axis=1))]
+
+    # Drop columns
+    all_data.drop(columns=['id', 'username', 'conversation_id', 'usr_ethos', 'usr_emotions2'], inplace=True)
+
+    # Append the chunk to the final CSV file
+    all_data.to_csv(output_file, mode='w' if chunk_number == 0 else 'a', header=chunk_number == 0, index=False)
+
+os.remove(temporary_file)
+
+end_time = time.time()
+print("Execution time: {:.2f} seconds".format(end_time - start_time))
@@ -0,0 +1,72 @@
+"""
+Eclat Frequent Itemset Miner.
+
+Vertical Eclat implementation on packed uint64 bitsets (see `bitsets.py`). Each item keeps the set of rows containing it as a bitset, and the support of every extension of an itemset is obtained by ANDing its bitset with the bitsets of its right siblings and counting the set bits. Each equivalence class is processed with a single vectorized AND and popcount, and only the bitsets of the classes on the current search path are kept in memory.
+
+The output has the same shape as the `frequent_itemsets` DataFrame returned by mlxtend's `apriori`, `fpgrowth` and `fpmax`, so it can be passed directly to `association_rules`.
+"""
+
+import numpy as np
+import pandas as pd
+
+from bitsets import pack_columns, popcount
+
+
+def eclat_bitsets(bitsets, num_rows, min_support=0.5, max_len=None):
+    """
+    Mine the frequent itemsets of a (columns x words) bitset array.
+
+    Returns a list of (count, item index tuple) pairs, where count is the number of rows containing the itemset.
+    """
+    if min_support <= 0.0:
+        raise ValueError(f"`min_support` must be a positive number within the interval `(0, 1]`. Got {min_support}.")
+
+    frequent = []
+
+    counts = popcount(bitsets)
+    items = np.flatnonzero(counts / num_rows >= min_support)
+
+    # Process items by increasing support, which keeps the equivalence classes small
+    items = items[np.argsort(counts[items], kind="stable")]
+
+    def extend(prefix, class_items, class_bitsets, class_counts):
+        for position, item in enumerate(class_items):
+            itemset = prefix + (int(item),)
+            frequent.append((int(class_counts[position]), itemset))
+
+            if max_len is not None and len(itemset) >= max_len:
+                continue
+            if position + 1 == len(class_items):
+                continue
+
+            joined = class_bitsets[position + 1:] & class_bitsets[position]
+            joined_counts = popcount(joined)
+            keep = joined_counts / num_rows >= min_support
+
+            if keep.any():
+                extend(itemset, class_items[position + 1:][keep], joined[keep], joined_counts[keep])
+
+    extend((), items, bitsets[items], counts[items])
+
+    return frequent
+
+
+def eclat(df, min_support=0.5, use_colnames=False, max_len=None):
+    """
+    Get frequent itemsets from a one-hot DataFrame using the Eclat algorithm.
+
+    Parameters and output follow mlxtend's `apriori`: a DataFrame with the columns `support` and `itemsets`, where itemsets are frozensets of column indices, or of column names if `use_colnames` is True.
+    """
+    num_rows = len(df)
+    bitsets = pack_columns(df.to_numpy() == 1)
+
+    frequent = eclat_bitsets(bitsets, num_rows, min_support=min_support, max_len=max_len)
+    frequent.sort(key=lambda entry: len(entry[1]))
+
+    labels = df.columns if use_colnames else range(df.shape[1])
+    labels = list(labels)
+
+    return pd.DataFrame({
+        "support": [count / num_rows for count, _ in frequent],
+        "itemsets": [frozenset(labels[item] for item in itemset) for _, itemset in frequent]
+    })
@@ -0,0 +1,42 @@
+"""
+Emotion Features.
+
+Conversion of the whitespace-separated 'emotions2' labels of the user data to binary `usr_emotion_*` columns. The labels are tokenized once, and every (row, emotion) pair is set in an int8 indicator matrix in a single vectorized assignment, so the cost grows with the number of labels and not with the number of distinct emotions. Emotions are matched as exact tokens, so an emotion never matches inside a longer label.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def emotion_tokens(emotions):
+    """
+    Split a Series of whitespace-separated emotion labels into a Series of tokens indexed by row position.
+    """
+    return emotions.reset_index(drop=True).str.split().explode().dropna()
+
+
+def emotion_vocabulary(emotions):
+    """
+    Sorted list of the distinct emotions in a Series of emotion labels.
+    """
+    return sorted(emotion_tokens(emotions).unique())
+
+
+def binarize_emotions(emotions, vocabulary=None, prefix='usr_emotion_'):
+    """
+    Convert a Series of emotion labels to an int8 DataFrame with one indicator column per emotion of the vocabulary.
+
+    If no vocabulary is given, the distinct emotions of the Series are used. Emotions outside the vocabulary are ignored.
+    """
+    tokens = emotion_tokens(emotions)
+    if vocabulary is None:
+        vocabulary = sorted(tokens.unique())
+
+    codes = pd.Categorical(tokens, categories=vocabulary).codes
+    rows = tokens.index.to_numpy()
+    known = codes >= 0
+
+    indicators = np.zeros((len(emotions), len(vocabulary)), dtype=np.int8)
+    indicators[rows[known], codes[known]] = 1
+
+    return pd.DataFrame(indicators, index=emotions.index, columns=[prefix + emotion for emotion in vocabulary])
@@ -0,0 +1,106 @@
+import os
+import pandas as pd
+import time
+from lexicon_features import LexiconFeatures, feature_pool
+from instrumentation import Profiler
+
+# Start time to measure the duration of the script
+start_time = time.time()
+
+"""
+Lexicon Feature Extraction Script.
+
+This script computes the dictionary features of the influencer and user texts that `data_preprocessing.py` reads from the influencers and users CSV files: the `num_mfd_*_virtue/vice` counts of the moral foundations dictionary categories, `num_moral_words`, `num_polar_words` and `abusive_words_ratio`. It performs the following steps:
+1. Compiles the moral foundations, polarization and abusive dictionaries once into hash tables of words and multi-word entries (see `lexicon_features.py`).
+2. Reads each raw text file in chunks and matches the texts of every chunk in batches on a process pool, whose workers receive the compiled dictionaries when they start.
+3. Appends each chunk with its feature columns (replacing any existing ones) to the influencers or users CSV file.
+
+Parameters to be adjusted:
+    - `influencers_text_file`: Path to the raw influencers CSV file, with one text per row.
+    - `users_text_file`: Path to the raw users CSV file, with one text per row.
+    - `influencers_file`: Path to the output influencers CSV file.
+    - `users_file`: Path to the output users CSV file.
+    - `text_column`: Name of the text column of the raw files.
+    - `moral_foundations_file`: Path to the moral foundations dictionary (TSV with 'Word' and 'Category' columns).
+    - `polarization_file`: Path to the polarization dictionary (CSV with a 'word' column).
+    - `abusive_file`: Path to the abusive lexicon (Excel file with a 'word' column).
+    - `chunk_size`: Number of rows read at a time from the raw files.
+    - `batch_size`: Number of texts matched at a time by a worker process.
+    - `n_jobs`: Number of worker processes (1 matches the texts in this process).
+    - `run_report_dir`: Directory where the JSON run report is saved.
+    - `trace_memory`: Set to True to record the peak Python memory of each stage with tracemalloc (slower).
+    - `cprofile_stages`: Names of the stages to capture with cProfile, e.g. ['users'].
+
+Outputs:
+    - The influencers and users CSV files, with the columns of the raw files followed by the feature columns.
+    - A JSON run report with the time, peak memory and row counts of the compilation and of each file (see `instrumentation.py`).
+"""
+
+# Parameters to be adjusted
+influencers_text_file = "path/to/Influencers_Text.csv"
+users_text_file = "path/to/Users_Text.csv"
+influencers_file = "path/to/Influencers.csv"
+users_file = "path/to/Users.csv"
+text_column = "text"
+moral_foundations_file = "moral_foundations_dict.tsv"
+polarization_file = "polarization_dict.csv"
+abusive_file = "abusive_lexicon_dict.xlsx"
+chunk_size = 100000
+batch_size = 10000
+n_jobs = os.cpu_count()
+run_report_dir = "path/to/profiles"
+trace_memory = False
+cprofile_stages = []
+
+
+def extract_features(extractor, executor, text_file, output_file, profiler):
+    """
+    Append the chunks of a raw text file with their feature columns to the output CSV file, returning the number of rows written.
+    """
+    num_rows = 0
+
+    for chunk_number, chunk in enumerate(pd.read_csv(text_file, chunksize=chunk_size)):
+        features = extractor.transform_frame(chunk[text_column], executor, batch_size)
+        chunk = pd.concat([chunk.drop(columns=extractor.columns, errors='ignore'), features], axis=1)
+
+        chunk.to_csv(output_file, mode='w' if chunk_number == 0 else 'a', header=chunk_number == 0, index=False)
+        num_rows += len(chunk)
+
+    profiler.count(rows=num_rows)
+
+    return num_rows
+
+
+def main():
+    profiler = Profiler("feature_extraction", run_report_dir, trace_memory, cprofile_stages, parameters={
+        "text_column": text_column,
+        "chunk_size": chunk_size,
+        "batch_size": batch_size,
+        "n_jobs": n_jobs,
+    })
+
+    # Compile the dictionaries
+    profiler.start("compile")
+    extractor = LexiconFeatures.from_files(moral_foundations_file, polarization_file, abusive_file)
+    profiler.stop(columns=len(extractor.columns))
+
+    executor = feature_pool(extractor, n_jobs) if n_jobs > 1 else None
+    try:
+        for name, text_file, output_file in (("influencers", influencers_text_file, influencers_file),
+                                             ("users", users_text_file, users_file)):
+            with profiler.stage(name):
+                num_rows = extract_features(extractor, executor, text_file, output_file, profiler)
+            print(f"{num_rows} {name} texts processed.")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print(f"Run report saved to {profiler.save()}")
+
+
+# Worker processes import this script, so the extraction only runs when it is executed directly
+if __name__ == "__main__":
+    main()
+
+    end_time = time.time()
+    print("Execution time: {:.2f} seconds".format(end_time - start_time))
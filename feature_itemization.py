@@ -1,5 +1,9 @@
+import os
 import pandas as pd
 import time
+from boolean_matrix import PackedWriter, write_packed
+from itemizer import Itemizer
+from instrumentation import Profiler
 
 # Start time to measure the duration of the script
 start_time = time.time()
@@ -7,14 +11,29 @@ start_time = time.time()
 """
 Itemization Process Script.
 
-This script loads data from a CSV file, preprocesses it by converting specific columns to boolean categories based on their mean values, and saves the resulting dataframe to a new CSV file.
+This script loads data from a CSV file, preprocesses it by converting specific columns to boolean categories based on their mean values, and saves the resulting dataframe to a new CSV file. It also saves it as a packed bit file (.bits) that the training scripts can memory-map instead of parsing the CSV (see `boolean_matrix.py`).
+
+The thresholds of the categories are fitted in a single vectorized pass and saved to a JSON file (see `itemizer.py`). When `fit_thresholds` is False, the saved thresholds are loaded instead and the input file is itemized in batches, so new data can be itemized consistently without re-itemizing the whole corpus. Each batch is appended to both output files as it is itemized, so only one batch is held in memory, and an input file without rows produces output files without rows. If a batch fails, both output files are removed rather than left incomplete.
+
+Each step is measured as a stage of a run report saved as JSON (see `instrumentation.py`).
 
 Parameters to be adjusted:
     - `input_file_with_profile`: Path to the input data file with profile information.
     - `input_file_without_profile`: Path to the input data file without profile information.
     - `output_file_with_profile`: Path to the output CSV file with profile data.
     - `output_file_without_profile`: Path to the output CSV file without profile data.
+    - `packed_output_file_with_profile`: Path to the output packed bit file with profile data.
+    - `packed_output_file_without_profile`: Path to the output packed bit file without profile data.
+    - `thresholds_file_with_profile`: Path to the JSON file with the category thresholds with profile data.
+    - `thresholds_file_without_profile`: Path to the JSON file with the category thresholds without profile data.
     - `profile_information` to include or exclude profile data processing.
+    - `fit_thresholds`: Set to True to fit and save the thresholds on the input data, or to False to itemize it with the saved thresholds.
+    - `num_categories`: Number of categories of each non-boolean column.
+    - `binning_method`: 'mean' for thresholds at the mean (plus and minus multiples of the standard deviation for more than two categories) or 'quantile' for equally populated categories.
+    - `batch_size`: Number of rows itemized at a time when using saved thresholds.
+    - `run_report_dir`: Directory where the JSON run report is saved.
+    - `trace_memory`: Set to True to record the peak Python memory of each stage with tracemalloc (slower).
+    - `cprofile_stages`: Names of the stages to capture with cProfile, e.g. ['itemize'].
 """
 
 # Parameters to be adjusted
@@ -22,61 +41,85 @@ input_file_with_profile = "path/to/All_Data_with_profile.csv"
 input_file_without_profile = "path/to/All_Data.csv"
 output_file_with_profile = "path/to/Boolean_Data_with_profile.csv"
 output_file_without_profile = "path/to/Boolean_Data.csv"
+packed_output_file_with_profile = "path/to/Boolean_Data_with_profile.bits"
+packed_output_file_without_profile = "path/to/Boolean_Data.bits"
+thresholds_file_with_profile = "path/to/Itemization_Thresholds_with_profile.json"
+thresholds_file_without_profile = "path/to/Itemization_Thresholds.json"
 profile_information = False
+fit_thresholds = True
+num_categories = 2
+binning_method = "mean"
+batch_size = 100000
+run_report_dir = "path/to/profiles"
+trace_memory = False
+cprofile_stages = []
 
-### 1. CONVERT TO BOOLEAN CATEGORIES ###
-
-def convert_to_categories(df, column_name, labels, num_categories):
-    """
-    Convert a column to categorical based on mean value.
-    """
-    categories = None
-    
-    mean_value = df[column_name].mean()
-    categories = df[column_name].apply(lambda x: labels[0][1] if x > mean_value else labels[0][0])
-
-    df[f"{column_name}_category"] = categories
-
-    for label in labels[num_categories - 2]:
-        df[f"{column_name}_{label}"] = (categories == label).astype(int)
-
-    df.drop(columns=[column_name], inplace=True)
-    df.drop(columns=[f"{column_name}_category"], inplace=True)
+# Define labels for each number of categories
+labels = [["low", "high"], ["low", "medium", "high"], ["very_low", "low", "high", "very_high"]]
 
-    return df
+# List of columns to exclude
+excluded_columns = ['inf_fairness_vice', 'inf_authority_vice', 'inf_sanctity_vice']
 
-# Read the DataFrame
 input_file = input_file_with_profile if profile_information else input_file_without_profile
-all_data = pd.read_csv(input_file)
-
-# Remove rows with any NaN values
-all_data = all_data.dropna()
-
-# Define labels for each column
-labels = [["low", "high"]]
+output_file = output_file_with_profile if profile_information else output_file_without_profile
+thresholds_file = thresholds_file_with_profile if profile_information else thresholds_file_without_profile
+packed_output_file = packed_output_file_with_profile if profile_information else packed_output_file_without_profile
 
-# Apply the conversion for each column that is not already boolean
-num_categories = 2
+profiler = Profiler("feature_itemization", run_report_dir, trace_memory, cprofile_stages, parameters={
+    "profile_information": profile_information,
+    "fit_thresholds": fit_thresholds,
+    "num_categories": num_categories,
+    "binning_method": binning_method,
+})
 
-# List of columns to exclude
-excluded_columns = ['inf_fairness_vice', 'inf_authority_vice', 'inf_sanctity_vice']
+### 1. CONVERT TO BOOLEAN CATEGORIES ###
 
-# Iterate over all columns and apply the condition
-for column in all_data.columns:
-    if column not in excluded_columns and all_data[column].dropna().isin([0, 1]).all():
-        all_data[column] = all_data[column].astype(int)
-        continue
-    
-    # Calculate and display the mean and variance of each column
-    mean_value = all_data[column].mean()
-    variance_value = all_data[column].var()
-    # print(f"Column: {column} | Mean: {mean_value:.2f} | Variance: {variance_value:.2f}")
-    
-    all_data = convert_to_categories(all_data, column, labels, num_categories)
-    
-# Save the final DataFrame to a new CSV file
-output_file = output_file_with_profile if profile_information else output_file_without_profile
-all_data.to_csv(output_file, index=False)
+if fit_thresholds:
+    # Read the DataFrame
+    profiler.start("read")
+    all_data = pd.read_csv(input_file)
+
+    # Remove rows with any NaN values
+    all_data = all_data.dropna()
+    profiler.stop(rows=len(all_data), columns=len(all_data.columns))
+
+    # Fit the thresholds of the columns that are not already boolean and save them
+    profiler.start("itemize")
+    itemizer = Itemizer(labels=labels[num_categories - 2], method=binning_method, excluded_columns=excluded_columns)
+    all_data = itemizer.fit_transform(all_data)
+    itemizer.save(thresholds_file)
+    profiler.stop(rows=len(all_data), columns=len(all_data.columns))
+
+    # Save the final DataFrame to a new CSV file
+    profiler.start("save_csv")
+    all_data.to_csv(output_file, index=False)
+    profiler.stop()
+
+    # Save the final DataFrame to a packed bit file
+    profiler.start("save_packed")
+    write_packed(all_data, packed_output_file)
+    profiler.stop()
+else:
+    # Itemize the input file in batches with the saved thresholds, appending each batch to the packed bit file
+    profiler.start("itemize_batches")
+    itemizer = Itemizer.load(thresholds_file)
+    writer = PackedWriter(packed_output_file)
+    try:
+        for batch in itemizer.transform_csv(input_file, output_file, batch_size=batch_size):
+            writer.append(batch)
+    except BaseException:
+        # Remove the partial outputs, so they are never loaded as the itemized data
+        writer.abort()
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        raise
+    writer.close()
+    profiler.stop(rows=writer.num_rows, columns=len(writer.columns or []))
+
+    if writer.num_rows == 0:
+        print(f"No rows to itemize in {input_file}.")
+
+print(f"Run report saved to {profiler.save()}")
 
 end_time = time.time()
 print("Execution time: {:.2f} seconds".format(end_time - start_time))
@@ -0,0 +1,116 @@
+"""
+Feature Screening Before Mining.
+
+The training scripts used to keep a random subset of `num_features` columns, so the columns kept, the mining time and the rules found changed from one subset to the next. This module keeps instead the columns taking part in the strongest antecedent -> consequent associations:
+    1. The co-occurrence counts of every (`inf_*`, `usr_*`) column pair are computed with a single matrix product of the antecedent columns by the consequent columns, accumulated over chunks of rows so only a chunk is ever converted to floating point.
+    2. Each pair is scored by the mutual information of its two columns ('mutual_information') or by its lift ('lift'). Only positively associated pairs (lift above 1) whose support reaches `min_support` are scored, since the other pairs cannot appear together in a frequent rule that beats the base rate of its consequent.
+    3. The pairs are taken from the highest score down, keeping both of their columns, until `num_features` columns are kept. Columns left out of every scored pair complete the selection by the score of their best pair, then by support.
+
+Columns belonging to neither prefix class are never kept, as no rule of the training scripts can use them.
+"""
+
+import numpy as np
+
+# Number of rows converted to floating point and multiplied at a time
+chunk_rows = 2 ** 16
+
+# Names of the pair scores
+methods = ("mutual_information", "lift")
+
+
+def _class_columns(columns, prefix):
+    """
+    Indices of the columns whose name starts with the given prefix.
+    """
+    return np.array([index for index, column in enumerate(columns) if str(column).startswith(prefix)], dtype=np.intp)
+
+
+def cooccurrence_counts(matrix, antecedent_columns, consequent_columns):
+    """
+    Number of rows of a Boolean (or 0/1) matrix containing each (antecedent column, consequent column) pair, and each column on its own.
+    """
+    # Counts are exact in float32 up to 2 ** 24 rows
+    dtype = np.float32 if len(matrix) <= 2 ** 24 else np.float64
+
+    joint = np.zeros((len(antecedent_columns), len(consequent_columns)))
+    antecedent_counts = np.zeros(len(antecedent_columns))
+    consequent_counts = np.zeros(len(consequent_columns))
+
+    for start in range(0, len(matrix), chunk_rows):
+        chunk = np.asarray(matrix[start:start + chunk_rows])
+        antecedents = chunk[:, antecedent_columns].astype(dtype)
+        consequents = chunk[:, consequent_columns].astype(dtype)
+
+        joint += antecedents.T @ consequents
+        antecedent_counts += antecedents.sum(axis=0)
+        consequent_counts += consequents.sum(axis=0)
+
+    return joint, antecedent_counts, consequent_counts
+
+
+def pair_scores(joint, antecedent_counts, consequent_counts, num_rows, method="mutual_information", min_support=0.0):
+    """
+    Score of each (antecedent column, consequent column) pair from its co-occurrence counts, 0 for the pairs that are not positively associated or whose support is below `min_support`.
+    """
+    if method not in methods:
+        raise ValueError(f"`method` must be one of {methods}. Got {method}.")
+
+    p11 = joint / num_rows
+    pa = antecedent_counts[:, None] / num_rows
+    pc = consequent_counts[None, :] / num_rows
+    expected = pa * pc
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "lift":
+            scores = p11 / expected
+        else:
+            # Mutual information of the two binary columns, with 0 * log(0) = 0
+            cells = (
+                (p11, expected),
+                (pa - p11, pa * (1 - pc)),
+                (pc - p11, (1 - pa) * pc),
+                (1 - pa - pc + p11, (1 - pa) * (1 - pc)),
+            )
+            scores = sum(np.where(p > 0, p * np.log(p / q), 0.0) for p, q in cells)
+
+    positive = (p11 > expected) & (p11 >= min_support) & (joint > 0)
+    return np.where(positive, np.nan_to_num(scores), 0.0)
+
+
+def screen_features(data, num_features, method="mutual_information", min_support=0.0,
+                    antecedent_prefix="inf_", consequent_prefix="usr_"):
+    """
+    Names of the `num_features` columns of a Boolean DataFrame taking part in the highest-scoring antecedent -> consequent column pairs, in the order they are selected.
+    """
+    columns = list(data.columns)
+    antecedent_columns = _class_columns(columns, antecedent_prefix)
+    consequent_columns = _class_columns(columns, consequent_prefix)
+
+    joint, antecedent_counts, consequent_counts = cooccurrence_counts(data.to_numpy(), antecedent_columns, consequent_columns)
+    scores = pair_scores(joint, antecedent_counts, consequent_counts, len(data), method, min_support)
+
+    selected = []
+    kept = set()
+
+    # Both columns of the pairs, from the highest score down
+    order = np.argsort(-scores, axis=None, kind="stable")
+    for antecedent, consequent in zip(*np.unravel_index(order[scores.ravel()[order] > 0], scores.shape)):
+        for index in (antecedent_columns[antecedent], consequent_columns[consequent]):
+            if len(selected) < num_features and index not in kept:
+                selected.append(index)
+                kept.add(index)
+        if len(selected) == num_features:
+            break
+
+    # The remaining columns by the score of their best pair, then by support
+    candidates = np.concatenate([antecedent_columns, consequent_columns])
+    best_scores = np.concatenate([scores.max(axis=1, initial=0.0), scores.max(axis=0, initial=0.0)])
+    counts = np.concatenate([antecedent_counts, consequent_counts])
+    for position in np.lexsort((-counts, -best_scores)):
+        if len(selected) == num_features:
+            break
+        if candidates[position] not in kept:
+            selected.append(candidates[position])
+            kept.add(candidates[position])
+
+    return [columns[index] for index in selected]
@@ -0,0 +1,243 @@
+"""
+Incremental Frequent Itemset Maintenance.
+
+FUP-style maintenance of the frequent itemsets when new itemized rows arrive, using the negative border (Thomas et al., 1997). The state kept on disk in `state_dir` holds:
+    - `state.json`: The columns, the minimum support, the number of rows and the list of history segments.
+    - `itemsets.npz`: The support counts of the frequent itemsets and of their negative border (the infrequent itemsets whose proper subsets are all frequent).
+    - `segment_*.bits`: The itemized rows of every batch, as packed bit files (see `boolean_matrix.py`).
+
+An update counts the tracked itemsets on the new rows only, with bitset ANDs and popcounts. The history is scanned only when an itemset of the negative border becomes frequent, and only for the new candidates this creates, so the cost of an update is proportional to the size of the batch unless the border moves.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from bitsets import count_itemsets, pack_columns
+from boolean_matrix import open_packed, write_packed
+from constrained_mining import constrained_association_rules
+from eclat import eclat_bitsets
+
+
+def candidate_itemsets(frequent, max_len=None):
+    """
+    Apriori candidate generation: the itemsets whose proper subsets of one item less are all in `frequent`, which maps sorted index tuples to counts.
+    """
+    by_prefix = {}
+    for itemset in frequent:
+        if max_len is None or len(itemset) < max_len:
+            by_prefix.setdefault(itemset[:-1], []).append(itemset[-1])
+
+    candidates = set()
+    for prefix, last_items in by_prefix.items():
+        last_items.sort()
+        for position, first in enumerate(last_items):
+            for second in last_items[position + 1:]:
+                candidate = prefix + (first, second)
+                if all(candidate[:index] + candidate[index + 1:] in frequent for index in range(len(candidate) - 2)):
+                    candidates.add(candidate)
+
+    return candidates
+
+
+class IncrementalMiner:
+    """
+    Frequent itemsets and negative border maintained on disk across batches of new rows.
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.columns = None
+        self.min_support = None
+        self.max_len = None
+        self.num_rows = 0
+        self.segments = []
+        self.counts = {}
+
+    def exists(self):
+        """
+        Whether a saved state exists in the state directory.
+        """
+        return os.path.exists(os.path.join(self.state_dir, "state.json"))
+
+    def initialize(self, data, min_support, max_len=None):
+        """
+        Mine the frequent itemsets of the initial data and count their negative border.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        self.columns = [str(column) for column in data.columns]
+        self.min_support = min_support
+        self.max_len = max_len
+        self.num_rows = 0
+        self.segments = []
+
+        bitsets = self._append_segment(data)
+        self.num_rows = len(data)
+
+        frequent = eclat_bitsets(bitsets, self.num_rows, min_support=min_support, max_len=max_len)
+        self.counts = {tuple(sorted(itemset)): count for count, itemset in frequent}
+
+        self._complete_border(self.counts)
+        self.save()
+
+    def update(self, delta):
+        """
+        Add a batch of new itemized rows and update the frequent itemsets and their negative border.
+        """
+        missing = [column for column in self.columns if column not in delta.columns]
+        if missing:
+            raise ValueError(f"The new rows are missing columns: {', '.join(missing)}")
+
+        delta_bitsets = self._append_segment(delta[self.columns])
+        self.num_rows += len(delta)
+
+        # Count every tracked itemset on the new rows only
+        tracked = list(self.counts)
+        for itemset, count in zip(tracked, count_itemsets(delta_bitsets, tracked)):
+            self.counts[itemset] += int(count)
+
+        frequent = {itemset: count for itemset, count in self.counts.items() if self._is_frequent(count)}
+        self._complete_border(frequent)
+        self.save()
+
+    def _is_frequent(self, count):
+        return count / self.num_rows >= self.min_support
+
+    def _complete_border(self, frequent):
+        """
+        Extend `frequent` with the candidates it generates until no new candidate is frequent, and keep the counts of the frequent itemsets and of their negative border.
+
+        Candidates that are not tracked yet are counted over the whole history.
+        """
+        known = dict(self.counts)
+        border = {}
+
+        # Every infrequent single item belongs to the negative border
+        for item in range(len(self.columns)):
+            if (item,) not in frequent:
+                border[(item,)] = None
+
+        candidates = candidate_itemsets(frequent, self.max_len)
+        while candidates:
+            untracked = [candidate for candidate in candidates if candidate not in known]
+            for candidate, count in zip(untracked, self._count_history(untracked)):
+                known[candidate] = count
+
+            new_frequent = {}
+            for candidate in candidates:
+                if self._is_frequent(known[candidate]):
+                    if candidate not in frequent:
+                        new_frequent[candidate] = known[candidate]
+                else:
+                    border[candidate] = None
+
+            frequent.update(new_frequent)
+            candidates = {
+                candidate for candidate in candidate_itemsets(frequent, self.max_len)
+                if candidate not in frequent and candidate not in border
+            }
+
+        untracked = [itemset for itemset in border if itemset not in known]
+        for itemset, count in zip(untracked, self._count_history(untracked)):
+            known[itemset] = count
+
+        self.counts = {**frequent, **{itemset: known[itemset] for itemset in border}}
+
+    def _append_segment(self, rows):
+        """
+        Save a batch of rows as a new history segment, returning its bitsets.
+        """
+        name = f"segment_{len(self.segments):06d}.bits"
+        write_packed(rows, os.path.join(self.state_dir, name))
+        self.segments.append(name)
+
+        return pack_columns(rows.to_numpy() == 1)
+
+    def _count_history(self, itemsets):
+        """
+        Count itemsets over all the history segments.
+        """
+        counts = np.zeros(len(itemsets), dtype=np.int64)
+        if not itemsets:
+            return counts
+
+        for name in self.segments:
+            bitsets, _, _ = open_packed(os.path.join(self.state_dir, name))
+            counts += count_itemsets(bitsets, itemsets)
+
+        return [int(count) for count in counts]
+
+    def frequent_itemsets(self):
+        """
+        The current frequent itemsets, as a DataFrame with the columns `support` and `itemsets` (frozensets of column names).
+        """
+        frequent = sorted(
+            ((itemset, count) for itemset, count in self.counts.items() if self._is_frequent(count)),
+            key=lambda entry: len(entry[0])
+        )
+
+        return pd.DataFrame({
+            "support": [count / self.num_rows for _, count in frequent],
+            "itemsets": [frozenset(self.columns[item] for item in itemset) for itemset, _ in frequent]
+        })
+
+    def rules(self, min_confidence=0.0, antecedent_prefix="inf_", consequent_prefix="usr_"):
+        """
+        The current antecedent -> consequent rules (see `constrained_association_rules`).
+        """
+        return constrained_association_rules(self.frequent_itemsets(), min_confidence, antecedent_prefix, consequent_prefix)
+
+    def save(self):
+        """
+        Save the state to the state directory.
+        """
+        itemsets = list(self.counts)
+        offsets = np.zeros(len(itemsets) + 1, dtype=np.int64)
+        np.cumsum([len(itemset) for itemset in itemsets], out=offsets[1:])
+
+        np.savez_compressed(
+            os.path.join(self.state_dir, "itemsets.npz"),
+            items=np.array([item for itemset in itemsets for item in itemset], dtype=np.int32),
+            offsets=offsets,
+            counts=np.array([self.counts[itemset] for itemset in itemsets], dtype=np.int64)
+        )
+
+        with open(os.path.join(self.state_dir, "state.json"), "w") as file:
+            json.dump({
+                "columns": self.columns,
+                "min_support": self.min_support,
+                "max_len": self.max_len,
+                "num_rows": self.num_rows,
+                "segments": self.segments,
+            }, file, indent=4)
+
+    @classmethod
+    def load(cls, state_dir):
+        """
+        Load a state saved by `save`.
+        """
+        miner = cls(state_dir)
+
+        with open(os.path.join(state_dir, "state.json")) as file:
+            state = json.load(file)
+
+        miner.columns = state["columns"]
+        miner.min_support = state["min_support"]
+        miner.max_len = state["max_len"]
+        miner.num_rows = state["num_rows"]
+        miner.segments = state["segments"]
+
+        with np.load(os.path.join(state_dir, "itemsets.npz")) as archive:
+            items = archive["items"].tolist()
+            offsets = archive["offsets"].tolist()
+            counts = archive["counts"].tolist()
+
+        miner.counts = {
+            tuple(items[start:end]): count
+            for start, end, count in zip(offsets[:-1], offsets[1:], counts)
+        }
+
+        return miner
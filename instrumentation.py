@@ -0,0 +1,229 @@
+"""
+Run Instrumentation.
+
+A profiler shared by the scripts to measure their stages and save one machine-readable JSON report per run. Stages are opened with `start` and closed with `stop` (or used as a `with profiler.stage(...)` block) and can be nested, so a stage such as 'mining' can be broken down into its parts. For every stage the report holds:
+    - `wall_time_s` / `cpu_time_s`: The elapsed and process CPU time.
+    - `rss_peak_mb`: The peak resident set size reached during the stage. On Linux the peak is reset at the start of every stage; elsewhere it is the peak of the process so far.
+    - `tracemalloc_peak_mb`: The peak memory allocated by Python during the stage, when `trace_memory` is enabled (it slows allocations down noticeably).
+    - `counts`: Row, column, itemset or rule counts recorded with `count` or `stop`.
+    - `cprofile`: For the stages listed in `cprofile_stages`, the functions with the highest cumulative time under cProfile, whose full statistics are saved next to the report as a `.prof` file.
+    - `stages`: The nested stages.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Number of functions of each cProfile capture kept in the report
+profile_top_functions = 25
+
+
+def rss_peak_mb():
+    """
+    Peak resident set size of the process since the last reset, in MB.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2 ** 10
+    except OSError:
+        pass
+
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def reset_rss_peak():
+    """
+    Reset the peak resident set size of the process to its current size, where the platform allows it.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+class Profiler:
+    """
+    Nested stage timer and memory tracker for one run of a script.
+    """
+
+    def __init__(self, script, output_dir, trace_memory=False, cprofile_stages=(), parameters=None):
+        self.script = script
+        self.output_dir = output_dir
+        self.trace_memory = trace_memory
+        self.cprofile_stages = set(cprofile_stages)
+        self.parameters = dict(parameters or {})
+        self.started_at = datetime.now()
+
+        self.run_name = f"{script}_{self.started_at:%Y%m%d-%H%M%S}_{os.getpid()}"
+        self._profiling = False
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        # The root stage covers the whole run
+        self._stack = []
+        self.root = self._open("total")
+
+    def _open(self, name):
+        # Fold the peaks reached so far into the enclosing stage before resetting them for the new one
+        if self._stack:
+            self._update_peaks(self._stack[-1])
+        reset_rss_peak()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+        stage = {
+            "name": name,
+            "counts": {},
+            "stages": [],
+            "_wall_start": time.perf_counter(),
+            "_cpu_start": time.process_time(),
+            "_rss_peak": 0.0,
+            "_traced_peak": 0,
+            "_profile": None,
+        }
+
+        if name in self.cprofile_stages and not self._profiling:
+            stage["_profile"] = cProfile.Profile()
+            stage["_profile"].enable()
+            self._profiling = True
+
+        if self._stack:
+            self._stack[-1]["stages"].append(stage)
+        self._stack.append(stage)
+
+        return stage
+
+    def _update_peaks(self, stage):
+        stage["_rss_peak"] = max(stage["_rss_peak"], rss_peak_mb())
+        if self.trace_memory:
+            stage["_traced_peak"] = max(stage["_traced_peak"], tracemalloc.get_traced_memory()[1])
+
+    def _close(self):
+        stage = self._stack.pop()
+
+        if stage["_profile"] is not None:
+            stage["_profile"].disable()
+            self._profiling = False
+            stage["cprofile"] = self._profile_summary(stage["name"], stage["_profile"])
+
+        stage["wall_time_s"] = time.perf_counter() - stage["_wall_start"]
+        stage["cpu_time_s"] = time.process_time() - stage["_cpu_start"]
+
+        self._update_peaks(stage)
+        stage["rss_peak_mb"] = stage["_rss_peak"]
+        if self.trace_memory:
+            stage["tracemalloc_peak_mb"] = stage["_traced_peak"] / 2 ** 20
+
+        # The peaks of a stage are also peaks of the stages enclosing it
+        if self._stack:
+            parent = self._stack[-1]
+            parent["_rss_peak"] = max(parent["_rss_peak"], stage["_rss_peak"])
+            parent["_traced_peak"] = max(parent["_traced_peak"], stage["_traced_peak"])
+        reset_rss_peak()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+        return stage
+
+    def _profile_summary(self, name, profile):
+        """
+        Save the cProfile statistics of a stage and return its top functions by cumulative time.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.run_name}.{name}.prof")
+        profile.dump_stats(path)
+
+        statistics = pstats.Stats(profile).stats
+        top = sorted(statistics.items(), key=lambda entry: entry[1][3], reverse=True)[:profile_top_functions]
+
+        return {
+            "stats_file": path,
+            "functions": [
+                {
+                    "function": f"{file}:{line}({function})",
+                    "calls": calls,
+                    "total_time_s": total_time,
+                    "cumulative_time_s": cumulative_time,
+                }
+                for (file, line, function), (_, calls, total_time, cumulative_time, _) in top
+            ],
+        }
+
+    def start(self, name):
+        """
+        Open a stage nested in the current one.
+        """
+        self._open(name)
+
+    def stop(self, **counts):
+        """
+        Close the current stage, recording the given counts on it.
+        """
+        if len(self._stack) <= 1:
+            raise ValueError("No stage to stop.")
+
+        self.count(**counts)
+        self._close()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure the enclosed block as a stage nested in the current one.
+        """
+        self.start(name)
+        try:
+            yield self
+        finally:
+            self.stop()
+
+    def count(self, **counts):
+        """
+        Record counts (rows, columns, itemsets, rules, ...) on the current stage.
+        """
+        self._stack[-1]["counts"].update({name: int(value) for name, value in counts.items()})
+
+    def report(self):
+        """
+        The measures of the run as a dictionary, closing the stages left open.
+        """
+        while self._stack:
+            self._close()
+
+        def clean(stage):
+            measures = {key: value for key, value in stage.items() if not key.startswith("_") and key != "stages"}
+            measures["stages"] = [clean(child) for child in stage["stages"]]
+            return measures
+
+        return {
+            "script": self.script,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "parameters": self.parameters,
+            "trace_memory": self.trace_memory,
+            "run": clean(self.root),
+        }
+
+    def save(self):
+        """
+        Save the report of the run as a JSON file in the output directory, returning its path.
+        """
+        report = self.report()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.run_name}.json")
+        with open(path, "w") as file:
+            json.dump(report, file, indent=4, default=str)
+
+        return path
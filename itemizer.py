@@ -0,0 +1,140 @@
+"""
+Itemizer.
+
+Converts the numeric columns of the preprocessed data into one-hot category columns (`<column>_low`, `<column>_high`, ...), with thresholds that are fitted once and saved to disk, so new data can be itemized with the same thresholds without re-itemizing the whole corpus.
+
+The thresholds of all columns are computed in a single vectorized pass, and the category of every value is the number of thresholds it exceeds, so a value strictly greater than the only threshold of a two-category column is 'high'. Two binning methods are available:
+    - `mean`: Thresholds at mean + k * std, with k evenly spaced and centred on 0 (a single threshold at the mean for two categories). The std of a column fitted on a single row is taken as 0.
+    - `quantile`: Thresholds at the quantiles that split the column into equally populated categories.
+
+Columns whose values are all 0 or 1 are kept as they are, except for the excluded columns, which are always binned.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+
+class Itemizer:
+    """
+    Fit/transform itemizer with persisted thresholds.
+    """
+
+    def __init__(self, labels=("low", "high"), method="mean", excluded_columns=()):
+        if method not in ("mean", "quantile"):
+            raise ValueError(f"Unknown binning method: {method}")
+        if len(labels) < 2:
+            raise ValueError("At least two labels are required.")
+
+        self.labels = list(labels)
+        self.method = method
+        self.excluded_columns = list(excluded_columns)
+        self.columns = None
+        self.thresholds = None
+
+    def fit(self, df):
+        """
+        Find the binary columns and compute the thresholds of all the other columns.
+        """
+        values = df.to_numpy(dtype=float)
+        is_binary = ((values == 0) | (values == 1) | np.isnan(values)).all(axis=0)
+        is_binary &= ~df.columns.isin(self.excluded_columns)
+
+        numeric = df.loc[:, ~is_binary]
+        num_thresholds = len(self.labels) - 1
+
+        if self.method == "mean":
+            offsets = np.arange(num_thresholds) - (num_thresholds - 1) / 2
+            thresholds = numeric.mean().to_numpy() + np.outer(offsets, numeric.std().fillna(0).to_numpy())
+        else:
+            quantiles = np.arange(1, num_thresholds + 1) / len(self.labels)
+            thresholds = np.nanquantile(numeric.to_numpy(dtype=float), quantiles, axis=0)
+
+        self.columns = list(df.columns)
+        self.thresholds = {
+            column: thresholds[:, position].tolist()
+            for position, column in enumerate(df.columns[~is_binary])
+        }
+
+        return self
+
+    def transform(self, df):
+        """
+        Itemize a DataFrame with the fitted thresholds.
+
+        Binary columns are kept in place as integers, and the category columns of every other column are appended at the end, in column order.
+        """
+        if self.thresholds is None:
+            raise ValueError("The itemizer must be fitted or loaded before transforming data.")
+
+        binned_columns = list(self.thresholds)
+        binary_columns = [column for column in self.columns if column not in self.thresholds]
+
+        # Work on (columns x rows) arrays, the layout pandas stores the columns in
+        values = df[binned_columns].to_numpy(dtype=float).T
+        thresholds = np.array([self.thresholds[column] for column in binned_columns]).reshape(len(binned_columns), len(self.labels) - 1)
+
+        # Category of each value: the number of thresholds it exceeds
+        categories = (values[:, None, :] > thresholds[:, :, None]).sum(axis=1, dtype=np.int8)
+
+        one_hot = categories[:, None, :] == np.arange(len(self.labels), dtype=np.int8)[None, :, None]
+        one_hot = one_hot.reshape(len(binned_columns) * len(self.labels), len(df)).view(np.int8)
+
+        itemized = pd.DataFrame(
+            one_hot.T,
+            index=df.index,
+            columns=[f"{column}_{label}" for column in binned_columns for label in self.labels]
+        )
+
+        return pd.concat([df[binary_columns].astype(int), itemized], axis=1)
+
+    def fit_transform(self, df):
+        """
+        Fit the itemizer and itemize the same DataFrame.
+        """
+        return self.fit(df).transform(df)
+
+    def transform_csv(self, input_file, output_file, batch_size=100000):
+        """
+        Itemize a CSV file in batches, removing rows with NaN values, and append each batch to the output CSV file.
+
+        Yields each itemized batch, so callers can also collect or further process them. An empty input file yields no batch and writes an empty output file.
+        """
+        try:
+            batches = pd.read_csv(input_file, chunksize=batch_size)
+        except pd.errors.EmptyDataError:
+            open(output_file, "w").close()
+            return
+
+        for batch_number, batch in enumerate(batches):
+            batch = self.transform(batch.dropna())
+            batch.to_csv(output_file, mode="w" if batch_number == 0 else "a", header=batch_number == 0, index=False)
+            yield batch
+
+    def save(self, path):
+        """
+        Save the fitted thresholds to a JSON file.
+        """
+        with open(path, "w") as file:
+            json.dump({
+                "labels": self.labels,
+                "method": self.method,
+                "excluded_columns": self.excluded_columns,
+                "columns": self.columns,
+                "thresholds": self.thresholds,
+            }, file, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an itemizer with the thresholds saved by `save`.
+        """
+        with open(path) as file:
+            state = json.load(file)
+
+        itemizer = cls(labels=state["labels"], method=state["method"], excluded_columns=state["excluded_columns"])
+        itemizer.columns = state["columns"]
+        itemizer.thresholds = state["thresholds"]
+
+        return itemizer
@@ -0,0 +1,203 @@
+"""
+Lexicon Features.
+
+Counting of the moral foundations (`moral_foundations_dict.tsv`), polarization (`polarization_dict.csv`) and abusive (`abusive_lexicon_dict.xlsx`) dictionary entries in raw texts, producing the `num_mfd_*_virtue/vice`, `num_moral_words`, `num_polar_words` and `abusive_words_ratio` columns read by `data_preprocessing.py`.
+
+Texts and dictionary entries are split into lowercase word tokens with the same tokenizer, so hyphenated and multi-word entries ('gun-control', 'do unto others') become token sequences. Each dictionary is compiled once into a hash table from a token to the labels of the single-word entries, and from a token to the multi-word entries starting with it, longest first. A text is then matched in one pass over its tokens per dictionary: at each position the longest matching entry is counted and skipped, so a multi-word entry is counted once and its words are not counted again on their own.
+
+Texts can be split into batches matched on a process pool (see `feature_pool`), each worker receiving the compiled dictionaries once when it starts.
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Word tokens, keeping inner apostrophes ("don't") and splitting on hyphens and punctuation
+_token_pattern = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+
+def tokenize(text):
+    """
+    Split a text into lowercase word tokens.
+    """
+    return _token_pattern.findall(str(text).lower().replace("’", "'"))
+
+
+class Lexicon:
+    """
+    Dictionary of words and multi-word entries, each with one or more labels, compiled for longest-match counting.
+    """
+
+    def __init__(self, entries):
+        """
+        Compile an iterable of (entry, label) pairs. Entries are tokenized, and an entry listed under several labels counts for each of them.
+        """
+        entry_labels = {}
+        for entry, label in entries:
+            tokens = tuple(tokenize(entry))
+            if tokens:
+                entry_labels.setdefault(tokens, set()).add(label)
+
+        self.labels = sorted({label for labels in entry_labels.values() for label in labels})
+        label_index = {label: index for index, label in enumerate(self.labels)}
+
+        # Single-word entries: token -> label indices
+        self.words = {}
+        # Multi-word entries: first token -> [(tokens, label indices)], longest first
+        self.phrases = {}
+
+        for tokens, labels in entry_labels.items():
+            indices = tuple(sorted(label_index[label] for label in labels))
+            if len(tokens) == 1:
+                self.words[tokens[0]] = indices
+            else:
+                self.phrases.setdefault(tokens[0], []).append((tokens, indices))
+
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+
+    def count(self, tokens):
+        """
+        Count the entries in a token list.
+
+        Returns the number of matches of each label and the number of entries matched.
+        """
+        counts = [0] * len(self.labels)
+        matches = 0
+        words = self.words
+        phrases = self.phrases
+
+        position = 0
+        num_tokens = len(tokens)
+        while position < num_tokens:
+            token = tokens[position]
+            length = 1
+            indices = None
+
+            for phrase, phrase_indices in phrases.get(token, ()):
+                if tuple(tokens[position:position + len(phrase)]) == phrase:
+                    length = len(phrase)
+                    indices = phrase_indices
+                    break
+            else:
+                indices = words.get(token)
+
+            if indices is not None:
+                matches += 1
+                for index in indices:
+                    counts[index] += 1
+
+            position += length
+
+        return counts, matches
+
+
+def load_moral_foundations(path):
+    """
+    Load the moral foundations dictionary, a TSV file with the columns 'Word' and 'Category' (such as 'care_virtue').
+    """
+    mfd = pd.read_csv(path, sep="\t")
+    return Lexicon(zip(mfd["Word"].astype(str), mfd["Category"]))
+
+
+def load_polarization(path):
+    """
+    Load the polarization dictionary, a CSV file with a 'word' column.
+    """
+    polarization = pd.read_csv(path)
+    return Lexicon((word, "polar") for word in polarization["word"].astype(str))
+
+
+def load_abusive(path):
+    """
+    Load the abusive lexicon, an Excel file with a 'word' column. Words listed with several parts of speech are counted once.
+    """
+    abusive = pd.read_excel(path)
+    return Lexicon((word, "abusive") for word in abusive["word"].astype(str))
+
+
+class LexiconFeatures:
+    """
+    Feature extractor counting the moral foundations, polarization and abusive entries of texts.
+    """
+
+    def __init__(self, moral_foundations, polarization, abusive):
+        self.moral_foundations = moral_foundations
+        self.polarization = polarization
+        self.abusive = abusive
+
+        self.columns = (
+            [f"num_mfd_{category}" for category in moral_foundations.labels]
+            + ["num_moral_words", "num_polar_words", "abusive_words_ratio"]
+        )
+
+    @classmethod
+    def from_files(cls, moral_foundations_file, polarization_file, abusive_file):
+        """
+        Compile the three dictionaries from their files.
+        """
+        return cls(load_moral_foundations(moral_foundations_file), load_polarization(polarization_file), load_abusive(abusive_file))
+
+    def transform(self, texts):
+        """
+        Count the dictionary entries of each text, returning a float64 matrix with one row per text and one column per feature.
+        """
+        features = np.zeros((len(texts), len(self.columns)))
+
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            category_counts, moral_words = self.moral_foundations.count(tokens)
+            _, polar_words = self.polarization.count(tokens)
+            _, abusive_words = self.abusive.count(tokens)
+
+            features[row, :len(category_counts)] = category_counts
+            features[row, len(category_counts):] = (moral_words, polar_words, abusive_words / len(tokens) if tokens else 0.0)
+
+        return features
+
+    def transform_frame(self, texts, executor=None, batch_size=10000):
+        """
+        Count the dictionary entries of a Series of texts, returning a DataFrame of features with the same index.
+
+        Count columns are integers and `abusive_words_ratio` is the fraction of the tokens of each text that are abusive entries. Missing texts have no tokens. With an `executor` from `feature_pool`, the texts are matched in batches of `batch_size` on its workers.
+        """
+        values = texts.fillna("").tolist()
+
+        if executor is None:
+            features = self.transform(values)
+        else:
+            batches = [values[start:start + batch_size] for start in range(0, len(values), batch_size)]
+            features = np.vstack([np.zeros((0, len(self.columns)))] + list(executor.map(_batch_features, batches)))
+
+        frame = pd.DataFrame(features, index=texts.index, columns=self.columns)
+        frame[self.columns[:-1]] = frame[self.columns[:-1]].astype(np.int32)
+
+        return frame
+
+
+# Feature extractor received once by each worker
+_extractor = None
+
+
+def _load_extractor(extractor):
+    """
+    Keep the compiled feature extractor in the worker.
+    """
+    global _extractor
+    _extractor = extractor
+
+
+def _batch_features(texts):
+    """
+    Count the dictionary entries of a batch of texts in a worker.
+    """
+    return _extractor.transform(texts)
+
+
+def feature_pool(extractor, n_jobs):
+    """
+    Process pool of `n_jobs` workers, each receiving the compiled feature extractor once when it starts.
+    """
+    return ProcessPoolExecutor(max_workers=n_jobs, initializer=_load_extractor, initargs=(extractor,))
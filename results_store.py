@@ -0,0 +1,113 @@
+"""
+Results Store.
+
+Append-only store for the results of the training runs, backed by SQLite. Every execution gets a run ID, and each update of a run appends (run ID, column, value) rows instead of rewriting a results file, so an update costs the same regardless of the number of recorded runs. The database is opened in WAL mode with a busy timeout, so several training processes can record their results in the same file at once.
+
+The results can be exported on demand to the Excel layout previously written by the training scripts: one row per run, one column per recorded value, in the order the values were first recorded, with the latest value of each column.
+
+Usage:
+    python results_store.py <results_db> <excel_file> [<algorithm>]
+"""
+
+import json
+import sqlite3
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+def _to_builtin(value):
+    """
+    Convert NumPy scalars to the equivalent Python values so they can be stored as JSON.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def connect(db_path):
+    """
+    Open the results database, creating its table if needed.
+    """
+    connection = sqlite3.connect(db_path, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS run_values ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "run_id TEXT NOT NULL, "
+        "algorithm TEXT NOT NULL, "
+        "name TEXT NOT NULL, "
+        "value TEXT, "
+        "recorded_at REAL NOT NULL)"
+    )
+    return connection
+
+
+def record_results(db_path, run_id, algorithm, values):
+    """
+    Append a dictionary of column -> value results to a run.
+    """
+    recorded_at = time.time()
+    rows = [(run_id, algorithm, name, json.dumps(value, default=_to_builtin), recorded_at) for name, value in values.items()]
+
+    connection = connect(db_path)
+    try:
+        with connection:
+            connection.executemany(
+                "INSERT INTO run_values (run_id, algorithm, name, value, recorded_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+    finally:
+        connection.close()
+
+
+def start_run(db_path, algorithm, values):
+    """
+    Create a new run with its initial values, returning its run ID.
+    """
+    run_id = uuid.uuid4().hex
+    record_results(db_path, run_id, algorithm, values)
+    return run_id
+
+
+def load_results(db_path, algorithm=None):
+    """
+    Load the results as a DataFrame with one row per run, in the layout of the Excel results files.
+    """
+    connection = connect(db_path)
+    try:
+        query = "SELECT run_id, name, value FROM run_values"
+        parameters = ()
+        if algorithm is not None:
+            query += " WHERE algorithm = ?"
+            parameters = (algorithm,)
+        rows = connection.execute(query + " ORDER BY id", parameters).fetchall()
+    finally:
+        connection.close()
+
+    runs = {}
+    columns = {}
+    for run_id, name, value in rows:
+        runs.setdefault(run_id, {})[name] = json.loads(value)
+        columns.setdefault(name, None)
+
+    return pd.DataFrame(list(runs.values()), columns=list(columns))
+
+
+def export_excel(db_path, excel_file, algorithm=None):
+    """
+    Export the results of one algorithm, or of all of them, to an Excel file.
+    """
+    load_results(db_path, algorithm).to_excel(excel_file, index=False)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Error. Enter arguments correctly")
+        sys.exit()
+
+    export_excel(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) == 4 else None)
+    print("Results exported to Excel.")
@@ -0,0 +1,160 @@
+"""
+Vectorized Rule Evaluation.
+
+This module evaluates association rules against a Boolean dataset. The dataset is converted once into packed column bitsets (see `bitsets.py`), and the number of rows matching the antecedents of every rule, and the antecedents and consequents together, is obtained by ANDing the item bitsets and counting the set bits. Rules are processed in batches of equal itemset length, so the work per batch is a handful of NumPy calls regardless of the number of rows.
+
+With `n_jobs` greater than 1, the bitsets are placed in shared memory and split into row chunks (ranges of bitset words). Each worker process counts the hits of every rule on its chunks, and the parent sums the counts before computing the accuracies, which are therefore identical to the single-process ones.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bitsets import count_grouped, count_itemsets, group_itemsets, pack_columns
+from shared_data import attach_array, share_array
+
+# Upper bound on the number of uint64 words gathered at once while evaluating a batch of rules
+max_batch_words = 2 ** 24
+
+# Number of row chunks given to each worker process, so faster workers can take over the chunks of slower ones
+chunks_per_job = 4
+
+
+def parse_itemset(value):
+    """
+    Convert an itemset read from a rules CSV file (a `frozenset({...})` string) to a frozenset of item names.
+    """
+    if isinstance(value, frozenset):
+        return value
+    return frozenset(value.strip('frozenset({})').replace('\'', '').split(', '))
+
+
+def to_bitmap(data):
+    """
+    Convert a Boolean (or 0/1) DataFrame to packed column bitsets.
+
+    Returns the bitsets, with an extra all-zero bitset appended for items that are not columns of `data`, and a dictionary mapping each column name to its bitset index.
+    """
+    bitsets = pack_columns(data.to_numpy() == 1)
+    bitsets = np.vstack([bitsets, np.zeros((1, bitsets.shape[1]), dtype=bitsets.dtype)])
+    column_index = {column: index for index, column in enumerate(data.columns)}
+
+    return bitsets, column_index
+
+
+def itemset_indices(itemsets, bitsets, column_index):
+    """
+    Convert itemsets of item names to lists of bitset indices, mapping items that are not columns to the all-zero bitset.
+    """
+    missing_index = len(bitsets) - 1
+    return [[column_index.get(item, missing_index) for item in itemset] for itemset in itemsets]
+
+
+def itemset_counts(itemsets, bitsets, column_index):
+    """
+    Count the rows containing each itemset of item names, in batches of equal itemset length.
+    """
+    return count_itemsets(bitsets, itemset_indices(itemsets, bitsets, column_index), batch_words=max_batch_words)
+
+
+def rule_counts(antecedents, consequents, bitsets, column_index):
+    """
+    Count, for each rule, the rows containing its antecedents and the rows containing both its antecedents and its consequents.
+    """
+    antecedent_hits = itemset_counts(antecedents, bitsets, column_index)
+    joint_hits = itemset_counts([a | c for a, c in zip(antecedents, consequents)], bitsets, column_index)
+
+    return antecedent_hits, joint_hits
+
+
+# Bitsets attached from shared memory and rule itemsets grouped by length, in each worker
+_shared_block = None
+_shared_bitsets = None
+_antecedent_groups = None
+_joint_groups = None
+
+
+def _attach_rules(spec, antecedent_groups, joint_groups):
+    """
+    Attach the worker to the bitsets held in shared memory and keep the grouped itemsets of the rules.
+    """
+    global _shared_block, _shared_bitsets, _antecedent_groups, _joint_groups
+
+    _shared_block, _shared_bitsets = attach_array(spec)
+    _antecedent_groups = antecedent_groups
+    _joint_groups = joint_groups
+
+
+def _chunk_counts(start, stop):
+    """
+    Count the antecedent and joint hits of every rule on the bitset words [start, stop).
+    """
+    chunk = _shared_bitsets[:, start:stop]
+    num_rules = sum(len(positions) for positions, _ in _antecedent_groups)
+
+    return (
+        count_grouped(chunk, _antecedent_groups, num_rules, max_batch_words),
+        count_grouped(chunk, _joint_groups, num_rules, max_batch_words)
+    )
+
+
+def parallel_rule_counts(antecedents, consequents, bitsets, column_index, n_jobs):
+    """
+    Count the antecedent and joint hits of every rule on `n_jobs` worker processes, each counting row chunks of the bitsets held in shared memory, and sum the counts of all chunks.
+    """
+    antecedent_groups = group_itemsets(itemset_indices(antecedents, bitsets, column_index))
+    joint_groups = group_itemsets(itemset_indices([a | c for a, c in zip(antecedents, consequents)], bitsets, column_index))
+
+    antecedent_hits = np.zeros(len(antecedents), dtype=np.int64)
+    joint_hits = np.zeros(len(antecedents), dtype=np.int64)
+
+    num_words = bitsets.shape[1]
+    bounds = np.linspace(0, num_words, min(n_jobs * chunks_per_job, num_words) + 1).astype(int)
+
+    block, spec = share_array(bitsets)
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_rules,
+                                 initargs=(spec, antecedent_groups, joint_groups)) as executor:
+            for chunk_antecedent_hits, chunk_joint_hits in executor.map(_chunk_counts, bounds[:-1], bounds[1:]):
+                antecedent_hits += chunk_antecedent_hits
+                joint_hits += chunk_joint_hits
+    finally:
+        block.close()
+        block.unlink()
+
+    return antecedent_hits, joint_hits
+
+
+def rule_accuracies(antecedent_hits, joint_hits):
+    """
+    Accuracy of each rule: the fraction of rows matching the antecedents that also match the consequents, or 0 when no row matches the antecedents.
+    """
+    antecedent_hits = np.asarray(antecedent_hits, dtype=float)
+    joint_hits = np.asarray(joint_hits, dtype=float)
+
+    return np.divide(joint_hits, antecedent_hits, out=np.zeros_like(joint_hits), where=antecedent_hits > 0)
+
+
+def evaluate_rules(rules, data, n_jobs=1):
+    """
+    Evaluate each rule on the dataset, returning a list of dictionaries with the rule and its accuracy.
+
+    With `n_jobs` greater than 1, the rows are split into chunks counted on that many worker processes.
+    """
+    antecedents = [parse_itemset(value) for value in rules['antecedents']]
+    consequents = [parse_itemset(value) for value in rules['consequents']]
+
+    bitsets, column_index = to_bitmap(data)
+    if n_jobs > 1:
+        antecedent_hits, joint_hits = parallel_rule_counts(antecedents, consequents, bitsets, column_index, n_jobs)
+    else:
+        antecedent_hits, joint_hits = rule_counts(antecedents, consequents, bitsets, column_index)
+    accuracies = rule_accuracies(antecedent_hits, joint_hits)
+
+    return [
+        {
+            'Rule': f"{antecedent} -> {consequent}",
+            'Accuracy': accuracy
+        }
+        for antecedent, consequent, accuracy in zip(rules['antecedents'], rules['consequents'], accuracies)
+    ]
@@ -0,0 +1,160 @@
+"""
+Streaming Antecedent -> Consequent Rule Generation.
+
+mlxtend's `association_rules` builds every rule of every frequent itemset (all of its antecedent/consequent splits) with all of its metrics in one DataFrame, which the training scripts then filter down to the rules with `inf_*` antecedents and `usr_*` consequents. This module generates only those rules:
+    - The supports of the frequent itemsets are held in a hash table keyed by item bitmasks (Python integers whose bit `i` is set when the itemset contains item `i`), so antecedent and consequent supports are looked up without building frozensets.
+    - An itemset made only of antecedent-class and consequent-class items, with at least one of each, has a single valid split, so no other split is enumerated.
+    - Only the requested metrics (and the one thresholded) are computed, vectorized over chunks of rules, and the rules passing the threshold are returned chunk by chunk, or written straight to a CSV file and a structured rule file (see `rule_io.py`).
+
+The metrics are the ones of `association_rules`, so the rules and their values are the same as generating all rules and filtering them afterwards.
+"""
+
+import numpy as np
+import pandas as pd
+
+from rule_io import RuleFileWriter
+
+
+def _conviction(sAC, sA, sC):
+    confidence = sAC / sA
+    with np.errstate(divide="ignore"):
+        return np.where(confidence < 1.0, (1.0 - sC) / (1.0 - confidence), np.inf)
+
+
+def _zhangs_metric(sAC, sA, sC):
+    denominator = np.maximum(sAC * (1 - sA), sA * (sC - sAC))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator == 0, 0, (sAC - sA * sC) / denominator)
+
+
+# Metric functions of the (rule, antecedent, consequent) supports, in the column order of `association_rules`
+rule_metrics = {
+    "antecedent support": lambda sAC, sA, sC: sA,
+    "consequent support": lambda sAC, sA, sC: sC,
+    "support": lambda sAC, sA, sC: sAC,
+    "confidence": lambda sAC, sA, sC: sAC / sA,
+    "lift": lambda sAC, sA, sC: sAC / sA / sC,
+    "leverage": lambda sAC, sA, sC: sAC - sA * sC,
+    "conviction": _conviction,
+    "zhangs_metric": _zhangs_metric,
+}
+
+# Metrics kept by the training scripts
+default_metrics = ("antecedent support", "consequent support", "support", "confidence")
+
+
+def support_table(frequent_itemsets):
+    """
+    Hash the supports of a `frequent_itemsets` DataFrame by item bitmask.
+
+    Returns the list of items, whose positions are the bits of the bitmasks, and the dictionary mapping each itemset bitmask to its support.
+    """
+    itemsets = frequent_itemsets["itemsets"].tolist()
+    items = sorted(set().union(*itemsets), key=str)
+    item_bits = {item: 1 << index for index, item in enumerate(items)}
+
+    table = {}
+    for itemset, support in zip(itemsets, frequent_itemsets["support"].tolist()):
+        mask = 0
+        for item in itemset:
+            mask |= item_bits[item]
+        table[mask] = support
+
+    return items, table
+
+
+def _itemset(mask, items):
+    """
+    Decode an item bitmask into a frozenset of items.
+    """
+    return frozenset(items[index] for index in range(mask.bit_length()) if mask >> index & 1)
+
+
+def _rule_chunk(splits, table, items, metric, min_threshold, metrics):
+    """
+    Compute the metrics of a chunk of (antecedent mask, consequent mask, support) splits and keep the rules passing the threshold.
+    """
+    try:
+        sA = np.array([table[antecedent] for antecedent, _, _ in splits])
+        sC = np.array([table[consequent] for _, consequent, _ in splits])
+    except KeyError as error:
+        raise ValueError(f"The support of {sorted(_itemset(error.args[0], items), key=str)} is missing. The frequent itemsets must contain all the subsets of each itemset.") from None
+    sAC = np.array([support for _, _, support in splits])
+
+    keep = np.flatnonzero(rule_metrics[metric](sAC, sA, sC) >= min_threshold)
+    sA, sC, sAC = sA[keep], sC[keep], sAC[keep]
+
+    chunk = pd.DataFrame({
+        "antecedents": [_itemset(splits[position][0], items) for position in keep.tolist()],
+        "consequents": [_itemset(splits[position][1], items) for position in keep.tolist()],
+    })
+    for name in rule_metrics:
+        if name in metrics:
+            chunk[name] = rule_metrics[name](sAC, sA, sC)
+
+    return chunk
+
+
+def generate_rules(frequent_itemsets, metric="confidence", min_threshold=0.8, metrics=default_metrics,
+                   antecedent_prefix="inf_", consequent_prefix="usr_", chunk_size=100000):
+    """
+    Generate the antecedent -> consequent rules of a `frequent_itemsets` DataFrame whose `metric` reaches `min_threshold`.
+
+    Yields DataFrames of at most `chunk_size` rules with the columns `antecedents`, `consequents` and the requested `metrics`, in the column order of `association_rules`.
+    """
+    for name in (metric, *metrics):
+        if name not in rule_metrics:
+            raise ValueError(f"Metric must be one of {list(rule_metrics)}. Got '{name}'.")
+
+    items, table = support_table(frequent_itemsets)
+
+    antecedent_mask = sum(1 << index for index, item in enumerate(items) if str(item).startswith(antecedent_prefix))
+    consequent_mask = sum(1 << index for index, item in enumerate(items) if str(item).startswith(consequent_prefix))
+
+    splits = []
+    for mask, support in table.items():
+        antecedent = mask & antecedent_mask
+        consequent = mask & consequent_mask
+
+        if not antecedent or not consequent or antecedent | consequent != mask:
+            continue
+
+        splits.append((antecedent, consequent, support))
+        if len(splits) == chunk_size:
+            yield _rule_chunk(splits, table, items, metric, min_threshold, metrics)
+            splits = []
+
+    if splits:
+        yield _rule_chunk(splits, table, items, metric, min_threshold, metrics)
+
+
+def write_association_rules(frequent_itemsets, output_file, rules_file=None, metric="confidence", min_threshold=0.8,
+                            metrics=default_metrics, num_rows=None, antecedent_prefix="inf_", consequent_prefix="usr_",
+                            chunk_size=100000):
+    """
+    Generate the antecedent -> consequent rules of a `frequent_itemsets` DataFrame and write them to a CSV file and, if given, a structured rule file, one chunk at a time.
+
+    When `num_rows` is given, the `support` column is written as the number of rows containing each rule, like the training scripts do. The rules are written in generation order. Returns the number of rules written.
+    """
+    header = pd.DataFrame(columns=["antecedents", "consequents"] + [name for name in rule_metrics if name in metrics])
+    header.to_csv(output_file, index=False)
+
+    writer = None
+    if rules_file is not None:
+        writer = RuleFileWriter(rules_file, set().union(*frequent_itemsets["itemsets"].tolist()))
+        writer.append(header)
+
+    num_rules = 0
+    for chunk in generate_rules(frequent_itemsets, metric, min_threshold, metrics, antecedent_prefix, consequent_prefix, chunk_size):
+        if num_rows is not None and "support" in chunk:
+            chunk["support"] = chunk["support"] * num_rows
+
+        chunk.to_csv(output_file, mode="a", header=False, index=False)
+        if writer is not None:
+            writer.append(chunk)
+        num_rules += len(chunk)
+
+    if writer is not None:
+        writer.close()
+
+    return num_rules
@@ -0,0 +1,118 @@
+"""
+Rule Index.
+
+Serves the rules written by the training scripts: given the items of a post (its `inf_*` features equal to 1), it returns the rules whose antecedents are a subset of the post items and the `usr_*` reactions they predict, with the highest confidence among the matching rules that predict each reaction.
+
+Two lookups are available:
+    - Single post: The antecedents are stored in a subset trie, with the items of every antecedent sorted by item ID. A query walks only the trie branches made of post items, so its cost depends on the number of matching prefixes and not on the number of rules.
+    - Batch: The posts of a DataFrame are packed into column bitsets (see `bitsets.py`), and the posts matching each antecedent are the AND of its item bitsets, computed for batches of rules of equal antecedent length.
+"""
+
+import numpy as np
+import pandas as pd
+
+from bitsets import group_itemsets, unpack_columns
+from rule_evaluation import parse_itemset, to_bitmap
+from rule_io import load_rules
+
+# Upper bound on the number of (post, rule) matches unpacked at once while scoring a batch of posts
+max_batch_matches = 2 ** 24
+
+
+class _TrieNode:
+    __slots__ = ("children", "rules")
+
+    def __init__(self):
+        self.children = {}
+        self.rules = []
+
+
+class RuleIndex:
+    """
+    Subset trie over the rule antecedents, with the consequents and confidences of the rules.
+    """
+
+    def __init__(self, rules):
+        self.antecedents = [parse_itemset(value) for value in rules['antecedents']]
+        self.consequents = [parse_itemset(value) for value in rules['consequents']]
+        self.confidence = rules['confidence'].to_numpy(dtype=float)
+
+        items = sorted(set().union(*self.antecedents)) if self.antecedents else []
+        self.item_ids = {item: index for index, item in enumerate(items)}
+        self.reactions = sorted(set().union(*self.consequents)) if self.consequents else []
+
+        # (rules x reactions) incidence of the consequents
+        reaction_ids = {reaction: index for index, reaction in enumerate(self.reactions)}
+        self.predicts = np.zeros((len(self.consequents), len(self.reactions)), dtype=bool)
+        for rule, consequent in enumerate(self.consequents):
+            self.predicts[rule, [reaction_ids[reaction] for reaction in consequent]] = True
+
+        self.root = _TrieNode()
+        for rule, antecedent in enumerate(self.antecedents):
+            node = self.root
+            for item_id in sorted(self.item_ids[item] for item in antecedent):
+                node = node.children.setdefault(item_id, _TrieNode())
+            node.rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Build the index from a structured rule file (.npz) or a rules CSV file.
+        """
+        return cls(load_rules(path))
+
+    def match(self, items):
+        """
+        Positions of the rules whose antecedents are a subset of `items`.
+        """
+        post = sorted(self.item_ids[item] for item in items if item in self.item_ids)
+        matched = []
+
+        stack = [(self.root, 0)]
+        while stack:
+            node, start = stack.pop()
+            matched.extend(node.rules)
+
+            for position in range(start, len(post)):
+                child = node.children.get(post[position])
+                if child is not None:
+                    stack.append((child, position + 1))
+
+        return np.array(matched, dtype=np.intp)
+
+    def predict(self, items):
+        """
+        Predicted reactions of a post, as a dictionary mapping each reaction to the highest confidence of the matching rules that predict it.
+        """
+        matched = self.match(items)
+        if len(matched) == 0:
+            return {}
+
+        scores = np.where(self.predicts[matched], self.confidence[matched, None], 0.0).max(axis=0)
+        return {reaction: score for reaction, score in zip(self.reactions, scores.tolist()) if score > 0}
+
+    def predict_batch(self, posts):
+        """
+        Predicted reactions of every post of a Boolean (or 0/1) DataFrame of items, as a DataFrame with one column per reaction holding the highest confidence of the matching rules that predict it (0 when no rule matches).
+        """
+        bitsets, column_index = to_bitmap(posts)
+        missing_index = len(bitsets) - 1
+        groups = group_itemsets([[column_index.get(item, missing_index) for item in antecedent] for antecedent in self.antecedents])
+
+        scores = np.zeros((len(posts), len(self.reactions)))
+        batch_size = max(1, max_batch_matches // max(len(posts), 1))
+
+        for positions, indices in groups:
+            for start in range(0, len(positions), batch_size):
+                rules = positions[start:start + batch_size]
+
+                # (posts x rules) matches of the batch, weighted by the confidence of each rule
+                matched = unpack_columns(np.bitwise_and.reduce(bitsets[indices[start:start + batch_size]], axis=1), len(posts))
+                weighted = matched * self.confidence[rules]
+
+                for reaction in range(len(self.reactions)):
+                    predicting = self.predicts[rules, reaction]
+                    if predicting.any():
+                        np.maximum(scores[:, reaction], weighted[:, predicting].max(axis=1), out=scores[:, reaction])
+
+        return pd.DataFrame(scores, index=posts.index, columns=self.reactions)
@@ -0,0 +1,145 @@
+"""
+Structured Rule Files.
+
+Association rules are stored in a compressed NumPy `.npz` archive instead of `frozenset({...})` strings, so they can be loaded without any string parsing. The archive contains:
+    - `items`: The item dictionary, mapping each item ID to its name.
+    - `antecedent_items` / `antecedent_offsets`: The item IDs of all antecedents, concatenated, and the offset where each rule starts (CSR layout).
+    - `consequent_items` / `consequent_offsets`: The same for the consequents.
+    - `metric_names` / `metrics`: The numeric columns of the rules (support, confidence, ...) as a float matrix.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _encode_itemsets(itemsets, item_ids):
+    """
+    Encode a sequence of itemsets as concatenated item IDs and per-itemset offsets.
+    """
+    lengths = np.fromiter((len(itemset) for itemset in itemsets), dtype=np.int64, count=len(itemsets))
+    offsets = np.zeros(len(itemsets) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    ids = np.fromiter(
+        (item_ids[item] for itemset in itemsets for item in sorted(itemset)),
+        dtype=np.int32,
+        count=int(offsets[-1])
+    )
+
+    return ids, offsets
+
+
+def _decode_itemsets(ids, offsets, items):
+    """
+    Decode concatenated item IDs and offsets back into frozensets of item names.
+    """
+    names = items[ids].tolist()
+    bounds = offsets.tolist()
+
+    return [frozenset(names[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def write_rules(rules, path):
+    """
+    Write a rules DataFrame with frozenset `antecedents` and `consequents` columns to a structured `.npz` rule file.
+    """
+    antecedents = rules['antecedents'].tolist()
+    consequents = rules['consequents'].tolist()
+
+    items = sorted(set().union(*antecedents, *consequents))
+    item_ids = {item: index for index, item in enumerate(items)}
+
+    antecedent_items, antecedent_offsets = _encode_itemsets(antecedents, item_ids)
+    consequent_items, consequent_offsets = _encode_itemsets(consequents, item_ids)
+
+    metric_names = [column for column in rules.columns if column not in ('antecedents', 'consequents')]
+
+    np.savez_compressed(
+        path,
+        items=np.array(items, dtype=str),
+        antecedent_items=antecedent_items,
+        antecedent_offsets=antecedent_offsets,
+        consequent_items=consequent_items,
+        consequent_offsets=consequent_offsets,
+        metric_names=np.array(metric_names, dtype=str),
+        metrics=rules[metric_names].to_numpy(dtype=float).reshape(len(rules), len(metric_names))
+    )
+
+
+class RuleFileWriter:
+    """
+    Write a structured `.npz` rule file from rule DataFrames appended one chunk at a time.
+
+    The item dictionary is fixed up front, so each chunk is encoded as soon as it is appended and only the compact item ID and metric arrays are kept until `close`.
+    """
+
+    def __init__(self, path, items):
+        self.path = path
+        self.items = sorted(items)
+        self.item_ids = {item: index for index, item in enumerate(self.items)}
+        self.metric_names = None
+        self._parts = {"antecedent_items": [], "antecedent_lengths": [], "consequent_items": [], "consequent_lengths": [], "metrics": []}
+
+    def append(self, rules):
+        """
+        Encode a chunk of rules with frozenset `antecedents` and `consequents` columns.
+        """
+        metric_names = [column for column in rules.columns if column not in ('antecedents', 'consequents')]
+        if self.metric_names is None:
+            self.metric_names = metric_names
+        elif metric_names != self.metric_names:
+            raise ValueError(f"Rule chunks must have the same metrics. Got {metric_names} after {self.metric_names}.")
+
+        for side in ('antecedent', 'consequent'):
+            ids, offsets = _encode_itemsets(rules[side + 's'].tolist(), self.item_ids)
+            self._parts[side + "_items"].append(ids)
+            self._parts[side + "_lengths"].append(np.diff(offsets))
+
+        self._parts["metrics"].append(rules[metric_names].to_numpy(dtype=float).reshape(len(rules), len(metric_names)))
+
+    def close(self):
+        """
+        Save the rules appended so far to the rule file.
+        """
+        metric_names = self.metric_names or []
+        arrays = {}
+
+        for side in ('antecedent', 'consequent'):
+            lengths = np.concatenate(self._parts[side + "_lengths"] or [np.zeros(0, dtype=np.int64)])
+            arrays[side + "_offsets"] = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=arrays[side + "_offsets"][1:])
+            arrays[side + "_items"] = np.concatenate(self._parts[side + "_items"] or [np.zeros(0, dtype=np.int32)])
+
+        np.savez_compressed(
+            self.path,
+            items=np.array(self.items, dtype=str),
+            metric_names=np.array(metric_names, dtype=str),
+            metrics=np.concatenate(self._parts["metrics"] or [np.zeros((0, len(metric_names)))]),
+            **arrays
+        )
+
+
+def read_rules(path):
+    """
+    Read a structured `.npz` rule file into a DataFrame with frozenset `antecedents` and `consequents` columns.
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        items = archive['items']
+
+        rules = pd.DataFrame({
+            'antecedents': _decode_itemsets(archive['antecedent_items'], archive['antecedent_offsets'], items),
+            'consequents': _decode_itemsets(archive['consequent_items'], archive['consequent_offsets'], items)
+        })
+
+        metrics = pd.DataFrame(archive['metrics'], columns=archive['metric_names'].tolist())
+
+    return pd.concat([rules, metrics], axis=1)
+
+
+def load_rules(path):
+    """
+    Load rules from either a structured `.npz` rule file or a legacy CSV file with `frozenset({...})` strings.
+    """
+    if str(path).endswith('.npz'):
+        return read_rules(path)
+    return pd.read_csv(path)
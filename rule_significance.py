@@ -0,0 +1,170 @@
+"""
+Rule Significance Testing.
+
+A rule with a high confidence is not necessarily informative: when its consequents are frequent, such as `usr_abusive_words_ratio_low`, most antecedents reach a high confidence by chance. This module tests every rule against the independence of its antecedents and consequents, from the 2x2 table of the training rows containing or not its antecedents and its consequents, whose margins are the antecedent, consequent and rule supports. The tests are one-sided, for a positive association:
+    - 'fisher': Fisher's exact test, the upper tail of the hypergeometric distribution of the rule count given the antecedent and consequent counts. The tail is summed from the log-factorials of a table shared by all the rules, term by term with the ratio of consecutive probabilities, over vectorized batches of rules; the rules whose count is below the mode get one minus the lower tail instead, which is the shorter sum. The length of the tails grows with the square root of the number of rows, so 'chi2' is the faster test on very large training sets.
+    - 'chi2': The chi-square test with one degree of freedom, signed by the direction of the association (equivalently, the normal approximation of the difference of proportions).
+
+The p-values are then adjusted for the number of rules tested with the Benjamini-Hochberg ('fdr_bh', controlling the false discovery rate) or Holm ('holm', controlling the family-wise error rate) procedure.
+"""
+
+import numpy as np
+from scipy.special import gammaln, ndtr
+
+# Number of rules tested at a time
+batch_size = 2 ** 20
+
+# Relative precision at which the sum of a hypergeometric tail stops
+tail_tolerance = 1e-15
+
+# Names of the tests and of the multiple-testing corrections
+tests = ("fisher", "chi2")
+corrections = ("fdr_bh", "holm")
+
+
+def _tail_sums(x, antecedent, consequent, others, end, upward):
+    """
+    Sums of the hypergeometric probabilities from x to end (upward or downward), relative to the probability of x.
+    """
+    sums = np.ones(len(x))
+    active = np.flatnonzero(x != end)
+    x, a, c, o, end = x[active], antecedent[active], consequent[active], others[active], end[active]
+    terms = np.ones(len(active))
+    tails = np.ones(len(active))
+
+    while len(active):
+        # Ratio of the probabilities of the next term and of x, which is 0 once x reaches the end of the tail
+        if upward:
+            ratios = (c - x) * (a - x) / ((x + 1.0) * (o - a + x + 1))
+            x = np.minimum(x + 1, end)
+        else:
+            ratios = x * (o - a + x) / ((c - x + 1.0) * (a - x + 1))
+            x = np.maximum(x - 1, end)
+
+        terms *= ratios
+        tails += terms
+
+        # The ratios decrease away from the mode, so the rest of a tail is bounded by a geometric series.
+        # Finished tails stop adding terms, and are only dropped once enough of them have finished.
+        done = (x == end) | (terms * ratios < tail_tolerance * (1 - ratios) * tails)
+        terms[done] = 0.0
+        if done.sum() * 8 > len(active):
+            sums[active[done]] = tails[done]
+            more = ~done
+            active, x, a, c, o, end, terms, tails = (
+                array[more] for array in (active, x, a, c, o, end, terms, tails)
+            )
+
+    return sums
+
+
+def _fisher_batch(joint, antecedent, consequent, num_rows, log_factorials):
+    """
+    One-sided Fisher p-values of a batch of rules, as integer arrays of rule, antecedent and consequent counts.
+    """
+    lf = log_factorials
+    others = num_rows - consequent
+
+    def log_pmf(x, a, c, o):
+        return lf[c] + lf[o] + lf[a] + lf[num_rows - a] - lf[num_rows] - lf[x] - lf[c - x] - lf[a - x] - lf[o - a + x]
+
+    lowest = np.maximum(0, antecedent + consequent - num_rows)
+    highest = np.minimum(antecedent, consequent)
+    mode = (antecedent + 1) * (consequent + 1) // (num_rows + 2)
+    pvalues = np.ones(len(joint))
+
+    # Sum the upper tail from the rule count when it is past the mode, and the lower tail below it otherwise
+    for rules, start, end, upward in (
+        (np.flatnonzero(joint > mode), joint, highest, True),
+        (np.flatnonzero((joint <= mode) & (joint > lowest)), joint - 1, lowest, False),
+    ):
+        a, c, o, start = antecedent[rules], consequent[rules], others[rules], start[rules]
+        tails = np.exp(log_pmf(start, a, c, o)) * _tail_sums(start, a, c, o, end[rules], upward)
+        pvalues[rules] = tails if upward else 1.0 - tails
+
+    return np.clip(pvalues, 0.0, 1.0)
+
+
+def fisher_pvalues(joint_counts, antecedent_counts, consequent_counts, num_rows):
+    """
+    One-sided Fisher exact test p-values of rules, from the number of rows containing each rule, its antecedents and its consequents among `num_rows` rows.
+    """
+    joint_counts = np.asarray(joint_counts, dtype=np.int64)
+    antecedent_counts = np.asarray(antecedent_counts, dtype=np.int64)
+    consequent_counts = np.asarray(consequent_counts, dtype=np.int64)
+
+    log_factorials = gammaln(np.arange(num_rows + 1) + 1.0)
+    pvalues = np.empty(len(joint_counts))
+
+    for start in range(0, len(joint_counts), batch_size):
+        stop = start + batch_size
+        pvalues[start:stop] = _fisher_batch(joint_counts[start:stop], antecedent_counts[start:stop],
+                                            consequent_counts[start:stop], num_rows, log_factorials)
+
+    return pvalues
+
+
+def chi2_pvalues(joint_counts, antecedent_counts, consequent_counts, num_rows):
+    """
+    One-sided chi-square test p-values of rules, from the number of rows containing each rule, its antecedents and its consequents among `num_rows` rows.
+    """
+    joint_counts = np.asarray(joint_counts, dtype=float)
+    antecedent_counts = np.asarray(antecedent_counts, dtype=float)
+    consequent_counts = np.asarray(consequent_counts, dtype=float)
+
+    margins = antecedent_counts * (num_rows - antecedent_counts) * consequent_counts * (num_rows - consequent_counts)
+    deviation = num_rows * joint_counts - antecedent_counts * consequent_counts
+
+    # Signed square root of the chi-square statistic, 0 when a margin is empty
+    z = np.divide(np.sqrt(num_rows) * deviation, np.sqrt(margins), out=np.zeros_like(deviation), where=margins > 0)
+
+    return ndtr(-z)
+
+
+def adjust_pvalues(pvalues, method="fdr_bh"):
+    """
+    Adjust p-values for multiple testing with the Benjamini-Hochberg ('fdr_bh') or Holm ('holm') procedure. Missing p-values are left out of the number of tests and stay missing.
+    """
+    if method not in corrections:
+        raise ValueError(f"`method` must be one of {corrections}. Got {method}.")
+
+    pvalues = np.asarray(pvalues, dtype=float)
+    adjusted = np.full(len(pvalues), np.nan)
+
+    tested = np.flatnonzero(~np.isnan(pvalues))
+    order = tested[np.argsort(pvalues[tested], kind="stable")]
+    num_tests = len(order)
+    ranks = np.arange(1, num_tests + 1)
+
+    if method == "fdr_bh":
+        sorted_adjusted = np.minimum.accumulate((pvalues[order] * num_tests / ranks)[::-1])[::-1]
+    else:
+        sorted_adjusted = np.maximum.accumulate(pvalues[order] * (num_tests - ranks + 1))
+
+    adjusted[order] = np.minimum(sorted_adjusted, 1.0)
+
+    return adjusted
+
+
+def add_significance(rules, num_rows, test="fisher", correction="fdr_bh"):
+    """
+    Add the `p-value` and `adjusted p-value` columns to a rules DataFrame with the `antecedent support`, `consequent support` and `support` columns as fractions of `num_rows` rows.
+
+    Rules with a missing support (such as the maximal itemset rules generated with `support_only`) get missing p-values.
+    """
+    if test not in tests:
+        raise ValueError(f"`test` must be one of {tests}. Got {test}.")
+
+    supports = rules[["support", "antecedent support", "consequent support"]].to_numpy(dtype=float)
+    known = ~np.isnan(supports).any(axis=1)
+    joint_counts, antecedent_counts, consequent_counts = np.rint(supports[known] * num_rows).astype(np.int64).T
+
+    pvalues = np.full(len(rules), np.nan)
+    test_pvalues = fisher_pvalues if test == "fisher" else chi2_pvalues
+    pvalues[known] = test_pvalues(joint_counts, antecedent_counts, consequent_counts, num_rows)
+
+    rules = rules.copy()
+    rules["p-value"] = pvalues
+    rules["adjusted p-value"] = adjust_pvalues(pvalues, correction)
+
+    return rules
@@ -0,0 +1,264 @@
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, fpgrowth
+from sklearn.model_selection import KFold
+
+from boolean_matrix import load_boolean_data
+from constrained_mining import mine_constrained, constrained_association_rules
+from eclat import eclat
+from instrumentation import Profiler
+from rule_evaluation import rule_accuracies, rule_counts, to_bitmap
+from rule_generation import generate_rules
+from shared_data import attach_array, share_array
+
+"""
+Rule Stability Evaluation Script.
+
+A single 70/30 split gives one noisy estimate of the accuracy of each rule. This script mines and validates the rules over `num_folds` folds (each fold is validated once, the other folds are mined) or over `num_resamples` bootstrap resamples (rows drawn with replacement are mined, the rows never drawn are validated), and reports for every rule:
+    - How often it appears among the rules mined from the resamples.
+    - The mean and variance of its accuracy on the validation rows of the resamples where it appears.
+    - The mean of its support and confidence on the training rows of those resamples.
+
+The rows and columns are sampled as in the training scripts, the sampled matrix is placed in shared memory once, and the resamples are mined and validated on a process pool whose workers read the matrix without copying it. With at least as many workers as resamples, the evaluation takes about as long as one training and validation run.
+
+Usage:
+    python rule_stability.py <algorithm> <num_samples> <num_features> <minimum_support> <minimum_confidence> [<num_workers>]
+
+Arguments:
+    - algorithm: str - Mining algorithm, among apriori, fpgrowth and eclat.
+    - num_samples: int - Number of samples to be used from the dataset.
+    - num_features: int - Number of features to be used from the dataset.
+    - minimum_support: float - Minimum support value for the mining algorithm.
+    - minimum_confidence: float - Minimum confidence value for the association rules.
+    - num_workers: int - Number of worker processes (optional, defaults to the number of CPUs).
+
+Parameters to be adjusted:
+    - `profile_information`: Set to True if profile information is included, otherwise set to False.
+    - `data_path_with_profile`: Path to the Boolean data CSV file or packed bit file (.bits) with profile information.
+    - `data_path_without_profile`: Path to the Boolean data CSV file or packed bit file (.bits) without profile information.
+    - `stability_file_with_profile` / `stability_file_without_profile`: Paths to the output CSV files of the stability report.
+    - `resampling`: 'kfold' to mine and validate over `num_folds` folds, or 'bootstrap' to mine and validate over `num_resamples` bootstrap resamples.
+    - `num_folds`: Number of folds when `resampling` is 'kfold'.
+    - `num_resamples`: Number of bootstrap resamples when `resampling` is 'bootstrap'.
+    - `random_state`: Seed of the folds and of the bootstrap resamples.
+    - `constrained_mining`: Set to True to mine only the itemsets that can produce 'inf_' -> 'usr_' rules (see `constrained_mining.py`).
+    - `run_report_dir`: Directory where the JSON run report is saved.
+    - `trace_memory`: Set to True to record the peak Python memory of each stage with tracemalloc (slower).
+    - `cprofile_stages`: Names of the stages to capture with cProfile, e.g. ['aggregate'].
+
+Outputs:
+    - A CSV file with one row per rule mined from at least one resample, sorted by frequency and then mean accuracy, with the columns:
+        - antecedents / consequents: The itemsets of the rule.
+        - Frequency: The fraction of the resamples whose mined rules include the rule.
+        - Appearances: The number of resamples whose mined rules include the rule.
+        - Mean Accuracy / Accuracy Variance: The mean and (population) variance of the accuracy of the rule on the validation rows of those resamples.
+        - Mean Support / Mean Confidence: The mean support (as a fraction of the training rows) and confidence of the rule on the training rows of those resamples.
+    - A JSON run report with the time, peak memory and counts of the loading, resampling, aggregation and saving stages (see `instrumentation.py`).
+"""
+
+# Parameters to be adjusted
+data_path_with_profile = "path/to/Boolean_Data_with_profile.csv"
+data_path_without_profile = "path/to/Boolean_Data.csv"
+stability_file_with_profile = "path/to/rule_stability_{algorithm}_{num_samples}x{num_features}_with_profile.csv"
+stability_file_without_profile = "path/to/rule_stability_{algorithm}_{num_samples}x{num_features}.csv"
+profile_information = False
+resampling = "kfold"
+num_folds = 5
+num_resamples = 10
+random_state = 42
+constrained_mining = False
+run_report_dir = "path/to/profiles"
+trace_memory = False
+cprofile_stages = []
+
+# Mining function of each algorithm
+algorithms = {
+    "apriori": apriori,
+    "fpgrowth": fpgrowth,
+    "eclat": eclat,
+}
+
+### 1. WORKER PROCESS ###
+
+# Sampled Boolean data attached from shared memory in each worker
+_shared_block = None
+_boolean_data = None
+
+
+def attach_boolean_data(spec, columns):
+    """
+    Attach the worker to the sampled Boolean data matrix held in shared memory.
+    """
+    global _shared_block, _boolean_data
+
+    _shared_block, matrix = attach_array(spec)
+    _boolean_data = pd.DataFrame(matrix, columns=columns, copy=False)
+
+
+def run_resample(algorithm, minimum_support, minimum_confidence, train_rows, validation_rows):
+    """
+    Mine the 'inf_' -> 'usr_' rules of the training rows of a resample and evaluate them on its validation rows.
+
+    Returns the antecedents and consequents of the rules, with their support and confidence on the training rows and their accuracy on the validation rows.
+    """
+    train_data = _boolean_data.iloc[train_rows].reset_index(drop=True).astype(bool)
+
+    if constrained_mining:
+        frequent_itemsets = mine_constrained(train_data, minimum_support, minimum_confidence)
+        rules = constrained_association_rules(frequent_itemsets, min_confidence=minimum_confidence)
+    else:
+        frequent_itemsets = algorithms[algorithm](train_data, min_support=minimum_support, use_colnames=True)
+        rules = pd.concat(
+            [pd.DataFrame(columns=["antecedents", "consequents", "support", "confidence"])]
+            + list(generate_rules(frequent_itemsets, min_threshold=minimum_confidence, metrics=("support", "confidence")))
+        )
+
+    antecedents = rules["antecedents"].tolist()
+    consequents = rules["consequents"].tolist()
+
+    bitsets, column_index = to_bitmap(_boolean_data.iloc[validation_rows])
+    accuracies = rule_accuracies(*rule_counts(antecedents, consequents, bitsets, column_index))
+
+    return antecedents, consequents, rules["support"].to_numpy(dtype=float), rules["confidence"].to_numpy(dtype=float), accuracies
+
+### 2. RESAMPLING AND AGGREGATION ###
+
+def resample_rows(num_rows):
+    """
+    The (training rows, validation rows) positions of each fold or bootstrap resample.
+    """
+    if resampling == "kfold":
+        return list(KFold(n_splits=num_folds, shuffle=True, random_state=random_state).split(np.arange(num_rows)))
+
+    if resampling == "bootstrap":
+        generator = np.random.default_rng(random_state)
+        resamples = []
+        for _ in range(num_resamples):
+            train_rows = generator.integers(0, num_rows, size=num_rows)
+            drawn = np.zeros(num_rows, dtype=bool)
+            drawn[train_rows] = True
+            resamples.append((train_rows, np.flatnonzero(~drawn)))
+        return resamples
+
+    raise ValueError(f"`resampling` must be 'kfold' or 'bootstrap'. Got {resampling}.")
+
+
+def aggregate(results, num_resamples_run):
+    """
+    Combine the rules of every resample into the stability report.
+    """
+    support_values = defaultdict(list)
+    confidence_values = defaultdict(list)
+    accuracy_values = defaultdict(list)
+
+    for antecedents, consequents, supports, confidences, accuracies in results:
+        for antecedent, consequent, support, confidence, accuracy in zip(antecedents, consequents, supports, confidences, accuracies):
+            rule = (frozenset(antecedent), frozenset(consequent))
+            support_values[rule].append(support)
+            confidence_values[rule].append(confidence)
+            accuracy_values[rule].append(accuracy)
+
+    rules = list(accuracy_values)
+    report = pd.DataFrame({
+        "antecedents": [antecedent for antecedent, _ in rules],
+        "consequents": [consequent for _, consequent in rules],
+        "Frequency": [len(accuracy_values[rule]) / num_resamples_run for rule in rules],
+        "Appearances": [len(accuracy_values[rule]) for rule in rules],
+        "Mean Accuracy": [np.mean(accuracy_values[rule]) for rule in rules],
+        "Accuracy Variance": [np.var(accuracy_values[rule]) for rule in rules],
+        "Mean Support": [np.mean(support_values[rule]) for rule in rules],
+        "Mean Confidence": [np.mean(confidence_values[rule]) for rule in rules],
+    })
+
+    return report.sort_values(by=["Frequency", "Mean Accuracy"], ascending=False, ignore_index=True)
+
+
+def main():
+    if len(sys.argv) not in (6, 7):
+        print("Error. Enter arguments correctly")
+        sys.exit()
+
+    algorithm = sys.argv[1]
+    if algorithm not in algorithms:
+        print(f"Error. Unknown algorithm: {algorithm}")
+        sys.exit()
+
+    num_samples = int(sys.argv[2])
+    num_features = int(sys.argv[3])
+    minimum_support = float(sys.argv[4])
+    minimum_confidence = float(sys.argv[5])
+    num_workers = int(sys.argv[6]) if len(sys.argv) == 7 else os.cpu_count()
+
+    print(f"{algorithm} {num_samples}, {num_features}, {minimum_support}, {minimum_confidence}")
+
+    profiler = Profiler("rule_stability", run_report_dir, trace_memory, cprofile_stages, parameters={
+        "algorithm": algorithm,
+        "num_samples": num_samples,
+        "num_features": num_features,
+        "minimum_support": minimum_support,
+        "minimum_confidence": minimum_confidence,
+        "num_workers": num_workers,
+        "profile_information": profile_information,
+        "resampling": resampling,
+        "num_folds": num_folds,
+        "num_resamples": num_resamples,
+        "constrained_mining": constrained_mining,
+    })
+
+    # Load and sample the Boolean data as the training scripts do, and place it in shared memory
+    profiler.start("load")
+    data_path = data_path_with_profile if profile_information else data_path_without_profile
+    boolean_data = load_boolean_data(data_path)
+    boolean_data = boolean_data.sample(n=num_samples, random_state=41).sample(n=num_features, axis=1, random_state=41)
+    block, spec = share_array(boolean_data.to_numpy(dtype="uint8"))
+    profiler.stop(rows=len(boolean_data), columns=len(boolean_data.columns))
+
+    resamples = resample_rows(len(boolean_data))
+    print(f"{len(resamples)} {resampling} resamples on {num_workers} workers.")
+
+    # Mine and validate the resamples
+    profiler.start("resamples")
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=attach_boolean_data,
+                                 initargs=(spec, list(boolean_data.columns))) as executor:
+            futures = [
+                executor.submit(run_resample, algorithm, minimum_support, minimum_confidence, train_rows, validation_rows)
+                for train_rows, validation_rows in resamples
+            ]
+
+            for future in as_completed(futures):
+                results.append(future.result())
+                print(f"{len(results)}/{len(resamples)} resamples completed ({len(results[-1][0])} rules).")
+    finally:
+        block.close()
+        block.unlink()
+    profiler.stop(resamples=len(results), rules=sum(len(result[0]) for result in results))
+
+    # Aggregate the rules of the resamples
+    profiler.start("aggregate")
+    report = aggregate(results, len(resamples))
+    profiler.stop(rules=len(report))
+
+    # Save the stability report
+    profiler.start("save")
+    stability_file = stability_file_with_profile if profile_information else stability_file_without_profile
+    stability_file = stability_file.format(algorithm=algorithm, num_samples=num_samples, num_features=num_features)
+    report.to_csv(stability_file, index=False)
+    profiler.stop(rules=len(report))
+
+    print(f"Stability report of {len(report)} rules saved to {stability_file}")
+    print(f"Run report saved to {profiler.save()}")
+
+
+# Worker processes import this script, so the evaluation only runs when it is executed directly
+if __name__ == "__main__":
+    start_time = time.time()
+    main()
+    print("Execution time: {:.2f} seconds".format(time.time() - start_time))
@@ -1,5 +1,9 @@
 import pandas as pd
 import time
+from rule_evaluation import evaluate_rules
+from rule_io import load_rules
+from split_manifest import load_split
+from instrumentation import Profiler
 
 # Start time to measure the duration of the script
 start_time = time.time()
@@ -7,72 +11,83 @@ start_time = time.time()
 """
 Validation Script for Association Rules.
 
-This script evaluates the performance of association rules on a validation dataset. It calculates the accuracy of each rule as well as the average accuracy.
+This script evaluates the performance of association rules on a validation dataset. It calculates the accuracy of each rule as well as the average accuracy. The validation set is converted once into packed column bitsets, and the rules are evaluated in vectorized batches (see `rule_evaluation.py`). With `n_jobs` greater than 1, the validation rows are split into chunks evaluated on that many worker processes over shared memory, and their counts are summed before computing the accuracies.
 
 Parameters to be adjusted:
-    - `validation_data_path`: Path to the validation data CSV file.
-    - `rules_file_path`: Path to the rules CSV file.
+    - `split_manifest_path`: Path to the split manifest (.npz) written by the training run whose rules are validated. The validation set is materialized from the indices it stores, after checking that the Boolean data file has not changed (see `split_manifest.py`). Set to None to read `validation_data_path` instead.
+    - `validation_data_path`: Path to the validation data CSV file, used when `split_manifest_path` is None.
+    - `rules_file_path`: Path to the rules file, either a structured rule file (.npz) written by the training scripts or a rules CSV file.
     - `evaluation_results_path`: Path to the CSV file where evaluation results will be saved.
+    - `n_jobs`: Number of worker processes used to evaluate the rules (1, the default, evaluates them in this process; set it to e.g. `os.cpu_count()` for large validation sets).
+    - `run_report_dir`: Directory where the JSON run report is saved.
+    - `trace_memory`: Set to True to record the peak Python memory of each stage with tracemalloc (slower).
+    - `cprofile_stages`: Names of the stages to capture with cProfile, e.g. ['evaluate'].
 
 Note:
     This script does not use the `profile_information` parameter. The user decides which rules file to validate.
     
 Outputs:
     - A CSV file containing the evaluation results, including accuracy for each rule and average accuracy.
+    - A JSON run report with the time, peak memory and counts of the loading, evaluation and saving stages (see `instrumentation.py`).
 """
 
 # Parameters to be adjusted
+split_manifest_path = "path/to/splits/split_<run_id>.npz"
 validation_data_path = "path/to/Validation_Data_with_profile.csv"
 rules_file_path = "path/to/rules_apriori_1000x30_with_profile.csv"
 evaluation_results_path = "path/to/Evaluation_Results.csv"
-
-# Load the validation set
-validation_data = pd.read_csv(validation_data_path)
-
-# Define a function to evaluate rules
-def evaluate_rules(rules, data):
-    rule_accuracies = []
-
-    for _, rule in rules.iterrows():
-        antecedents = frozenset(rule['antecedents'].strip('frozenset({})').replace('\'', '').split(', '))
-        consequents = frozenset(rule['consequents'].strip('frozenset({})').replace('\'', '').split(', '))
-
-        # Check if antecedents are present in the data
-        antecedents_mask = data.apply(lambda row: antecedents.issubset(row.index[row == 1]), axis=1)
-        antecedents_data = data[antecedents_mask]
-
-        # Calculate accuracy for the rule
-        if len(antecedents_data) > 0:
-            # Check if consequents are present in the filtered data
-            consequents_mask = antecedents_data.apply(lambda row: consequents.issubset(row.index[row == 1]), axis=1)
-            accuracy = consequents_mask.mean()
-        else:
-            accuracy = 0
-
-        rule_accuracies.append({
-            'Rule': f"{rule['antecedents']} -> {rule['consequents']}",
-            'Accuracy': accuracy
-        })
-
-    return rule_accuracies
-
-# Load the rules
-rules = pd.read_csv(rules_file_path)
-
-# Evaluate the rules
-rule_accuracies = evaluate_rules(rules, validation_data)
-
-# Calculate average accuracy
-average_accuracy = pd.DataFrame(rule_accuracies)['Accuracy'].mean()
-
-# Store evaluation results
-results = [{
-    'Average Accuracy': average_accuracy
-}]
-results_df = pd.DataFrame(results)
-rule_accuracies_df = pd.DataFrame(rule_accuracies)
-combined_results_df = pd.concat([results_df, rule_accuracies_df], axis=1)
-combined_results_df.to_csv(evaluation_results_path, index=False)
-
-end_time = time.time()
-print("Execution time: {:.2f} seconds".format(end_time - start_time))
+n_jobs = 1
+run_report_dir = "path/to/profiles"
+trace_memory = False
+cprofile_stages = []
+
+
+def main():
+    profiler = Profiler("rules_validation", run_report_dir, trace_memory, cprofile_stages, parameters={
+        "split_manifest_path": split_manifest_path,
+        "validation_data_path": validation_data_path,
+        "rules_file_path": rules_file_path,
+        "n_jobs": n_jobs,
+    })
+
+    # Load the validation set
+    profiler.start("read_validation")
+    if split_manifest_path is not None:
+        validation_data = load_split(split_manifest_path, "validation")
+    else:
+        validation_data = pd.read_csv(validation_data_path)
+    profiler.stop(rows=len(validation_data), columns=len(validation_data.columns))
+
+    # Load the rules
+    profiler.start("load_rules")
+    rules = load_rules(rules_file_path)
+    profiler.stop(rules=len(rules))
+
+    # Evaluate the rules
+    profiler.start("evaluate")
+    rule_accuracies = evaluate_rules(rules, validation_data, n_jobs=n_jobs)
+    profiler.stop(rules=len(rule_accuracies))
+
+    # Calculate average accuracy
+    average_accuracy = pd.DataFrame(rule_accuracies)['Accuracy'].mean()
+
+    # Store evaluation results
+    profiler.start("save")
+    results = [{
+        'Average Accuracy': average_accuracy
+    }]
+    results_df = pd.DataFrame(results)
+    rule_accuracies_df = pd.DataFrame(rule_accuracies)
+    combined_results_df = pd.concat([results_df, rule_accuracies_df], axis=1)
+    combined_results_df.to_csv(evaluation_results_path, index=False)
+    profiler.stop()
+
+    print(f"Run report saved to {profiler.save()}")
+
+
+# Worker processes import this script, so the evaluation only runs when it is executed directly
+if __name__ == "__main__":
+    main()
+
+    end_time = time.time()
+    print("Execution time: {:.2f} seconds".format(end_time - start_time))
@@ -0,0 +1,116 @@
+"""
+Sampling-Based Frequent Itemset Mining.
+
+Approximate mining in the style of Toivonen (1996) for large datasets at low minimum supports:
+    1. A random sample of `sample_size` rows is mined at a lowered minimum support, `min_support - sqrt(ln(1 / failure_probability) / (2 * sample_size))`. By the Hoeffding inequality, an itemset that is frequent in the full data falls below the lowered threshold in the sample with probability at most `failure_probability`.
+    2. The itemsets found in the sample and their negative border (the itemsets not found whose proper subsets were all found) are counted in a single pass over the full data, with bitset ANDs and popcounts that share the work of common prefixes (see `bitsets.py`). The supports reported are therefore exact, and only itemsets found in the sample can be reported.
+    3. If an itemset of the negative border is frequent in the full data, some frequent itemsets may have been missed. With `complete=True` the candidates they generate are counted in further passes over the full data until no new itemset is frequent, so the result is exact; otherwise the number of frequent border itemsets is reported.
+
+Each itemset also carries its sample support and an error bound on it: the smallest of the Hoeffding bound `sqrt(ln(2 / failure_probability) / (2 * sample_size))` and the Chernoff bound `sqrt(3 * support * ln(2 / failure_probability) / sample_size)`, each holding with probability at least `1 - failure_probability`.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from bitsets import count_prefix_tree, pack_columns
+from eclat import eclat_bitsets
+from incremental_mining import candidate_itemsets
+
+
+def lowering_margin(sample_size, failure_probability):
+    """
+    One-sided Hoeffding margin by which the minimum support is lowered on the sample.
+    """
+    return math.sqrt(math.log(1 / failure_probability) / (2 * sample_size))
+
+
+def support_error_bound(support, sample_size, failure_probability):
+    """
+    Bound on the difference between the sample support and the support of an itemset, holding with probability at least `1 - failure_probability`.
+    """
+    hoeffding = math.sqrt(math.log(2 / failure_probability) / (2 * sample_size))
+    chernoff = np.sqrt(3 * np.asarray(support, dtype=float) * math.log(2 / failure_probability) / sample_size)
+
+    return np.minimum(hoeffding, chernoff)
+
+
+def negative_border(itemsets, num_items, max_len=None):
+    """
+    Itemsets that are not in `itemsets` but whose proper subsets all are, including the single items that are not in it.
+    """
+    border = {(item,) for item in range(num_items) if (item,) not in itemsets}
+    border.update(candidate for candidate in candidate_itemsets(itemsets, max_len) if candidate not in itemsets)
+
+    return border
+
+
+def mine_sampled(df, min_support, sample_size, failure_probability=0.05, max_len=None, complete=True,
+                 random_state=None, miner=None):
+    """
+    Get frequent itemsets from a one-hot DataFrame by mining a sample and verifying the candidates on the full data.
+
+    `miner` is the function used on the sample, with the signature of mlxtend's `apriori` and `fpgrowth` (Eclat on bitsets by default). Returns a DataFrame with the columns `support` (exact), `itemsets` (frozensets of column names), `sample_support` and `support_error_bound`. Its `attrs` hold the sample size, the lowered minimum support, the number of frequent border itemsets found and the number of passes over the full data.
+    """
+    if not 0 < failure_probability < 1:
+        raise ValueError(f"`failure_probability` must be within the interval `(0, 1)`. Got {failure_probability}.")
+
+    num_rows = len(df)
+    sample = df.sample(n=min(sample_size, num_rows), random_state=random_state)
+    sample_size = len(sample)
+
+    bitsets = pack_columns(df.to_numpy() == 1)
+    sample_bitsets = pack_columns(sample.to_numpy() == 1)
+    lowered_support = max(min_support - lowering_margin(sample_size, failure_probability), 1 / sample_size)
+
+    # 1. Mine the sample at the lowered minimum support
+    if miner is None:
+        found = [itemset for _, itemset in eclat_bitsets(sample_bitsets, sample_size, lowered_support, max_len)]
+    else:
+        found = miner(sample.astype(bool), min_support=lowered_support, use_colnames=False, max_len=max_len)['itemsets']
+    found = {tuple(sorted(int(item) for item in itemset)): None for itemset in found}
+
+    # 2. Count the sample itemsets and their negative border in one pass over the full data
+    border = negative_border(found, df.shape[1], max_len)
+    candidates = list(found) + list(border)
+    counts = dict(zip(candidates, count_prefix_tree(bitsets, candidates).tolist()))
+    passes = 1
+
+    frequent = {itemset: count for itemset, count in counts.items() if count / num_rows >= min_support}
+    border_failures = sum(1 for itemset in border if itemset in frequent)
+
+    # 3. Count the candidates generated by frequent border itemsets until no new itemset is frequent
+    if complete and border_failures:
+        while True:
+            candidates = [candidate for candidate in candidate_itemsets(frequent, max_len) if candidate not in counts]
+            if not candidates:
+                break
+
+            counts.update(zip(candidates, count_prefix_tree(bitsets, candidates).tolist()))
+            passes += 1
+
+            new_frequent = {candidate: counts[candidate] for candidate in candidates if counts[candidate] / num_rows >= min_support}
+            if not new_frequent:
+                break
+            frequent.update(new_frequent)
+
+    itemsets = sorted(frequent, key=len)
+    support = np.array([frequent[itemset] for itemset in itemsets], dtype=float) / num_rows
+    sample_support = count_prefix_tree(sample_bitsets, itemsets) / sample_size
+
+    labels = list(df.columns)
+    result = pd.DataFrame({
+        "support": support,
+        "itemsets": [frozenset(labels[item] for item in itemset) for itemset in itemsets],
+        "sample_support": sample_support,
+        "support_error_bound": support_error_bound(support, sample_size, failure_probability),
+    })
+    result.attrs.update({
+        "sample_size": sample_size,
+        "lowered_support": lowered_support,
+        "border_failures": border_failures,
+        "passes": passes,
+    })
+
+    return result
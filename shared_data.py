@@ -0,0 +1,33 @@
+"""
+Shared Memory Helpers.
+
+Helpers to place a NumPy array in a `multiprocessing.shared_memory` block once in the parent process, and to attach to it from worker processes without copying it.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def share_array(array):
+    """
+    Copy an array into a new shared memory block.
+
+    Returns the block, which the caller must close and unlink when done, and a picklable spec to attach to it from other processes.
+    """
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+
+    spec = {"name": block.name, "shape": array.shape, "dtype": array.dtype.str}
+    return block, spec
+
+
+def attach_array(spec):
+    """
+    Attach to a shared memory block created by `share_array`, returning the block and a read-only array view over it.
+    """
+    block = shared_memory.SharedMemory(name=spec["name"])
+    array = np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=block.buf)
+    array.flags.writeable = False
+    return block, array
@@ -0,0 +1,90 @@
+"""
+Train/Validation Split Manifests.
+
+A split manifest records a training/validation split of the Boolean data without copying it: the positions of the training and validation rows and the names of the sampled columns in the source data file, together with the SHA-256 of that file and the parameters of the split. A manifest is a small `.npz` archive written once per training run, so every run keeps its own split and the validation set of a run can be rebuilt exactly, or refused if the source data has changed since.
+
+The split is materialized on demand. For a packed `.bits` file (see `boolean_matrix.py`), the file is memory-mapped and only the words holding the selected rows of the selected columns are read, so processes materializing splits of the same file share its pages. For a CSV file, only the selected columns are parsed.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from artifact_cache import file_sha256
+from bitsets import WORD_BITS
+from boolean_matrix import open_packed
+
+
+def write_manifest(path, source_path, train_data, validation_data, source_hash=None, parameters=None):
+    """
+    Write the manifest of a split of the data file `source_path` into `train_data` and `validation_data`.
+
+    The index labels of both DataFrames must be row positions in the source file, as they are for DataFrames loaded with `load_boolean_data` and then sampled or split. `source_hash` is the SHA-256 of the source file, computed if not given.
+    """
+    if source_hash is None:
+        source_hash = file_sha256(source_path)
+
+    np.savez(
+        path,
+        source_path=np.array(str(source_path)),
+        source_sha256=np.array(source_hash),
+        columns=np.array([str(column) for column in train_data.columns], dtype=str),
+        train_rows=train_data.index.to_numpy(dtype=np.int64),
+        validation_rows=validation_data.index.to_numpy(dtype=np.int64),
+        parameters=np.array(json.dumps(parameters or {}, default=str)),
+    )
+
+
+def read_manifest(path):
+    """
+    Read a split manifest into a dictionary with the source path and hash, the column names, the training and validation row positions and the parameters of the split.
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        return {
+            "source_path": str(archive["source_path"]),
+            "source_sha256": str(archive["source_sha256"]),
+            "columns": archive["columns"].tolist(),
+            "train_rows": archive["train_rows"],
+            "validation_rows": archive["validation_rows"],
+            "parameters": json.loads(str(archive["parameters"])),
+        }
+
+
+def materialize(source_path, rows, columns):
+    """
+    Build the DataFrame of the given row positions and column names of a Boolean data file, indexed by the row positions.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+
+    if str(source_path).endswith(".bits"):
+        bitsets, source_columns, _ = open_packed(source_path)
+        column_index = {column: index for index, column in enumerate(source_columns)}
+        words = rows // WORD_BITS
+        shifts = (rows % WORD_BITS).astype(np.uint64)
+
+        # Gather from the memory map only the word holding each selected row of each selected column, and shift its bit down
+        bits = np.empty((len(rows), len(columns)), dtype=bool)
+        for position, column in enumerate(columns):
+            bits[:, position] = (bitsets[column_index[column], words] >> shifts) & np.uint64(1)
+        return pd.DataFrame(bits, index=rows, columns=columns)
+
+    data = pd.read_csv(source_path, usecols=columns)
+    return data.iloc[rows][columns]
+
+
+def load_split(path, subset="validation", verify=True):
+    """
+    Materialize the training ('train') or validation ('validation') set of a split manifest.
+
+    With `verify`, the source file is hashed first and a ValueError is raised if it no longer matches the manifest.
+    """
+    if subset not in ("train", "validation"):
+        raise ValueError(f"`subset` must be 'train' or 'validation'. Got {subset}.")
+
+    manifest = read_manifest(path)
+
+    if verify and file_sha256(manifest["source_path"]) != manifest["source_sha256"]:
+        raise ValueError(f"{manifest['source_path']} has changed since the split manifest {path} was written.")
+
+    return materialize(manifest["source_path"], manifest[f"{subset}_rows"], manifest["columns"])
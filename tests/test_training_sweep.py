@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+import training_sweep
+from results_store import load_results
+
+
+def test_run_combination_without_rules(tmp_path, monkeypatch):
+    """
+    A combination whose frequent itemsets produce no 'inf_' -> 'usr_' rule completes and writes an empty rule file.
+    """
+    # Only the 'usr_' columns are frequent at a support of 0.6
+    generator = np.random.default_rng(0)
+    columns = [f"inf_{index}" for index in range(4)] + [f"usr_{index}" for index in range(4)]
+    densities = np.array([0.3] * 4 + [0.95] * 4)
+    boolean_data = pd.DataFrame(generator.random((200, len(columns))) < densities, columns=columns).astype("uint8")
+
+    monkeypatch.setattr(training_sweep, "_boolean_data", boolean_data)
+    monkeypatch.setattr(training_sweep, "_data_path", str(tmp_path / "Boolean_Data.csv"))
+    monkeypatch.setattr(training_sweep, "_data_hash", "0" * 64)
+    monkeypatch.setattr(training_sweep, "results_db", str(tmp_path / "results.db"))
+    monkeypatch.setattr(training_sweep, "output_file_without_profile", str(tmp_path / "rules_{algorithm}.csv"))
+    monkeypatch.setattr(training_sweep, "rules_file_without_profile", str(tmp_path / "rules_{algorithm}.npz"))
+    monkeypatch.setattr(training_sweep, "split_manifest_file", str(tmp_path / "split_{run_id}.npz"))
+
+    for algorithm in ("apriori", "fpmax"):
+        training_sweep.run_combination(algorithm, 100, 8, 0.6, 0.5)
+
+        results = load_results(str(tmp_path / "results.db"), algorithm)
+        assert results["Execution Completed"].tolist() == ["Yes"]
+        assert len(pd.read_csv(tmp_path / f"rules_{algorithm}.csv")) == 0
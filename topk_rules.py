@@ -0,0 +1,111 @@
+"""
+Top-K Antecedent -> Consequent Rule Mining.
+
+Mining in the style of TopKRules (Fournier-Viger et al., 2012): instead of a minimum support, the number `k` of rules to return is given, together with a minimum confidence, and the k rules with the highest support whose antecedents are all `inf_*` items and whose consequents are all `usr_*` items are returned.
+
+Rules are grown from the single-item rules {a} -> {c} by right expansions (adding a consequent item) and left expansions (adding an antecedent item). Items are only added in increasing index order, and a rule obtained by a left expansion is only expanded to the left, so every rule is generated exactly once. Both expansions can only lower the support, so candidate rules are explored best-first from a priority queue ordered by support: the support of the last rule taken from the queue acts as a minimum support that rises as good rules are found, and the search stops once k rules reach the minimum confidence, without expanding any rule below the support of the k-th one. Low-confidence rules are still expanded, since a left expansion can raise the confidence.
+
+When few rules reach the minimum confidence, the search can go down to very low supports; `min_support` sets a floor below which candidate rules are not explored, in which case fewer than k rules may be returned.
+
+Supports are computed on packed uint64 bitsets (see `bitsets.py`), and all the expansions of a rule are counted with one vectorized AND and popcount.
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from bitsets import count_itemsets, intersect, pack_columns, popcount
+from constrained_mining import _class_items
+
+
+def top_k_rules_bitsets(bitsets, num_rows, antecedent_items, consequent_items, k, min_confidence=0.0, min_support=None, max_len=None):
+    """
+    Find the k antecedent -> consequent rules of item indices with the highest support whose confidence reaches `min_confidence`, and whose support reaches `min_support` if given.
+
+    Ties in support are broken by confidence. Returns a list of (joint count, antecedent count, antecedent tuple, consequent tuple), by decreasing support.
+    """
+    if k <= 0:
+        raise ValueError(f"`k` must be a positive integer. Got {k}.")
+
+    antecedent_items = np.asarray(antecedent_items, dtype=np.intp)
+    consequent_items = np.asarray(consequent_items, dtype=np.intp)
+
+    # Priority queue of candidate rules: (-joint count, -confidence, insertion order, antecedent, consequent, antecedent count, right expandable)
+    queue = []
+    order = 0
+    min_count = 1 if min_support is None else max(1, int(np.ceil(min_support * num_rows - 1e-9)))
+
+    def push(joint_counts, antecedent_counts, antecedents, consequents, right_expandable):
+        nonlocal order
+        for joint_count, antecedent_count, antecedent, consequent in zip(joint_counts.tolist(), antecedent_counts.tolist(), antecedents, consequents):
+            if joint_count >= min_count:
+                heapq.heappush(queue, (-joint_count, -joint_count / antecedent_count, order, antecedent, consequent, antecedent_count, right_expandable))
+                order += 1
+
+    # Single-item rules {a} -> {c}
+    for item in antecedent_items.tolist():
+        joint_counts = popcount(bitsets[consequent_items] & bitsets[item])
+        antecedent_counts = np.full(len(consequent_items), popcount(bitsets[item]))
+        push(joint_counts, antecedent_counts, [(item,)] * len(consequent_items),
+             [(int(consequent),) for consequent in consequent_items], True)
+
+    rules = []
+    while queue and len(rules) < k:
+        negative_joint_count, negative_confidence, _, antecedent, consequent, antecedent_count, right_expandable = heapq.heappop(queue)
+
+        if -negative_confidence >= min_confidence:
+            rules.append((-negative_joint_count, antecedent_count, antecedent, consequent))
+
+        if max_len is not None and len(antecedent) + len(consequent) >= max_len:
+            continue
+
+        antecedent_bitset = intersect(bitsets, antecedent)
+        joint_bitset = antecedent_bitset & intersect(bitsets, consequent)
+
+        # Left expansions: add an antecedent item, which changes the antecedent count as well
+        left = antecedent_items[antecedent_items > antecedent[-1]]
+        if len(left):
+            push(popcount(bitsets[left] & joint_bitset), popcount(bitsets[left] & antecedent_bitset),
+                 [antecedent + (int(item),) for item in left], [consequent] * len(left), False)
+
+        # Right expansions: add a consequent item
+        right = consequent_items[consequent_items > consequent[-1]] if right_expandable else consequent_items[:0]
+        if len(right):
+            push(popcount(bitsets[right] & joint_bitset), np.full(len(right), antecedent_count),
+                 [antecedent] * len(right), [consequent + (int(item),) for item in right], True)
+
+    return rules
+
+
+def top_k_rules(df, k, min_confidence=0.0, min_support=None, antecedent_prefix="inf_", consequent_prefix="usr_", max_len=None):
+    """
+    Find the k antecedent -> consequent rules with the highest support in a one-hot DataFrame.
+
+    Returns a DataFrame with the columns `antecedents`, `consequents`, `antecedent support`, `consequent support`, `support` and `confidence`, like `constrained_association_rules`.
+    """
+    num_rows = len(df)
+    columns = list(df.columns)
+    bitsets = pack_columns(df.to_numpy() == 1)
+
+    rules = top_k_rules_bitsets(
+        bitsets, num_rows,
+        _class_items(columns, antecedent_prefix), _class_items(columns, consequent_prefix),
+        k, min_confidence=min_confidence, min_support=min_support, max_len=max_len
+    )
+    consequent_counts = count_itemsets(bitsets, [consequent for _, _, _, consequent in rules])
+
+    return pd.DataFrame(
+        [
+            (
+                frozenset(columns[item] for item in antecedent),
+                frozenset(columns[item] for item in consequent),
+                antecedent_count / num_rows,
+                consequent_count / num_rows,
+                joint_count / num_rows,
+                (joint_count / num_rows) / (antecedent_count / num_rows)
+            )
+            for (joint_count, antecedent_count, antecedent, consequent), consequent_count in zip(rules, consequent_counts.tolist())
+        ],
+        columns=["antecedents", "consequents", "antecedent support", "consequent support", "support", "confidence"]
+    )
@@ -1,8 +1,17 @@
-import pandas as pd
 import sys
-import os
 import time
 from sklearn.model_selection import train_test_split
+from rule_io import write_rules
+from rule_generation import write_association_rules
+from boolean_matrix import load_boolean_data
+from feature_screening import screen_features
+from results_store import start_run, record_results
+from rule_significance import add_significance
+from split_manifest import write_manifest
+from instrumentation import Profiler
+from artifact_cache import ArtifactCache
+from constrained_mining import mine_constrained, constrained_association_rules
+from sampling_mining import mine_sampled
 from mlxtend.frequent_patterns import apriori, association_rules
 
 # Start time to measure the duration of the script
@@ -11,7 +20,7 @@ start_time = time.time()
 """
 Apriori Implementation Script.
 
-This script executes the Apriori algorithm on a training set to find frequent itemsets and then generates association rules. The results are recorded in an Excel file.
+This script executes the Apriori algorithm on a training set to find frequent itemsets and then generates association rules. The results are recorded in a results database.
 
 Usage:
     python training_Apriori.py <num_samples> <num_features> <minimum_support> <minimum_confidence>
@@ -24,36 +33,82 @@ Arguments:
 
 Parameters to be adjusted:
     - `profile_information`: Set to True if profile information is included, otherwise set to False.
-    - `excel_file`: Path to the Excel file where results will be recorded.
-    - `data_path_with_profile`: Path to the Boolean data CSV file with profile information.
-    - `data_path_without_profile`: Path to the Boolean data CSV file without profile information.
+    - `feature_selection`: How the `num_features` columns are chosen: 'random' to sample them at random, or 'mutual_information' / 'lift' to keep the columns of the 'inf_' -> 'usr_' column pairs with the highest mutual information or lift on the training rows, among the pairs whose support reaches the minimum support (see `feature_screening.py`).
+    - `results_db`: Path to the SQLite results database where results will be recorded (see `results_store.py`).
+    - `data_path_with_profile`: Path to the Boolean data CSV file or packed bit file (.bits) with profile information.
+    - `data_path_without_profile`: Path to the Boolean data CSV file or packed bit file (.bits) without profile information.
     - `output_file_with_profile`: Path to the output CSV file for association rules with profile data.
     - `output_file_without_profile`: Path to the output CSV file for association rules without profile data.
+    - `rules_file_with_profile`: Path to the structured rule file (.npz) for association rules with profile data.
+    - `rules_file_without_profile`: Path to the structured rule file (.npz) for association rules without profile data.
+    - `split_manifest_file`: Path to the split manifest (.npz) of each run, storing the row and column indices of the training and validation sets and the hash of the Boolean data file instead of copies of the data (see `split_manifest.py`). `rules_validation.py` materializes the validation set from it.
+    - `save_split_data`: Set to True to also save CSV copies of the training and validation sets.
     - `train_data_path_with_profile`: Path to save the training data CSV file with profile information.
     - `train_data_path_without_profile`: Path to save the training data CSV file without profile information.
     - `validation_data_path_with_profile`: Path to save the validation data CSV file with profile information.
     - `validation_data_path_without_profile`: Path to save the validation data CSV file without profile information.
+    - `constrained_mining`: Set to True to mine only the itemsets that can produce rules with 'inf_' antecedents and 'usr_' consequents, generating only that split of each itemset (see `constrained_mining.py`). Otherwise Apriori mines every frequent itemset and the rules are filtered afterwards.
+    - `approximate_mining`: Set to True to mine a sample of `sample_size` training rows with Apriori at a lowered minimum support and verify the itemsets found in one pass over the whole training set (see `sampling_mining.py`). The supports are exact; a frequent itemset is missed in the sample with probability at most `failure_probability`, and missed itemsets are recovered with further passes when the verification detects them. Ignored when `constrained_mining` is True.
+    - `sample_size`: Number of training rows mined when `approximate_mining` is True.
+    - `failure_probability`: Probability bound of missing a frequent itemset in the sample when `approximate_mining` is True.
+    - `streaming_rules`: Set to True to generate only the rules with 'inf_' antecedents and 'usr_' consequents, with only the metrics saved, and write them to the output files in chunks of `rule_chunk_size` rules instead of building every rule in memory (see `rule_generation.py`). The rules are then saved in generation order rather than sorted by confidence. Ignored when `constrained_mining` is True.
+    - `rule_chunk_size`: Number of rules generated and written at a time when `streaming_rules` is True.
+    - `significance_test`: 'fisher' or 'chi2' to test each rule against the independence of its antecedents and consequents on the training set, adding its p-value and adjusted p-value to the saved rules (see `rule_significance.py`), or None to skip the test. Ignored when `streaming_rules` is True and `constrained_mining` is False.
+    - `p_value_correction`: Multiple-testing correction of the p-values, 'fdr_bh' (Benjamini-Hochberg) or 'holm'.
+    - `significance_level`: Maximum adjusted p-value of the rules kept when `filter_insignificant` is True.
+    - `filter_insignificant`: Set to True to save only the rules whose adjusted p-value is at most `significance_level`. Rules that could not be tested are kept.
+    - `use_cache`: Set to True to reuse the data split and the frequent itemsets of earlier runs with the same input data and parameters (see `artifact_cache.py`), so a run that only changes `minimum_confidence` goes straight to rule generation.
+    - `cache_dir`: Directory of the artifact cache.
+    - `cache_max_mb`: Size bound of the artifact cache in MB, beyond which the least recently used artifacts are evicted.
+    - `run_report_dir`: Directory where the JSON run report is saved.
+    - `trace_memory`: Set to True to record the peak Python memory of each stage with tracemalloc (slower).
+    - `cprofile_stages`: Names of the stages to capture with cProfile, e.g. ['mining'].
 
 Outputs:
-    - An Excel file recording the initial parameters, Apriori execution time, number of frequent itemsets, association rules execution time, and total execution time. The Excel file will be saved at the specified path.
+    - A run in the results database recording the initial parameters, Apriori execution time, number of frequent itemsets, association rules execution time, and total execution time. The results can be exported to the Excel layout with `python results_store.py <results_db> <excel_file> apriori`.
     - A CSV file containing the generated association rules. The file name is constructed based on the input parameters and indicates whether profile information is included. The CSV file includes the following columns:
         - antecedents: The antecedent itemsets of the rule.
         - consequents: The consequent itemsets of the rule.
         - support: The support value of the rule.
         - confidence: The confidence value of the rule.
+        - p-value / adjusted p-value: The significance of the rule and its value adjusted for multiple testing, when `significance_test` is set.
+    - A structured rule file (.npz) with the same rules, storing the itemsets as item IDs plus an item dictionary so they can be loaded without string parsing (see `rule_io.py`).
+    - A split manifest (.npz) with the row and column indices of the training and validation sets, whose path is recorded in the results database as 'Split Manifest'.
+    - A JSON run report with the time, peak memory and counts of the loading, mining, rule generation, filtering and saving stages (see `instrumentation.py`).
 """
 
 # Parameters to be adjusted
 data_path_with_profile = "path/to/Boolean_Data_with_profile.csv"
 data_path_without_profile = "path/to/Boolean_Data.csv"
-excel_file = "path/to/Apriori_results.xlsx"
+results_db = "path/to/results.db"
 output_file_with_profile = "path/to/rules_apriori_{num_samples}x{num_features}_with_profile.csv"
 output_file_without_profile = "path/to/rules_apriori_{num_samples}x{num_features}.csv"
+rules_file_with_profile = "path/to/rules_apriori_{num_samples}x{num_features}_with_profile.npz"
+rules_file_without_profile = "path/to/rules_apriori_{num_samples}x{num_features}.npz"
 train_data_path_with_profile = "path/to/Train_Data_with_profile.csv"
 train_data_path_without_profile = "path/to/Train_Data.csv"
 validation_data_path_with_profile = "path/to/Validation_Data_with_profile.csv"
 validation_data_path_without_profile = "path/to/Validation_Data.csv"
+split_manifest_file = "path/to/splits/split_{run_id}.npz"
+save_split_data = False
 profile_information = False
+feature_selection = "random"
+constrained_mining = False
+approximate_mining = False
+sample_size = 10000
+failure_probability = 0.05
+streaming_rules = False
+rule_chunk_size = 100000
+significance_test = None
+p_value_correction = "fdr_bh"
+significance_level = 0.05
+filter_insignificant = True
+use_cache = False
+cache_dir = "path/to/cache"
+cache_max_mb = 4096
+run_report_dir = "path/to/profiles"
+trace_memory = False
+cprofile_stages = []
 
 # Verify parameters
 if len(sys.argv) != 5:
@@ -70,92 +125,186 @@ print(f"{num_samples}, {num_features}, {minimum_support}, {minimum_confidence}")
 # Start time to measure the duration of the script
 start_time = time.time()
 
-# Initial results data for Excel, assuming execution has not yet completed
-initial_results = {
-    "Num Samples": [num_samples],
-    "Num Features": [num_features],
-    "Minimum Support": [minimum_support],
-    "Minimum Confidence": [minimum_confidence],
-    "Execution Completed": ["No"],
-}
-
-initial_df = pd.DataFrame(initial_results)
-
-# Write initial data to Excel
-if os.path.exists(excel_file):
-    old_df = pd.read_excel(excel_file)
-    updated_df = pd.concat([old_df, initial_df], ignore_index=True)
-else:
-    updated_df = initial_df
-updated_df.to_excel(excel_file, index=False)
+# Record the initial parameters of this run, assuming execution has not yet completed
+run_id = start_run(results_db, "apriori", {
+    "Num Samples": num_samples,
+    "Num Features": num_features,
+    "Minimum Support": minimum_support,
+    "Minimum Confidence": minimum_confidence,
+    "Execution Completed": "No",
+})
+
+print(f"Initial parameters recorded (run {run_id}).")
+
+profiler = Profiler("training_Apriori", run_report_dir, trace_memory, cprofile_stages, parameters={
+    "run_id": run_id,
+    "num_samples": num_samples,
+    "num_features": num_features,
+    "minimum_support": minimum_support,
+    "minimum_confidence": minimum_confidence,
+    "profile_information": profile_information,
+    "feature_selection": feature_selection,
+    "constrained_mining": constrained_mining,
+    "approximate_mining": approximate_mining,
+    "streaming_rules": streaming_rules,
+    "use_cache": use_cache,
+})
+
+data_path = data_path_with_profile if profile_information else data_path_without_profile
 
-print("Initial parameters recorded in Excel.")
+# Cache keys of the data split and of the frequent itemsets, which do not depend on the minimum confidence
+cache = ArtifactCache(cache_dir, cache_max_mb * 2 ** 20) if use_cache else None
+if cache is not None:
+    split_key = cache.key("split", [data_path], profile_information=profile_information, num_samples=num_samples,
+                          num_features=num_features, sample_random_state=41, split_random_state=42,
+                          feature_selection=feature_selection, screening_support=None if feature_selection == "random" else minimum_support)
+    mining_parameters = {"minimum_support": minimum_support, "constrained_mining": constrained_mining, "approximate_mining": approximate_mining}
+    if constrained_mining:
+        # Constrained mining prunes with the minimum confidence as well
+        mining_parameters["minimum_confidence"] = minimum_confidence
+    elif approximate_mining:
+        mining_parameters.update(sample_size=sample_size, failure_probability=failure_probability)
+    mining_key = cache.key("apriori", split_key=split_key, **mining_parameters)
 
 # Continue with the rest of the script
-data_path = data_path_with_profile if profile_information else data_path_without_profile
-boolean_data = pd.read_csv(data_path)
-boolean_data = boolean_data.sample(n=num_samples, random_state=41).sample(n=num_features, axis=1, random_state=41)
-train_data, validation_data = train_test_split(boolean_data, test_size=0.3, random_state=42)
-
-# Save the training and validation sets
-if profile_information:
-    train_data.to_csv(train_data_path_with_profile, index=False)
-    validation_data.to_csv(validation_data_path_with_profile, index=False)
+profiler.start("load")
+splits = cache.get(split_key) if cache is not None else None
+if splits is None:
+    boolean_data = load_boolean_data(data_path).sample(n=num_samples, random_state=41)
+    train_data, validation_data = train_test_split(boolean_data, test_size=0.3, random_state=42)
+    # Keep `num_features` columns, screened on the training rows only so the validation rows play no part in the choice
+    if feature_selection == "random":
+        columns = train_data.sample(n=num_features, axis=1, random_state=41).columns
+    else:
+        columns = screen_features(train_data, num_features, feature_selection, min_support=minimum_support)
+    train_data, validation_data = train_data[columns], validation_data[columns]
+    if cache is not None:
+        cache.put(split_key, (train_data, validation_data))
 else:
-    train_data.to_csv(train_data_path_without_profile, index=False)
-    validation_data.to_csv(validation_data_path_without_profile, index=False)
+    train_data, validation_data = splits
+profiler.stop(rows=len(train_data) + len(validation_data), columns=len(train_data.columns), cached=splits is not None)
+
+# Save the split manifest, and the training and validation sets if requested
+profiler.start("save_splits")
+split_manifest = split_manifest_file.format(run_id=run_id)
+write_manifest(split_manifest, data_path, train_data, validation_data, source_hash=cache.file_hash(data_path) if cache is not None else None,
+               parameters={"num_samples": num_samples, "num_features": num_features, "profile_information": profile_information,
+                           "sample_random_state": 41, "split_random_state": 42, "test_size": 0.3})
+if save_split_data:
+    if profile_information:
+        train_data.to_csv(train_data_path_with_profile, index=False)
+        validation_data.to_csv(validation_data_path_with_profile, index=False)
+    else:
+        train_data.to_csv(train_data_path_without_profile, index=False)
+        validation_data.to_csv(validation_data_path_without_profile, index=False)
+profiler.stop(rows=len(train_data) + len(validation_data))
+
+record_results(results_db, run_id, "apriori", {"Split Manifest": split_manifest})
 
 train_data = train_data.astype(bool)
 
 # Apriori Algorithm
 apriori_start = time.time()
-frequent_itemsets = apriori(train_data, min_support=minimum_support, use_colnames=True)
+profiler.start("mining")
+frequent_itemsets = cache.get(mining_key) if cache is not None else None
+cached_itemsets = frequent_itemsets is not None
+if not cached_itemsets:
+    if constrained_mining:
+        frequent_itemsets = mine_constrained(train_data, minimum_support, minimum_confidence)
+    elif approximate_mining:
+        frequent_itemsets = mine_sampled(train_data, minimum_support, sample_size, failure_probability, random_state=41, miner=apriori)
+        print(f"Sampled mining: {frequent_itemsets.attrs}")
+    else:
+        frequent_itemsets = apriori(train_data, min_support=minimum_support, use_colnames=True)
+    if cache is not None:
+        cache.put(mining_key, frequent_itemsets)
+profiler.stop(itemsets=len(frequent_itemsets), cached=cached_itemsets)
 apriori_end = time.time()
 apriori_time = apriori_end - apriori_start
 num_frequent_itemsets = len(frequent_itemsets)
 
 print("Apriori completed.")
 
-# Update the Excel file with Apriori results before starting association rules
-if os.path.exists(excel_file):
-    existing_df = pd.read_excel(excel_file)
-    last_row_index = existing_df.index[-1]
-    existing_df.loc[last_row_index, "Apriori Execution Time (s)"] = apriori_time
-    existing_df.loc[last_row_index, "Number of Frequent Itemsets"] = num_frequent_itemsets
-    existing_df.loc[last_row_index, "Execution Completed"] = "No"
-    existing_df.to_excel(excel_file, index=False)
+# Record the Apriori results before starting association rules
+record_results(results_db, run_id, "apriori", {
+    "Apriori Execution Time (s)": apriori_time,
+    "Number of Frequent Itemsets": num_frequent_itemsets,
+    "Frequent Itemsets Cached": "Yes" if cached_itemsets else "No",
+    "Execution Completed": "No",
+})
+
+# Construct file names based on parameters
+file_name = output_file_with_profile if profile_information else output_file_without_profile
+file_name = file_name.format(num_samples=num_samples, num_features=num_features)
+rules_file = rules_file_with_profile if profile_information else rules_file_without_profile
+rules_file = rules_file.format(num_samples=num_samples, num_features=num_features)
 
 # Association rules
 association_start = time.time()
-rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=minimum_confidence)
+profiler.start("association_rules")
+if constrained_mining:
+    # Every mined itemset has a single valid split, so no filtering is needed
+    profiler.start("rule_generation")
+    rules = constrained_association_rules(frequent_itemsets, min_confidence=minimum_confidence)
+    profiler.stop(rules=len(rules))
+elif streaming_rules:
+    # Only the 'inf_' -> 'usr_' rules are generated, and they are saved chunk by chunk without being kept in memory
+    profiler.start("rule_generation")
+    num_rules = write_association_rules(frequent_itemsets, file_name, rules_file, min_threshold=minimum_confidence,
+                                        num_rows=len(train_data), chunk_size=rule_chunk_size)
+    profiler.stop(rules=num_rules)
+else:
+    profiler.start("rule_generation")
+    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=minimum_confidence)
 
-# Filter rules to include only those with antecedents starting with 'inf_' and consequents starting with 'usr_'
-rules['antecedents_inf'] = rules['antecedents'].apply(lambda x: all(str(item).startswith('inf_') for item in x))
-rules['consequents_usr'] = rules['consequents'].apply(lambda x: all(str(item).startswith('usr_') for item in x))
+    profiler.stop(rules=len(rules))
+    profiler.start("filter")
 
-# Filter rules to exclude those with any 'usr_' in antecedents or any 'inf_' in consequents
-rules = rules[rules['antecedents_inf']]
-rules = rules[rules['consequents_usr']]
+    # Filter rules to include only those with antecedents starting with 'inf_' and consequents starting with 'usr_'
+    rules['antecedents_inf'] = rules['antecedents'].apply(lambda x: all(str(item).startswith('inf_') for item in x))
+    rules['consequents_usr'] = rules['consequents'].apply(lambda x: all(str(item).startswith('usr_') for item in x))
 
-# Drop unnecessary columns
-rules.drop(columns=['antecedents_inf', 'consequents_usr'], inplace=True)
+    # Filter rules to exclude those with any 'usr_' in antecedents or any 'inf_' in consequents
+    rules = rules[rules['antecedents_inf']]
+    rules = rules[rules['consequents_usr']]
 
-# Drop unnecessary metrics
-rules.drop(columns=['lift', 'leverage', 'conviction', 'zhangs_metric'], inplace=True)
+    # Drop unnecessary columns
+    rules.drop(columns=['antecedents_inf', 'consequents_usr'], inplace=True)
 
-# Calculate the support of each rule
-rules['support'] = rules['support'] * len(train_data)
+    # Drop unnecessary metrics
+    rules.drop(columns=['lift', 'leverage', 'conviction', 'zhangs_metric'], inplace=True)
+    profiler.stop(rules=len(rules))
 
-# Sort the rules by confidence
-rules = rules.sort_values(by=['confidence'], ascending=False)
+if constrained_mining or not streaming_rules:
+    if significance_test is not None:
+        # Test each rule against the independence of its antecedents and consequents, keeping only the significant ones if requested
+        profiler.start("significance")
+        rules = add_significance(rules, len(train_data), significance_test, p_value_correction)
+        untested = rules['adjusted p-value'].isna()
+        if untested.any():
+            print(f"{untested.sum()} rules lack antecedent or consequent supports and could not be tested; they are kept.")
+        if filter_insignificant:
+            rules = rules[untested | (rules['adjusted p-value'] <= significance_level)]
+        profiler.stop(rules=len(rules))
 
-# Construct file name based on parameters
-file_name = output_file_with_profile if profile_information else output_file_without_profile
-file_name = file_name.format(num_samples=num_samples, num_features=num_features)
+    profiler.start("save_rules")
+
+    # Calculate the support of each rule
+    rules['support'] = rules['support'] * len(train_data)
+
+    # Sort the rules by confidence
+    rules = rules.sort_values(by=['confidence'], ascending=False)
+
+    # Save the DataFrame to a CSV file
+    rules.to_csv(file_name, index=False)
+
+    # Save the rules to a structured rule file
+    write_rules(rules, rules_file)
+    profiler.stop()
 
-# Save the DataFrame to a CSV file
-rules.to_csv(file_name, index=False)
+    num_rules = len(rules)
 
+profiler.stop(rules=num_rules)
 association_end = time.time()
 association_time = association_end - association_start
 
@@ -165,12 +314,12 @@ print("Association rules generated.")
 end_time = time.time()
 total_time = end_time - start_time
 
-# Final results for Excel, updating the initial data
-if os.path.exists(excel_file):
-    existing_df = pd.read_excel(excel_file)
-    existing_df.loc[last_row_index, "Association Rules Time (s)"] = association_time
-    existing_df.loc[last_row_index, "Total Execution Time (s)"] = total_time
-    existing_df.loc[last_row_index, "Execution Completed"] = "Yes"
-    existing_df.to_excel(excel_file, index=False)
+# Final results, completing the run
+record_results(results_db, run_id, "apriori", {
+    "Association Rules Time (s)": association_time,
+    "Total Execution Time (s)": total_time,
+    "Execution Completed": "Yes",
+})
 
-print("All results recorded in Excel.\n")
+print(f"Run report saved to {profiler.save()}")
+print("All results recorded.\n")
@@ -0,0 +1,225 @@
+import sys
+import time
+from sklearn.model_selection import train_test_split
+from rule_io import write_rules
+from boolean_matrix import load_boolean_data
+from feature_screening import screen_features
+from results_store import start_run, record_results
+from rule_significance import add_significance
+from split_manifest import write_manifest
+from instrumentation import Profiler
+from topk_rules import top_k_rules
+
+# Start time to measure the duration of the script
+start_time = time.time()
+
+"""
+Top-K Rules Implementation Script.
+
+This script mines the k association rules with the highest support whose antecedents are 'inf_' items, whose consequents are 'usr_' items and whose confidence reaches the minimum confidence, directly on a training set. No minimum support has to be tuned: the search raises its support threshold as rules reaching the minimum confidence are found (see `topk_rules.py`). The results are recorded in a results database.
+
+Usage:
+    python training_TopKRules.py <num_samples> <num_features> <k> <minimum_confidence>
+
+Arguments:
+    - num_samples: int - Number of samples to be used from the dataset.
+    - num_features: int - Number of features to be used from the dataset.
+    - k: int - Number of rules to be mined.
+    - minimum_confidence: float - Minimum confidence value for the association rules.
+
+Parameters to be adjusted:
+    - `profile_information`: Set to True if profile information is included, otherwise set to False.
+    - `feature_selection`: How the `num_features` columns are chosen: 'random' to sample them at random, or 'mutual_information' / 'lift' to keep the columns of the 'inf_' -> 'usr_' column pairs with the highest mutual information or lift on the training rows, among the pairs whose support reaches `minimum_support_floor` (see `feature_screening.py`).
+    - `results_db`: Path to the SQLite results database where results will be recorded (see `results_store.py`).
+    - `data_path_with_profile`: Path to the Boolean data CSV file or packed bit file (.bits) with profile information.
+    - `data_path_without_profile`: Path to the Boolean data CSV file or packed bit file (.bits) without profile information.
+    - `output_file_with_profile`: Path to the output CSV file for association rules with profile data.
+    - `output_file_without_profile`: Path to the output CSV file for association rules without profile data.
+    - `rules_file_with_profile`: Path to the structured rule file (.npz) for association rules with profile data.
+    - `rules_file_without_profile`: Path to the structured rule file (.npz) for association rules without profile data.
+    - `split_manifest_file`: Path to the split manifest (.npz) of each run, storing the row and column indices of the training and validation sets and the hash of the Boolean data file instead of copies of the data (see `split_manifest.py`). `rules_validation.py` materializes the validation set from it.
+    - `save_split_data`: Set to True to also save CSV copies of the training and validation sets.
+    - `train_data_path_with_profile`: Path to save the training data CSV file with profile information.
+    - `train_data_path_without_profile`: Path to save the training data CSV file without profile information.
+    - `validation_data_path_with_profile`: Path to save the validation data CSV file with profile information.
+    - `validation_data_path_without_profile`: Path to save the validation data CSV file without profile information.
+    - `minimum_support_floor`: Support below which no rule is explored, or None. With a high minimum confidence few rules may reach it, and the floor stops the search from going down to very rare rules, possibly returning fewer than k rules.
+    - `max_len`: Maximum number of items of a rule, or None.
+    - `significance_test`: 'fisher' or 'chi2' to test each rule against the independence of its antecedents and consequents on the training set, adding its p-value and adjusted p-value to the saved rules (see `rule_significance.py`), or None to skip the test.
+    - `p_value_correction`: Multiple-testing correction of the p-values, 'fdr_bh' (Benjamini-Hochberg) or 'holm'.
+    - `significance_level`: Maximum adjusted p-value of the rules kept when `filter_insignificant` is True.
+    - `filter_insignificant`: Set to True to save only the rules whose adjusted p-value is at most `significance_level`. Rules that could not be tested are kept.
+    - `run_report_dir`: Directory where the JSON run report is saved.
+    - `trace_memory`: Set to True to record the peak Python memory of each stage with tracemalloc (slower).
+    - `cprofile_stages`: Names of the stages to capture with cProfile, e.g. ['mining'].
+
+Outputs:
+    - A run in the results database recording the initial parameters, mining execution time, number of rules, the minimum support reached by the search, and total execution time. The results can be exported to the Excel layout with `python results_store.py <results_db> <excel_file> topk`.
+    - A CSV file containing the mined association rules, in the same shape as the other training scripts. The file name is constructed based on the input parameters and indicates whether profile information is included. The CSV file includes the following columns:
+        - antecedents: The antecedent itemsets of the rule.
+        - consequents: The consequent itemsets of the rule.
+        - support: The support value of the rule.
+        - confidence: The confidence value of the rule.
+        - p-value / adjusted p-value: The significance of the rule and its value adjusted for multiple testing, when `significance_test` is set.
+    - A structured rule file (.npz) with the same rules, storing the itemsets as item IDs plus an item dictionary so they can be loaded without string parsing (see `rule_io.py`).
+    - A split manifest (.npz) with the row and column indices of the training and validation sets, whose path is recorded in the results database as 'Split Manifest'.
+    - A JSON run report with the time, peak memory and counts of the loading, mining and saving stages (see `instrumentation.py`).
+"""
+
+# Parameters to be adjusted
+data_path_with_profile = "path/to/Boolean_Data_with_profile.csv"
+data_path_without_profile = "path/to/Boolean_Data.csv"
+results_db = "path/to/results.db"
+output_file_with_profile = "path/to/rules_topk_{num_samples}x{num_features}_with_profile.csv"
+output_file_without_profile = "path/to/rules_topk_{num_samples}x{num_features}.csv"
+rules_file_with_profile = "path/to/rules_topk_{num_samples}x{num_features}_with_profile.npz"
+rules_file_without_profile = "path/to/rules_topk_{num_samples}x{num_features}.npz"
+train_data_path_with_profile = "path/to/Train_Data_with_profile.csv"
+train_data_path_without_profile = "path/to/Train_Data.csv"
+validation_data_path_with_profile = "path/to/Validation_Data_with_profile.csv"
+validation_data_path_without_profile = "path/to/Validation_Data.csv"
+split_manifest_file = "path/to/splits/split_{run_id}.npz"
+save_split_data = False
+profile_information = False
+feature_selection = "random"
+minimum_support_floor = 0.001
+max_len = None
+significance_test = None
+p_value_correction = "fdr_bh"
+significance_level = 0.05
+filter_insignificant = True
+run_report_dir = "path/to/profiles"
+trace_memory = False
+cprofile_stages = []
+
+# Verify parameters
+if len(sys.argv) != 5:
+    print("Error. Enter arguments correctly")
+    sys.exit()
+
+num_samples = int(sys.argv[1])
+num_features = int(sys.argv[2])
+k = int(sys.argv[3])
+minimum_confidence = float(sys.argv[4])
+
+print(f"{num_samples}, {num_features}, {k}, {minimum_confidence}")
+
+# Start time to measure the duration of the script
+start_time = time.time()
+
+# Record the initial parameters of this run, assuming execution has not yet completed
+run_id = start_run(results_db, "topk", {
+    "Num Samples": num_samples,
+    "Num Features": num_features,
+    "K": k,
+    "Minimum Confidence": minimum_confidence,
+    "Minimum Support Floor": minimum_support_floor,
+    "Execution Completed": "No",
+})
+
+print(f"Initial parameters recorded (run {run_id}).")
+
+profiler = Profiler("training_TopKRules", run_report_dir, trace_memory, cprofile_stages, parameters={
+    "run_id": run_id,
+    "num_samples": num_samples,
+    "num_features": num_features,
+    "k": k,
+    "minimum_confidence": minimum_confidence,
+    "minimum_support_floor": minimum_support_floor,
+    "max_len": max_len,
+    "profile_information": profile_information,
+    "feature_selection": feature_selection,
+})
+
+# Continue with the rest of the script
+profiler.start("load")
+data_path = data_path_with_profile if profile_information else data_path_without_profile
+boolean_data = load_boolean_data(data_path).sample(n=num_samples, random_state=41)
+train_data, validation_data = train_test_split(boolean_data, test_size=0.3, random_state=42)
+# Keep `num_features` columns, screened on the training rows only so the validation rows play no part in the choice
+if feature_selection == "random":
+    columns = train_data.sample(n=num_features, axis=1, random_state=41).columns
+else:
+    columns = screen_features(train_data, num_features, feature_selection, min_support=minimum_support_floor or 0.0)
+train_data, validation_data = train_data[columns], validation_data[columns]
+profiler.stop(rows=len(boolean_data), columns=len(train_data.columns))
+
+# Save the split manifest, and the training and validation sets if requested
+profiler.start("save_splits")
+split_manifest = split_manifest_file.format(run_id=run_id)
+write_manifest(split_manifest, data_path, train_data, validation_data, source_hash=None,
+               parameters={"num_samples": num_samples, "num_features": num_features, "profile_information": profile_information,
+                           "sample_random_state": 41, "split_random_state": 42, "test_size": 0.3})
+if save_split_data:
+    if profile_information:
+        train_data.to_csv(train_data_path_with_profile, index=False)
+        validation_data.to_csv(validation_data_path_with_profile, index=False)
+    else:
+        train_data.to_csv(train_data_path_without_profile, index=False)
+        validation_data.to_csv(validation_data_path_without_profile, index=False)
+profiler.stop(rows=len(train_data) + len(validation_data))
+
+record_results(results_db, run_id, "topk", {"Split Manifest": split_manifest})
+
+train_data = train_data.astype(bool)
+
+# Top-K rule mining
+mining_start = time.time()
+profiler.start("mining")
+rules = top_k_rules(train_data, k, min_confidence=minimum_confidence, min_support=minimum_support_floor, max_len=max_len)
+profiler.stop(rules=len(rules))
+mining_end = time.time()
+mining_time = mining_end - mining_start
+
+# The support of the k-th rule is the threshold the search raised its support to
+minimum_support_reached = rules['support'].min() if len(rules) else None
+
+print(f"Top-K rule mining completed ({len(rules)} rules, minimum support reached: {minimum_support_reached}).")
+
+if significance_test is not None:
+    # Test each rule against the independence of its antecedents and consequents, keeping only the significant ones if requested
+    profiler.start("significance")
+    rules = add_significance(rules, len(train_data), significance_test, p_value_correction)
+    untested = rules['adjusted p-value'].isna()
+    if untested.any():
+        print(f"{untested.sum()} rules lack antecedent or consequent supports and could not be tested; they are kept.")
+    if filter_insignificant:
+        rules = rules[untested | (rules['adjusted p-value'] <= significance_level)]
+    profiler.stop(rules=len(rules))
+
+profiler.start("save_rules")
+
+# Calculate the support of each rule
+rules['support'] = rules['support'] * len(train_data)
+
+# Sort the rules by confidence
+rules = rules.sort_values(by=['confidence'], ascending=False)
+
+# Construct file name based on parameters
+file_name = output_file_with_profile if profile_information else output_file_without_profile
+file_name = file_name.format(num_samples=num_samples, num_features=num_features)
+
+# Save the DataFrame to a CSV file
+rules.to_csv(file_name, index=False)
+
+# Save the rules to a structured rule file
+rules_file = rules_file_with_profile if profile_information else rules_file_without_profile
+rules_file = rules_file.format(num_samples=num_samples, num_features=num_features)
+write_rules(rules, rules_file)
+profiler.stop(rules=len(rules))
+
+# Total execution time
+end_time = time.time()
+total_time = end_time - start_time
+
+# Final results, completing the run
+record_results(results_db, run_id, "topk", {
+    "Top-K Execution Time (s)": mining_time,
+    "Number of Rules": len(rules),
+    "Minimum Support Reached": minimum_support_reached,
+    "Total Execution Time (s)": total_time,
+    "Execution Completed": "Yes",
+})
+
+print(f"Run report saved to {profiler.save()}")
+print("All results recorded.\n")
@@ -0,0 +1,126 @@
+import sys
+import time
+from rule_io import write_rules
+from boolean_matrix import load_boolean_data
+from results_store import start_run, record_results
+from incremental_mining import IncrementalMiner
+
+# Start time to measure the duration of the script
+start_time = time.time()
+
+"""
+Incremental Mining Script.
+
+This script maintains the frequent itemsets and the 'inf_' -> 'usr_' association rules of a growing dataset. The first run mines the given itemized data and saves the support counts of the frequent itemsets and of their negative border to a state directory. Every later run adds a batch of newly itemized rows: the saved counts are updated with the new rows only, and the previous rows are scanned only for the itemsets that become candidates when the negative border moves (see `incremental_mining.py`). The results are recorded in a results database.
+
+The new rows must be itemized with the thresholds of the existing data (`fit_thresholds = False` in `feature_itemization.py`), so they have the same columns.
+
+Usage:
+    python training_incremental.py <data_file> <minimum_support> <minimum_confidence>
+
+Arguments:
+    - data_file: str - Boolean data CSV file or packed bit file (.bits) with the initial data, or with the new rows once the state exists.
+    - minimum_support: float - Minimum support value, used when the state is created.
+    - minimum_confidence: float - Minimum confidence value for the association rules.
+
+Parameters to be adjusted:
+    - `state_dir`: Directory where the itemset counts and the itemized rows of every batch are saved.
+    - `results_db`: Path to the SQLite results database where results will be recorded (see `results_store.py`).
+    - `output_file`: Path to the output CSV file for the association rules.
+    - `rules_file`: Path to the structured rule file (.npz) for the association rules.
+
+Outputs:
+    - A run in the results database recording the parameters, the number of rows added and in total, the mining execution time, number of frequent itemsets, association rules execution time, and total execution time. The results can be exported to the Excel layout with `python results_store.py <results_db> <excel_file> incremental`.
+    - A CSV file and a structured rule file (.npz) containing the association rules of all the data seen so far, with the same columns as the other training scripts.
+"""
+
+# Parameters to be adjusted
+state_dir = "path/to/incremental_state"
+results_db = "path/to/results.db"
+output_file = "path/to/rules_incremental.csv"
+rules_file = "path/to/rules_incremental.npz"
+
+# Verify parameters
+if len(sys.argv) != 4:
+    print("Error. Enter arguments correctly")
+    sys.exit()
+
+data_file = sys.argv[1]
+minimum_support = float(sys.argv[2])
+minimum_confidence = float(sys.argv[3])
+
+print(f"{data_file}, {minimum_support}, {minimum_confidence}")
+
+miner = IncrementalMiner(state_dir)
+initial_run = not miner.exists()
+if not initial_run:
+    miner = IncrementalMiner.load(state_dir)
+    if miner.min_support != minimum_support:
+        print(f"Warning. The state was created with a minimum support of {miner.min_support}, which is used instead.")
+
+# Record the initial parameters of this run, assuming execution has not yet completed
+run_id = start_run(results_db, "incremental", {
+    "Data File": data_file,
+    "Initial Run": "Yes" if initial_run else "No",
+    "Minimum Support": minimum_support if initial_run else miner.min_support,
+    "Minimum Confidence": minimum_confidence,
+    "Execution Completed": "No",
+})
+
+print(f"Initial parameters recorded (run {run_id}).")
+
+new_data = load_boolean_data(data_file).astype(bool)
+
+# Incremental mining
+mining_start = time.time()
+if initial_run:
+    miner.initialize(new_data, minimum_support)
+else:
+    miner.update(new_data)
+frequent_itemsets = miner.frequent_itemsets()
+mining_end = time.time()
+mining_time = mining_end - mining_start
+num_frequent_itemsets = len(frequent_itemsets)
+
+print("Incremental mining completed.")
+
+# Record the mining results before starting association rules
+record_results(results_db, run_id, "incremental", {
+    "Rows Added": len(new_data),
+    "Total Rows": miner.num_rows,
+    "Mining Execution Time (s)": mining_time,
+    "Number of Frequent Itemsets": num_frequent_itemsets,
+    "Execution Completed": "No",
+})
+
+# Association rules
+association_start = time.time()
+rules = miner.rules(min_confidence=minimum_confidence)
+
+# Calculate the support of each rule
+rules['support'] = rules['support'] * miner.num_rows
+
+# Sort the rules by confidence
+rules = rules.sort_values(by=['confidence'], ascending=False)
+
+# Save the rules to a CSV file and to a structured rule file
+rules.to_csv(output_file, index=False)
+write_rules(rules, rules_file)
+
+association_end = time.time()
+association_time = association_end - association_start
+
+print("Association rules generated.")
+
+# Total execution time
+end_time = time.time()
+total_time = end_time - start_time
+
+# Final results, completing the run
+record_results(results_db, run_id, "incremental", {
+    "Association Rules Time (s)": association_time,
+    "Total Execution Time (s)": total_time,
+    "Execution Completed": "Yes",
+})
+
+print("All results recorded.\n")
@@ -0,0 +1,267 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, fpgrowth, fpmax, association_rules
+from sklearn.model_selection import train_test_split
+
+from boolean_matrix import load_boolean_data
+from feature_screening import screen_features
+from constrained_mining import mine_constrained, constrained_association_rules
+from eclat import eclat
+from results_store import start_run, record_results
+from rule_generation import write_association_rules
+from rule_io import write_rules
+from split_manifest import write_manifest
+from shared_data import attach_array, share_array
+from artifact_cache import file_sha256
+
+"""
+Parameter Sweep Script.
+
+This script runs the training pipeline of `training_Apriori.py`, `training_FPGrowth.py`, `training_FPMax.py` and `training_Eclat.py` over a grid of parameters. The Boolean data is read once and placed in shared memory, and every combination of (algorithm, num_samples, num_features, minimum_support, minimum_confidence) is run on a process pool whose workers read the data matrix without copying it.
+
+Usage:
+    python training_sweep.py <grid_file> <algorithms> [<num_workers>]
+
+Arguments:
+    - grid_file: str - Path to a JSON file with the lists of values to sweep, e.g. {"num_samples": [1000, 10000], "num_features": [30, 50], "minimum_support": [0.05, 0.1], "minimum_confidence": [0.6]}.
+    - algorithms: str - Comma-separated list of algorithms to run, among apriori, fpgrowth, fpmax and eclat.
+    - num_workers: int - Number of worker processes (optional, defaults to the number of CPUs).
+
+Parameters to be adjusted:
+    - `profile_information`: Set to True if profile information is included, otherwise set to False.
+    - `feature_selection`: How the `num_features` columns are chosen: 'random' to sample them at random, or 'mutual_information' / 'lift' to keep the columns of the 'inf_' -> 'usr_' column pairs with the highest mutual information or lift on the training rows, among the pairs whose support reaches the minimum support (see `feature_screening.py`).
+    - `data_path_with_profile`: Path to the Boolean data CSV file or packed bit file (.bits) with profile information.
+    - `data_path_without_profile`: Path to the Boolean data CSV file or packed bit file (.bits) without profile information.
+    - `results_db`: Path to the SQLite results database where results will be recorded (see `results_store.py`).
+    - `output_file_with_profile` / `output_file_without_profile`: Paths to the output CSV files for association rules.
+    - `rules_file_with_profile` / `rules_file_without_profile`: Paths to the structured rule files (.npz).
+    - `train_data_path_with_profile` / `train_data_path_without_profile`: Paths to save the training data CSV files.
+    - `validation_data_path_with_profile` / `validation_data_path_without_profile`: Paths to save the validation data CSV files.
+    - `split_manifest_file`: Path to the split manifest (.npz) of each run, storing the row and column indices of the training and validation sets and the hash of the Boolean data file instead of copies of the data (see `split_manifest.py`).
+    - `save_split_data`: Set to True to also save CSV copies of the training and validation sets.
+    - `constrained_mining`: Set to True to mine only the itemsets that can produce 'inf_' -> 'usr_' rules (see `constrained_mining.py`).
+    - `streaming_rules`: Set to True to generate only the 'inf_' -> 'usr_' rules and write them in chunks of `rule_chunk_size` rules, in generation order, instead of building every rule in memory (see `rule_generation.py`). FP-Max rules, whose subset supports are missing, are still generated with `association_rules`.
+    - `rule_chunk_size`: Number of rules generated and written at a time when `streaming_rules` is True.
+
+Outputs:
+    - The same results runs, rule files and split manifests as the training scripts. Every worker records its own runs in the results database, which accepts concurrent writers. Since several combinations run at once, the rule and split file names also include the parameters that distinguish them.
+"""
+
+# Parameters to be adjusted
+data_path_with_profile = "path/to/Boolean_Data_with_profile.csv"
+data_path_without_profile = "path/to/Boolean_Data.csv"
+results_db = "path/to/results.db"
+output_file_with_profile = "path/to/rules_{algorithm}_{num_samples}x{num_features}_{minimum_support}_{minimum_confidence}_with_profile.csv"
+output_file_without_profile = "path/to/rules_{algorithm}_{num_samples}x{num_features}_{minimum_support}_{minimum_confidence}.csv"
+rules_file_with_profile = "path/to/rules_{algorithm}_{num_samples}x{num_features}_{minimum_support}_{minimum_confidence}_with_profile.npz"
+rules_file_without_profile = "path/to/rules_{algorithm}_{num_samples}x{num_features}_{minimum_support}_{minimum_confidence}.npz"
+train_data_path_with_profile = "path/to/Train_Data_{num_samples}x{num_features}_with_profile.csv"
+train_data_path_without_profile = "path/to/Train_Data_{num_samples}x{num_features}.csv"
+validation_data_path_with_profile = "path/to/Validation_Data_{num_samples}x{num_features}_with_profile.csv"
+validation_data_path_without_profile = "path/to/Validation_Data_{num_samples}x{num_features}.csv"
+split_manifest_file = "path/to/splits/split_{run_id}.npz"
+save_split_data = False
+profile_information = False
+feature_selection = "random"
+constrained_mining = False
+streaming_rules = False
+rule_chunk_size = 100000
+
+# Mining function and name used in the results for each algorithm
+algorithms = {
+    "apriori": ("Apriori", apriori),
+    "fpgrowth": ("FP-Growth", fpgrowth),
+    "fpmax": ("FP-Max", fpmax),
+    "eclat": ("Eclat", eclat),
+}
+
+### 1. WORKER PROCESS ###
+
+# Boolean data attached from shared memory in each worker, with the path and hash of its file
+_shared_block = None
+_boolean_data = None
+_data_path = None
+_data_hash = None
+
+
+def attach_boolean_data(spec, columns, data_path, data_hash):
+    """
+    Attach the worker to the Boolean data matrix held in shared memory.
+    """
+    global _shared_block, _boolean_data, _data_path, _data_hash
+
+    _data_path = data_path
+    _data_hash = data_hash
+
+    _shared_block, matrix = attach_array(spec)
+    _boolean_data = pd.DataFrame(matrix, columns=columns, copy=False)
+
+
+def write_atomically(df, path):
+    """
+    Write a DataFrame to a CSV file through a temporary file, so concurrent writers of the same split never interleave.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(temporary_path, index=False)
+    os.replace(temporary_path, path)
+
+
+def run_combination(algorithm, num_samples, num_features, minimum_support, minimum_confidence):
+    """
+    Run the training pipeline for one combination of parameters, recording its results in the results database.
+    """
+    start_time = time.time()
+    algorithm_name, mine = algorithms[algorithm]
+    names = dict(algorithm=algorithm, num_samples=num_samples, num_features=num_features,
+                 minimum_support=minimum_support, minimum_confidence=minimum_confidence)
+
+    run_id = start_run(results_db, algorithm, {
+        "Num Samples": num_samples,
+        "Num Features": num_features,
+        "Minimum Support": minimum_support,
+        "Minimum Confidence": minimum_confidence,
+        "Execution Completed": "No",
+    })
+
+    boolean_data = _boolean_data.sample(n=num_samples, random_state=41)
+    train_data, validation_data = train_test_split(boolean_data, test_size=0.3, random_state=42)
+    # Keep `num_features` columns, screened on the training rows only so the validation rows play no part in the choice
+    if feature_selection == "random":
+        columns = train_data.sample(n=num_features, axis=1, random_state=41).columns
+    else:
+        columns = screen_features(train_data, num_features, feature_selection, min_support=minimum_support)
+    train_data, validation_data = train_data[columns], validation_data[columns]
+
+    # Save the split manifest, and the training and validation sets if requested
+    split_manifest = split_manifest_file.format(run_id=run_id)
+    write_manifest(split_manifest, _data_path, train_data, validation_data, source_hash=_data_hash,
+                   parameters={"num_samples": num_samples, "num_features": num_features, "profile_information": profile_information,
+                               "sample_random_state": 41, "split_random_state": 42, "test_size": 0.3})
+    if save_split_data:
+        if profile_information:
+            write_atomically(train_data, train_data_path_with_profile.format(**names))
+            write_atomically(validation_data, validation_data_path_with_profile.format(**names))
+        else:
+            write_atomically(train_data, train_data_path_without_profile.format(**names))
+            write_atomically(validation_data, validation_data_path_without_profile.format(**names))
+
+    train_data = train_data.astype(bool)
+
+    # Mining
+    mining_start = time.time()
+    if constrained_mining:
+        frequent_itemsets = mine_constrained(train_data, minimum_support, minimum_confidence)
+    else:
+        frequent_itemsets = mine(train_data, min_support=minimum_support, use_colnames=True)
+    mining_time = time.time() - mining_start
+
+    record_results(results_db, run_id, algorithm, {
+        f"{algorithm_name} Execution Time (s)": mining_time,
+        "Number of Frequent Itemsets": len(frequent_itemsets),
+        "Split Manifest": split_manifest,
+        "Execution Completed": "No",
+    })
+
+    # Association rules
+    association_start = time.time()
+    output_file = output_file_with_profile if profile_information else output_file_without_profile
+    rules_file = rules_file_with_profile if profile_information else rules_file_without_profile
+
+    if constrained_mining:
+        rules = constrained_association_rules(frequent_itemsets, min_confidence=minimum_confidence)
+    elif streaming_rules and algorithm != "fpmax":
+        # The rules are written chunk by chunk without being kept in memory
+        rules = None
+        write_association_rules(frequent_itemsets, output_file.format(**names), rules_file.format(**names),
+                                min_threshold=minimum_confidence, num_rows=len(train_data), chunk_size=rule_chunk_size)
+    else:
+        try:
+            rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=minimum_confidence)
+        except (KeyError, ValueError):
+            # Maximal itemsets may lack the supports of antecedents or consequents (the error type depends on the mlxtend version)
+            rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=minimum_confidence, support_only=True)
+
+        # Keep only the rules with 'inf_' antecedents and 'usr_' consequents, with Boolean masks so an empty rules frame is not indexed by columns
+        rules = rules[rules['antecedents'].apply(lambda x: all(str(item).startswith('inf_') for item in x)).astype(bool)]
+        rules = rules[rules['consequents'].apply(lambda x: all(str(item).startswith('usr_') for item in x)).astype(bool)]
+        rules = rules.drop(columns=['lift', 'leverage', 'conviction', 'zhangs_metric'])
+
+    if rules is not None:
+        rules['support'] = rules['support'] * len(train_data)
+        rules = rules.sort_values(by=['confidence'], ascending=False)
+
+        rules.to_csv(output_file.format(**names), index=False)
+        write_rules(rules, rules_file.format(**names))
+
+    association_time = time.time() - association_start
+
+    record_results(results_db, run_id, algorithm, {
+        "Association Rules Time (s)": association_time,
+        "Total Execution Time (s)": time.time() - start_time,
+        "Execution Completed": "Yes",
+    })
+
+### 2. SWEEP ###
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print("Error. Enter arguments correctly")
+        sys.exit()
+
+    with open(sys.argv[1]) as grid_file:
+        grid = json.load(grid_file)
+
+    selected = sys.argv[2].split(",")
+    unknown = [algorithm for algorithm in selected if algorithm not in algorithms]
+    if unknown:
+        print(f"Error. Unknown algorithms: {', '.join(unknown)}")
+        sys.exit()
+
+    num_workers = int(sys.argv[3]) if len(sys.argv) == 4 else os.cpu_count()
+
+    combinations = list(product(
+        selected, grid["num_samples"], grid["num_features"], grid["minimum_support"], grid["minimum_confidence"]
+    ))
+
+    # Largest and lowest-support combinations first, so they do not end up alone at the tail of the sweep
+    combinations.sort(key=lambda combination: (-combination[1] * combination[2], combination[3]))
+
+    print(f"{len(combinations)} combinations on {num_workers} workers.")
+
+    # Load the Boolean data once and place it in shared memory
+    data_path = data_path_with_profile if profile_information else data_path_without_profile
+    boolean_data = load_boolean_data(data_path)
+    data_hash = file_sha256(data_path)
+    block, spec = share_array(boolean_data.to_numpy(dtype="uint8"))
+
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=attach_boolean_data,
+                                 initargs=(spec, list(boolean_data.columns), data_path, data_hash)) as executor:
+            futures = {executor.submit(run_combination, *combination): combination for combination in combinations}
+
+            for future in as_completed(futures):
+                algorithm, num_samples, num_features, minimum_support, minimum_confidence = futures[future]
+
+                try:
+                    future.result()
+                except Exception as error:
+                    print(f"{algorithm} {num_samples}, {num_features}, {minimum_support}, {minimum_confidence} failed: {error}")
+                else:
+                    print(f"{algorithm} {num_samples}, {num_features}, {minimum_support}, {minimum_confidence} completed.")
+    finally:
+        block.close()
+        block.unlink()
+
+    print("All results recorded.\n")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    main()
+    print("Execution time: {:.2f} seconds".format(time.time() - start_time))